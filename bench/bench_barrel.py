@@ -0,0 +1,54 @@
+"""Compare the rotations of `rotate.reg_reversal` controlled by qat against
+`barrel.controlled_rotation`, and `bix_data_compile_time`, which rotates its
+arrays at each element, against `bix_data_blocks`, which rotates them once
+per block with `barrel.barrel_shift`.
+
+Usage: python -m bench.bench_barrel
+"""
+from bench.common import (depth, flat_circuit, gate_counts, print_table,
+                          reversible_throughput, timed)
+from qatext.qroutines import bix
+from qatext.qroutines.qubitshuffle import barrel, rotate
+
+# nregs, m
+ROTATIONS = [(8, 4), (32, 4), (128, 8)]
+# n, weight, m
+BIX_SIZES = [(16, 8, 6), (32, 16, 8)]
+BLOCKS = [1, 3, 7]
+
+
+def _row(name, params, gate, inputs):
+    circ, build_time = timed(flat_circuit, gate)
+    counts = gate_counts(circ)
+    return (name, params, f"{build_time:.3f}", circ.nbqbits,
+            sum(counts.values()), counts.get("C-SWAP", 0), depth(circ),
+            f"{reversible_throughput(circ, inputs):.1f}")
+
+
+def main():
+    rows = []
+    for nregs, m in ROTATIONS:
+        params = f"nregs={nregs} m={m}"
+        inputs = range(1 + nregs * m)
+        rows.append(_row("reg_reversal.ctrl", params,
+                         rotate.reg_reversal(nregs, m, 1).ctrl(), inputs))
+        rows.append(_row("controlled_rotation", params,
+                         barrel.controlled_rotation(nregs, m, 1), inputs))
+    for n, weight, m in BIX_SIZES:
+        elems = [(7 * i + 3) % (1 << m) for i in range(n)]
+        params = f"n={n} w={weight} m={m}"
+        rows.append(_row("bix_data", params,
+                         bix.bix_data_compile_time(n, m, weight, elems),
+                         range(n)))
+        for block in BLOCKS:
+            for log_depth in (False, True):
+                rows.append(
+                    _row(f"bix_data_blocks({block}, {log_depth})", params,
+                         bix.bix_data_blocks(n, m, weight, elems, block,
+                                             log_depth), range(n)))
+    print_table(("routine", "size", "build [s]", "qubits", "gates",
+                 "C-SWAP", "depth", "rsim [inputs/s]"), rows)
+
+
+if __name__ == "__main__":
+    main()
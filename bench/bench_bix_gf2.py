@@ -0,0 +1,42 @@
+"""Compare `bix_matrix_compile_time` with `m = 1` against `bix_matrix_gf2`
+on sparse binary matrices of 1000 columns.
+
+Usage: python -m bench.bench_bix_gf2
+"""
+import numpy as np
+
+from bench.common import flat_circuit, gate_counts, print_table, timed
+from qatext.qroutines import bix
+
+COLUMNS = 1000
+# n, weight, density of ones
+SIZES = [(8, 4, 0.01), (8, 4, 0.1), (16, 8, 0.01), (16, 8, 0.1)]
+
+
+def main():
+    rows = []
+    rng = np.random.default_rng(0)
+    for n, weight, density in SIZES:
+        matrix = (rng.random((n, COLUMNS)) < density).astype(np.uint8)
+        # half the columns unused, as in a parity-check matrix restricted to
+        # a few of its rows
+        matrix[:, COLUMNS // 2:] = 0
+        flat = [int(v) for v in matrix.flatten()]
+        packed = np.packbits(matrix, axis=1)
+        for name, build in (
+            ("bix_matrix", lambda: bix.bix_matrix_compile_time(
+                n, COLUMNS, 1, weight, flat)),
+            ("bix_matrix_gf2", lambda: bix.bix_matrix_gf2(
+                n, COLUMNS, weight, packed)),
+        ):
+            circ, build_time = timed(
+                lambda: flat_circuit(build(), [], n * COLUMNS + n))
+            counts = gate_counts(circ)
+            rows.append((n, weight, density, name, f"{build_time:.3f}",
+                         circ.nbqbits, sum(counts.values())))
+    print_table(("n", "weight", "density", "routine", "build [s]", "qubits",
+                 "gates"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Compare `bix_data_compile_time` against `bix_data_unary`, which writes
+each element through a one-hot pointer instead of rotating the arrays.
+
+Usage: python -m bench.bench_bix_unary
+"""
+from bench.common import (depth, flat_circuit, gate_counts, print_table,
+                          reversible_throughput, timed)
+from qatext.qroutines import bix
+from qatext.qroutines.arith import cuccaro_arith
+
+# n, weight, m
+SIZES = [(8, 4, 5), (16, 8, 6), (24, 12, 8), (32, 16, 8)]
+LINK = [cuccaro_arith.adder, cuccaro_arith.subtractor]
+
+
+def main():
+    rows = []
+    for n, weight, m in SIZES:
+        elems = [(7 * i + 3) % (1 << m) for i in range(n)]
+        for name, gate in (("bix_data", bix.bix_data_compile_time),
+                           ("bix_data_unary", bix.bix_data_unary)):
+            circ, build_time = timed(flat_circuit,
+                                     gate(n, m, weight, elems), LINK)
+            counts = gate_counts(circ)
+            # the gates acting on three qubits or more
+            toffolis = sum(v for k, v in counts.items()
+                           if k in ("CCNOT", "C-SWAP") or k.startswith("C-C"))
+            rows.append((n, weight, m, name, f"{build_time:.3f}",
+                         circ.nbqbits, sum(counts.values()), toffolis,
+                         depth(circ),
+                         f"{reversible_throughput(circ, range(n)):.1f}"))
+    print_table(("n", "weight", "m", "routine", "build [s]", "qubits",
+                 "gates", "3+ qubit gates", "depth", "rsim [inputs/s]"),
+                rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Throughput of the exhaustive BIX verification: the reversible simulator,
+one input at a time, against the batched engine, in a single process and
+sharded over a process pool.
+
+Usage: python -m bench.bench_bix_verify
+"""
+import os
+from math import comb
+
+from bench.common import flat_circuit, print_table, reversible_throughput
+from qatext.qroutines import bix
+from qatext.verification.bix import LINK, verify_bix_data
+
+SIZES = [(10, 3), (14, 5), (18, 6)]
+
+
+def main():
+    rows = []
+    processes = os.cpu_count()
+    for n, weight in SIZES:
+        elems = list(range(1, n + 1))
+        m = n.bit_length()
+        circ = flat_circuit(bix.bix_data_diff_compile_time(n, m, weight,
+                                                           elems), LINK)
+        rows.append((n, weight, comb(n, weight), "RProgram", 1,
+                     f"{reversible_throughput(circ, range(n), shots=8):.0f}"))
+        for procs in sorted({1, processes}):
+            report = verify_bix_data(n, m, weight, elems, diff=True,
+                                     processes=procs)
+            assert report.ok, report
+            rows.append((n, weight, report.inputs, "batched", procs,
+                         f"{report.inputs_per_second:.0f}"))
+    print_table(("n", "weight", "inputs", "engine", "processes",
+                 "inputs/s"), rows)
+
+
+if __name__ == "__main__":
+    main()
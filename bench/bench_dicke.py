@@ -0,0 +1,40 @@
+"""Construction time of the Dicke state preparation for n in the hundreds.
+
+The cold build runs with empty caches; the warm build compiles the same state
+in a fresh program, reusing the memoized routine bodies and angles.
+
+Usage: python -m bench.bench_dicke
+"""
+from bench.common import print_table, timed
+from qat.lang.AQASM.program import Program
+from qatext.qroutines.hamming_weight_generate import bartschiE19
+
+SIZES = [(100, 1), (200, 1), (400, 1), (100, 2), (200, 2), (100, 4),
+         (200, 4)]
+
+
+def build(n, k):
+    pr = Program()
+    qbits = pr.qalloc(n)
+    pr.apply(bartschiE19.generate(n, k), qbits)
+    return pr.to_circ()
+
+
+def main():
+    rows = []
+    for n, k in SIZES:
+        bartschiE19.generate.circuit_generator.cache_clear()
+        bartschiE19._scs.circuit_generator.cache_clear()
+        bartschiE19.unary_to_dicke.circuit_generator.cache_clear()
+        bartschiE19.scs_angles.cache_clear()
+        _, body_time = timed(bartschiE19.generate.circuit_generator, n, k)
+        circ, cold_time = timed(build, n, k)
+        _, warm_time = timed(build, n, k)
+        rows.append((n, k, f"{body_time:.4f}", f"{cold_time:.3f}",
+                     f"{warm_time:.3f}", len(circ.gateDic)))
+    print_table(("n", "k", "body [s]", "cold to_circ [s]",
+                 "warm to_circ [s]", "gate definitions"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""Depth and gate count of the linear (Bärtschi & Eidenbenz 2019) and the
+divide-and-conquer (Bärtschi & Eidenbenz 2022) Dicke state preparations.
+
+Usage: python -m bench.bench_dicke_depth
+"""
+from bench.common import depth, flat_circuit, gate_counts, print_table, timed
+from qatext.qroutines.hamming_weight_generate import bartschiE19, bartschiE22
+
+SIZES = [(8, 1), (16, 1), (32, 1), (64, 1), (128, 1), (16, 2), (32, 2),
+         (64, 2), (32, 4), (64, 4), (64, 8)]
+
+
+def main():
+    rows = []
+    for n, k in SIZES:
+        for name, module in (("E19", bartschiE19), ("E22", bartschiE22)):
+            circ, build_time = timed(flat_circuit,
+                                     module.generate(n, k),
+                                     nqbits=n)
+            counts = gate_counts(circ)
+            two_qubits_or_more = sum(v for g, v in counts.items()
+                                     if g not in ("X", "RY"))
+            rows.append((n, k, name, f"{build_time:.3f}",
+                         sum(counts.values()), two_qubits_or_more,
+                         depth(circ)))
+    print_table(("n", "k", "routine", "build [s]", "gates", "multi-qubit",
+                 "depth"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Compare the fan-out of a register into `n` registers by a CNOT loop, as
+in `insert_ld`, against the CNOT tree of `qregs_init.fan_out_register`.
+
+The circuits are run by the batched engine, whose time grows with the
+number of operations; the depth is the number of layers a simulator
+applying a layer of disjoint gates at once would need.
+
+Usage: python -m bench.bench_fan_out
+"""
+import numpy as np
+from bench.common import depth, flat_circuit, gate_counts, print_table, timed
+from qat.lang.AQASM.gates import CNOT
+from qat.lang.AQASM.routines import QRoutine
+from qatext.qpus.batched import BatchedRProgram, compile_tape
+from qatext.qroutines.qregs_init import fan_out_register
+
+SIZES = [(4, 4), (16, 4), (64, 8), (256, 8)]
+LANES = 1 << 12
+
+
+def fan_out_loop(n, m):
+    qrout = QRoutine()
+    qr_val = qrout.new_wires(m)
+    for _ in range(n):
+        for qb1, qb2 in zip(qr_val, qrout.new_wires(m)):
+            qrout.apply(CNOT, qb1, qb2)
+    return qrout
+
+
+def _batched_time(circ, m):
+    tape = compile_tape(circ)
+    bprogram = BatchedRProgram(circ.nbqbits, LANES)
+    rng = np.random.default_rng(0)
+    bprogram.set_bits(range(m), rng.integers(0, 2, (LANES, m)))
+    _, elapsed = timed(bprogram.run, tape)
+    return elapsed
+
+
+def main():
+    rows = []
+    for n, m in SIZES:
+        for name, gate in (("loop", fan_out_loop(n, m)),
+                           ("fan_out_register", fan_out_register(n, m))):
+            circ, build_time = timed(flat_circuit, gate)
+            rows.append((n, m, name, f"{build_time:.3f}",
+                         sum(gate_counts(circ).values()), depth(circ),
+                         f"{_batched_time(circ, m) * 1e3:.2f}"))
+    print_table(("n", "m", "routine", "build [s]", "gates", "depth",
+                 f"batched, {LANES} inputs [ms]"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Gate counts of the CSSP program from the flat circuit (`to_circ` plus
+`statistics`) against the hierarchical resource estimator.
+
+Usage: python -m bench.bench_resources
+"""
+import cssp
+from bench.common import gate_counts, print_table, timed
+from qat.lang.AQASM import classarith
+from qatext.qroutines.arith import cuccaro_arith
+from qatext.utils.qatmgmt.resources import ResourceEstimator
+
+LINK = [classarith, cuccaro_arith]
+
+# instances small enough to be compiled, then estimator only
+SIZES = [(4, 2, True), (6, 2, True), (8, 3, True), (16, 3, False),
+         (24, 4, False), (32, 4, False)]
+
+
+def main():
+    rows = []
+    for n, k, flat in SIZES:
+        values = list(range(1, n + 1))
+        prw, build_time = timed(cssp.build, n, k, values, sum(values[:k]))
+        estimator = ResourceEstimator(LINK)
+        res, estimate_time = timed(estimator.estimate, prw)
+        compile_time = "-"
+        if flat:
+            circ, elapsed = timed(prw.to_circ, link=LINK)
+            assert gate_counts(circ) == res.gates
+            compile_time = f"{elapsed:.3f}"
+        rows.append((n, k, f"{build_time:.3f}", compile_time,
+                     f"{estimate_time:.3f}", estimator.definitions,
+                     res.gate_count, res.qubits, res.depth))
+    print_table(("n", "k", "build [s]", "to_circ [s]", "estimate [s]",
+                 "definitions", "gates", "qubits", "depth"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Compare `merge_lw` against `k` repeated `insert_lw` on the sliding sorted
+array.
+
+Usage: python -m bench.bench_sliding_sort_merge
+"""
+from bench.common import (depth, flat_circuit, gate_counts, print_table,
+                          reversible_throughput, timed)
+from qat.lang.AQASM import classarith
+from qat.lang.AQASM.routines import QRoutine
+from qatext.qroutines.datastructure.sliding_sort_array import (insert_lw,
+                                                               merge_lw)
+
+SIZES = [(8, 2, 4), (8, 4, 4), (16, 4, 4), (16, 8, 4), (32, 8, 4)]
+
+
+def repeated_insert_lw(n, k, m):
+    qrout = QRoutine()
+    qrs_val = [qrout.new_wires(m) for _ in range(k)]
+    qarray = [qrout.new_wires(m) for _ in range(n)]
+    for t in range(k):
+        cells = n - k + t + 1
+        qrout.apply(insert_lw(cells, m), qrs_val[t], *qarray[:cells])
+    return qrout
+
+
+def main():
+    rows = []
+    for n, k, m in SIZES:
+        for name, builder in (("insert_lw x k", repeated_insert_lw),
+                              ("merge_lw", merge_lw)):
+            circ, build_time = timed(flat_circuit, builder(n, k, m),
+                                     [classarith])
+            counts = gate_counts(circ)
+            rows.append((n, k, m, name, f"{build_time:.3f}",
+                         sum(counts.values()), depth(circ),
+                         f"{reversible_throughput(circ, range(n * m)):.1f}"))
+    print_table(("n", "k", "m", "routine", "build [s]", "gates", "depth",
+                 "rsim [inputs/s]"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Compare the odd-even mergesort network against `n` sequential `insert_lw`
+for sorting an array of registers onto a second (empty) array.
+
+Usage: python -m bench.bench_sorting_network
+"""
+from bench.common import (depth, flat_circuit, gate_counts, print_table,
+                          reversible_throughput, timed)
+from qat.lang.AQASM import classarith
+from qat.lang.AQASM.routines import QRoutine
+from qatext.qroutines.arith import cuccaro_arith
+from qatext.qroutines.datastructure.sliding_sort_array import insert_lw
+from qatext.qroutines.datastructure.sorting_network import sort
+
+SIZES = [(4, 3), (8, 3), (8, 4), (16, 4), (32, 4)]
+
+
+def sequential_insert_lw(n, m):
+    qrout = QRoutine()
+    qrs_in = [qrout.new_wires(m) for _ in range(n)]
+    qrs_out = [qrout.new_wires(m) for _ in range(n)]
+    for i in range(n):
+        qrout.apply(insert_lw(i + 1, m), qrs_in[i], *qrs_out[:i + 1])
+    return qrout
+
+
+def main():
+    rows = []
+    for n, m in SIZES:
+        for name, gate in (("insert_lw x n", sequential_insert_lw(n, m)),
+                           ("sort", sort(n, m))):
+            circ, build_time = timed(flat_circuit, gate,
+                                     [classarith, cuccaro_arith])
+            counts = gate_counts(circ)
+            rows.append(
+                (n, m, name, f"{build_time:.3f}", circ.nbqbits,
+                 sum(counts.values()), depth(circ),
+                 f"{reversible_throughput(circ, range(n * m)):.1f}"))
+    print_table(("n", "m", "routine", "build [s]", "qubits", "gates",
+                 "depth", "rsim [inputs/s]"), rows)
+
+
+if __name__ == "__main__":
+    main()
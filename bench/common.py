@@ -0,0 +1,52 @@
+"""Helpers shared by the benchmark scripts.
+
+Every benchmark builds the routine inside a fresh `Program`, compiles it
+with `to_circ(inline=True)` and reports a few numbers: build time, gate
+counts, depth and, when the circuit is classical, the time needed by the
+reversible simulator to push a batch of random inputs through it.
+"""
+import random
+import time
+from typing import Callable, Iterable, Sequence
+
+from qatext.qpus.reversible import RProgram
+# re-exported for the benchmark scripts
+from qatext.utils.qatmgmt.circuit import (  # noqa: F401
+    depth, flat_circuit, gate_counts)
+
+
+def timed(func: Callable, *args, **kwargs):
+    """Return the result of `func(*args, **kwargs)` and the elapsed time."""
+    start = time.perf_counter()
+    res = func(*args, **kwargs)
+    return res, time.perf_counter() - start
+
+
+def reversible_throughput(circ,
+                          input_qbits: Sequence[int],
+                          shots: int = 16,
+                          seed: int = 0) -> float:
+    """Number of random basis inputs per second that the reversible simulator
+    runs through `circ`. The inputs are set on `input_qbits` only."""
+    rnd = random.Random(seed)
+    total = 0.0
+    for _ in range(shots):
+        rpr = RProgram()
+        rpr.ralloc(circ.nbqbits)
+        for q in input_qbits:
+            rpr.rbits[q] = rnd.getrandbits(1)
+        _, elapsed = timed(rpr.apply_gates_from_circuit, circ, circ)
+        total += elapsed
+    return shots / total
+
+
+def print_table(headers: Sequence[str], rows: Iterable[Sequence]):
+    rows = [[str(v) for v in row] for row in rows]
+    widths = [
+        max(len(h), *(len(r[i]) for r in rows)) if rows else len(h)
+        for i, h in enumerate(headers)
+    ]
+    print(" | ".join(h.rjust(w) for h, w in zip(headers, widths)))
+    print("-+-".join("-" * w for w in widths))
+    for row in rows:
+        print(" | ".join(v.rjust(w) for v, w in zip(row, widths)))
@@ -0,0 +1,295 @@
+"""Parameter sweep of the CSSP program: every instance of a grid of (n, k,
+value distribution, target sum) is built and costed with the resource
+estimator, and optionally simulated, in a pool of processes.
+
+Each instance gives one row (qubits, gate counts, depth, build, estimate and
+simulation times, peak RSS of the process) appended to the output as soon
+as it is done: a CSV file, or JSON lines if the output ends with `.jsonl`.
+Instances already in the output are skipped, so an interrupted sweep
+resumes where it stopped; the instances which failed are run again, and
+their rows replaced: the output holds one row per instance.
+
+Each instance runs in a fresh process, so that the peak RSS is its own.
+
+Usage: python -m bench.sweep_cssp --n 4 6 8 --k 1 2 --values range random
+    --targets min random --output sweep.csv [--processes 4]
+    [--simulate pylinalg|sparse|emulator]
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, NamedTuple, Optional
+
+import cssp
+from bench.common import timed
+from qat.lang.AQASM import classarith
+from qatext.qroutines.arith import cuccaro_arith
+from qatext.utils.qatmgmt.resources import estimate_resources
+
+LINK = [classarith, cuccaro_arith]
+
+FIELDS = ("n", "k", "values", "seed", "target", "target_sum", "m",
+          "qubits", "ancillae", "gate_count", "depth", "gates", "build_time",
+          "estimate_time", "simulation_time", "success_probability",
+          "peak_rss_kb", "error")
+
+
+class Instance(NamedTuple):
+    n: int
+    k: int
+    # name of the distribution of the values, see DISTRIBUTIONS
+    values: str
+    seed: int
+    # "min", "max", "random" or an integer, see target_sum
+    target: str
+
+    @property
+    def key(self) -> tuple[str, ...]:
+        return tuple(str(v) for v in self)
+
+
+def _random_values(n: int, rng: random.Random) -> list[int]:
+    return sorted(rng.sample(range(1, 4 * n), n))
+
+
+# distinct positive values, by name
+DISTRIBUTIONS: dict[str, Callable[[int, random.Random], list[int]]] = {
+    "range": lambda n, _: list(range(1, n + 1)),
+    "odd": lambda n, _: list(range(1, 2 * n, 2)),
+    "random": _random_values,
+}
+
+
+def instance_values(instance: Instance) -> list[int]:
+    rng = random.Random(instance.seed)
+    return DISTRIBUTIONS[instance.values](instance.n, rng)
+
+
+def target_sum(instance: Instance, values: list[int]) -> int:
+    """The target of `instance`: the sum of the `k` smallest or largest
+    values, of `k` random ones, or the integer given."""
+    k = instance.k
+    if instance.target == "min":
+        return sum(sorted(values)[:k])
+    if instance.target == "max":
+        return sum(sorted(values)[-k:])
+    if instance.target == "random":
+        return sum(random.Random(instance.seed).sample(values, k))
+    return int(instance.target)
+
+
+def grid(ns, ks, distributions, targets, seeds) -> list[Instance]:
+    """All the instances of the grid with `0 < k < n`."""
+    return [
+        Instance(n, k, values, seed, str(target)) for n in ns for k in ks
+        if 0 < k < n for values in distributions for target in targets
+        for seed in seeds
+    ]
+
+
+def _simulate_pylinalg(prw, values: list[int], target: int, k: int,
+                       m: int) -> float:
+    """Probability that the ones array holds `k` values summing to
+    `target`, from the dense simulation of the whole program."""
+    from qat.qpus import PyLinalg
+    circ = prw.to_circ(link=LINK)
+    node_s_ones = prw._qregnames_to_properties["s_1"].qregs
+    res = PyLinalg().submit(circ.to_job(qubits=[*node_s_ones]))
+    success = 0.0
+    for sample in res:
+        state = sample.state.int
+        # registers in big endian, the first one on the most significant bits
+        regs = [(state >> (m * (k - 1 - j))) & ((1 << m) - 1)
+                for j in range(k)]
+        if sum(regs) == target:
+            success += sample.probability
+    return success
+
+
+def _simulate_sparse(prw, values: list[int], target: int, k: int,
+                     m: int) -> float:
+    """Same as `_simulate_pylinalg`, storing only the nonzero amplitudes."""
+    from qatext.qpus.sparse import simulate
+    state = simulate(prw.to_circ(link=LINK))
+    qbits = [q.index for reg in prw._qregnames_to_properties["s_1"].qregs
+             for q in reg]
+    return sum(p for value, p in state.probabilities(qbits).items()
+               if sum((value >> (m * j)) & ((1 << m) - 1)
+                      for j in range(k)) == target)
+
+
+def _simulate_emulator(prw, values: list[int], target: int, k: int,
+                       m: int) -> float:
+    """Same probability from `cssp_emulator`, without the circuit."""
+    import cssp_emulator
+    return float(cssp_emulator.emulate(len(values), k, values, target)[-1])
+
+
+BACKENDS = {
+    "pylinalg": _simulate_pylinalg,
+    "sparse": _simulate_sparse,
+    "emulator": _simulate_emulator,
+}
+
+
+def run_instance(instance: Instance, low_width: bool = True,
+                 backend: Optional[str] = None) -> dict:
+    """Build, cost and optionally simulate `instance`, returning its row;
+    an exception is recorded in the `error` field."""
+    row: dict = dict(instance._asdict())
+    try:
+        values = instance_values(instance)
+        target = target_sum(instance, values)
+        row.update(target_sum=target, m=max(values).bit_length())
+        prw, row["build_time"] = timed(cssp.build, instance.n, instance.k,
+                                       values, target, low_width)
+        res, row["estimate_time"] = timed(estimate_resources, prw, LINK)
+        row.update(qubits=res.qubits,
+                   ancillae=res.ancillae,
+                   gate_count=res.gate_count,
+                   depth=res.depth,
+                   gates=json.dumps(res.gates, sort_keys=True))
+        if backend is not None:
+            start = time.perf_counter()
+            row["success_probability"] = BACKENDS[backend](prw, values,
+                                                           target,
+                                                           instance.k,
+                                                           row["m"])
+            row["simulation_time"] = time.perf_counter() - start
+    except Exception:  # pylint: disable=broad-except
+        row["error"] = traceback.format_exc(limit=1).strip().splitlines()[-1]
+    row["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return row
+
+
+def _is_jsonl(path: str) -> bool:
+    return path.endswith(".jsonl")
+
+
+def _key(row: dict) -> tuple[str, ...]:
+    return tuple(str(row[f]) for f in Instance._fields)
+
+
+def _read(path: str) -> list[dict]:
+    """Rows of the output as written, the last one of each instance only."""
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="") as f:
+        if _is_jsonl(path):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    return list({_key(row): row for row in rows}.values())
+
+
+def read_rows(path: str) -> list[dict]:
+    """Rows already in the output, as strings, one per instance: the last
+    one written."""
+    return [{k: str(v) if v is not None else ""
+             for k, v in row.items()}
+            for row in _read(path)]
+
+
+def _write(f, path: str, rows: list[dict], header: bool):
+    if _is_jsonl(path):
+        for row in rows:
+            f.write(json.dumps({k: row.get(k) for k in FIELDS}) + "\n")
+        return
+    writer = csv.DictWriter(f, FIELDS)
+    if header:
+        writer.writeheader()
+    for row in rows:
+        writer.writerow({k: row.get(k, "") for k in FIELDS})
+
+
+def _append(path: str, row: dict):
+    new = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, "a", newline="") as f:
+        _write(f, path, [row], new)
+
+
+def _rewrite(path: str, rows: list[dict]):
+    """Replace the output by `rows`, atomically."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    with os.fdopen(fd, "w", newline="") as f:
+        _write(f, path, rows, True)
+    os.replace(tmp, path)
+
+
+def sweep(instances: list[Instance],
+          output: str,
+          processes: Optional[int] = 1,
+          low_width: bool = True,
+          backend: Optional[str] = None) -> list[dict]:
+    """Run the instances missing from `output`, appending their rows as
+    they complete, and return the new rows.
+
+    With `processes` equal to 1 everything runs in this process, and the
+    peak RSS is the one of the whole sweep so far; otherwise each instance
+    runs in a fresh process of a pool (`None` means one per CPU)."""
+    if backend is not None and backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend}, "
+                         f"available: {', '.join(BACKENDS)}")
+    previous = _read(output)
+    done = {_key(row) for row in previous if not row.get("error")}
+    todo = [i for i in instances if i.key not in done]
+    if previous:
+        # the rows of the instances run again are replaced, not duplicated
+        todo_keys = {i.key for i in todo}
+        _rewrite(output,
+                 [row for row in previous if _key(row) not in todo_keys])
+    rows = []
+    if processes == 1:
+        for instance in todo:
+            rows.append(run_instance(instance, low_width, backend))
+            _append(output, rows[-1])
+        return rows
+    with ProcessPoolExecutor(processes or os.cpu_count(),
+                             max_tasks_per_child=1) as pool:
+        futures = [
+            pool.submit(run_instance, instance, low_width, backend)
+            for instance in todo
+        ]
+        for future in as_completed(futures):
+            rows.append(future.result())
+            _append(output, rows[-1])
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--n", type=int, nargs="+", required=True)
+    parser.add_argument("--k", type=int, nargs="+", required=True)
+    parser.add_argument("--values",
+                        nargs="+",
+                        default=["range"],
+                        choices=sorted(DISTRIBUTIONS))
+    parser.add_argument("--targets", nargs="+", default=["min"])
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--low-depth",
+                        action="store_true",
+                        help="use insert_ld instead of insert_lw")
+    parser.add_argument("--simulate", choices=sorted(BACKENDS))
+    args = parser.parse_args()
+    instances = grid(args.n, args.k, args.values, args.targets, args.seeds)
+    rows = sweep(instances, args.output, args.processes or None,
+                 not args.low_depth, args.simulate)
+    print(f"{len(rows)} new rows, {len(instances) - len(rows)} already in"
+          f" {args.output}")
+    for row in rows:
+        if row.get("error"):
+            print(f"{Instance(*(row[f] for f in Instance._fields))}: "
+                  f"{row['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
+import copy
+import functools
 from math import comb
+from typing import Optional
 
 import numpy as np
 from qat.lang.AQASM import classarith
 from qat.lang.AQASM.gates import H, X, Z
+from qat.lang.AQASM.misc import build_gate
 from qat.lang.AQASM.program import Program
 from qat.lang.AQASM.qftarith import QFT
 from qat.lang.AQASM.routines import QRoutine
@@ -15,10 +19,15 @@ from qatext.qroutines.arith import cuccaro_arith
 from qatext.qroutines.datastructure.sliding_sort_array import (  # ld stands for low-depth
     insert_ld, insert_lw)
 from qatext.qroutines.hamming_weight_generate.bartschiE19 import generate
+from qatext.utils.qatmgmt.cache import CachedCircuit, CircuitCache
+from qatext.utils.qatmgmt.circuit import circuit_resources
 from qatext.utils.qatmgmt.program import ProgramWrapper
+from qatext.utils.qatmgmt.repeat import repeat
+from qatext.utils.qatmgmt.resources import estimate_resources
 from qatext.utils.qatmgmt.routines import QRoutineWrapper
 
 QPU = PyLinalg()
+LINK = [classarith, cuccaro_arith]
 
 
 def update(n, k, m, insert):
@@ -59,136 +68,373 @@ def update(n, k, m, insert):
     return qrw
 
 
-def oracle(n, k, m, n_qubits_sum, target_value):
+def oracle(n, k, m, n_qubits_sum):
+    """Flip the phase of the nodes whose ones sum to the target. The sum
+    register holds minus the target (see `load_target`), so that the oracle
+    does not depend on it: the register is zero after adding the ones."""
     qrw = QRoutineWrapper(QRoutine())
     node_s_ones = qrw.qarray_wires(k, m, "s_1", int)
     sum_reg = qrw.qarray_wires(1, n_qubits_sum, "sum", int)
-    qrout_sum = classarith.add(n_qubits_sum, m)
+    # the registers are big endian: classarith, little endian, would add
+    # them with their bits reversed, whatever their sizes
+    qrout_sum = cuccaro_arith.adder(m, n_qubits_sum, False, False)
     with qrw.compute():
         for j in range(k):
-            qrw.apply(qrout_sum, sum_reg, node_s_ones[j])
+            qrw.apply(qrout_sum, node_s_ones[j], sum_reg)
         qrw.apply(
-            qregs.initialize_qureg_to_complement_of_int(
-                target_value, n_qubits_sum, False), sum_reg)
+            qregs.initialize_qureg_to_complement_of_int(0, n_qubits_sum,
+                                                        False), sum_reg)
     qrw.apply(Z.ctrl(n_qubits_sum - 1), sum_reg)
     qrw.uncompute()
     return qrw
 
 
-def main(n,
-         k,
-         values: list[int],
-         target_sum: int,
-         low_width=True,
-         to_simulate=False):
-    insert = insert_lw if low_width else insert_ld
+def load_target(n_qubits_sum, target_value):
+    """Initialize the sum register to minus `target_value`, modulo
+    `2^n_qubits_sum`; applied again, it restores zero. The target must fit
+    in the register, otherwise the oracle would mark the subsets summing to
+    it modulo `2^n_qubits_sum`."""
+    if target_value < 0 or target_value >= 1 << n_qubits_sum:
+        raise ValueError(f"target {target_value} does not fit in "
+                         f"{n_qubits_sum} bits")
+    return qregs.initialize_qureg_given_int(
+        -target_value % (1 << n_qubits_sum), n_qubits_sum, False)
+
+
+@build_gate("CSSP_UPDATE", [int, int, int, bool],
+            arity=lambda n, k, m, _: 2 * n * m + 2 * m + n)
+def update_gate(n, k, m, low_width):
+    """`update` as a named gate, using `insert_lw` if `low_width`."""
+    return update(n, k, m, insert_lw if low_width else insert_ld)._qroutine
+
+
+@build_gate("CSSP_ORACLE", [int, int, int, int],
+            arity=lambda n, k, m, n_qubits_sum: k * m + n_qubits_sum)
+def oracle_gate(n, k, m, n_qubits_sum):
+    """`oracle` as a named gate."""
+    return oracle(n, k, m, n_qubits_sum)._qroutine
+
+
+@build_gate("CSSP_WALK_STEP", [int, int, int, bool],
+            arity=lambda n, k, m, _: 1 + 2 * n * m + 2 * m + n)
+def walk_step(n, k, m, low_width):
+    """One step of the walk, controlled by a qubit of the phase estimation:
+    the reflection on the ones, then the one on the zeros. It is applied to
+    the control qubit followed by the registers of `update`."""
+    qrw = QRoutineWrapper(QRoutine())
+    qpe_bit = qrw.qarray_wires(1, 1, "qpe", str)[0]
+    node_s_ones = qrw.qarray_wires(k, m, "s_1", int)
+    node_s_zeros = qrw.qarray_wires(n - k, m, "s_0", int)
+    node_t_ones = qrw.qarray_wires(k, m, "t_1", int)
+    node_t_zeros = qrw.qarray_wires(n - k, m, "t_0", int)
+    alpha_ones = qrw.qarray_wires(1, m, "a_1", int)
+    alpha_zeros = qrw.qarray_wires(1, m, "a_0", int)
+    wstate_ones = qrw.qarray_wires(k, 1, "w_1", str)
+    wstate_zeros = qrw.qarray_wires(n - k, 1, "w_0", str)
+    qrout_update = update_gate(n, k, m, low_width)
+
+    qrw.apply(qrout_update.dag(), node_s_ones, node_s_zeros, node_t_ones,
+              node_t_zeros, alpha_ones, alpha_zeros, wstate_ones, wstate_zeros)
+    for j in range(k):
+        qrw.apply(X, wstate_ones[j])
+    qrw.apply(Z.ctrl(k), qpe_bit, wstate_ones)
+    for j in range(k):
+        qrw.apply(X, wstate_ones[j])
+    qrw.apply(qrout_update, node_s_ones, node_s_zeros, node_t_ones,
+              node_t_zeros, alpha_ones, alpha_zeros, wstate_ones, wstate_zeros)
+
+    # ref b: the same reflection on the zeros, with the update of the
+    # complementary Johnson graph, whose ones are our zeros
+    qrout_update_zeros = update_gate(n, n - k, m, low_width)
+    qrw.apply(qrout_update_zeros.dag(), node_s_zeros, node_s_ones,
+              node_t_zeros, node_t_ones, alpha_zeros, alpha_ones,
+              wstate_zeros, wstate_ones)
+    for j in range(n - k):
+        qrw.apply(X, wstate_zeros[j])
+    qrw.apply(Z.ctrl(n - k), qpe_bit, wstate_zeros)
+    for j in range(n - k):
+        qrw.apply(X, wstate_zeros[j])
+    qrw.apply(qrout_update_zeros, node_s_zeros, node_s_ones, node_t_zeros,
+              node_t_ones, alpha_zeros, alpha_ones, wstate_zeros, wstate_ones)
+    return qrw._qroutine
+
+
+@build_gate("CSSP_REFLECTION", [int], arity=lambda len_s: len_s)
+def reflection(len_s):
+    """Inversion around zero of the `len_s` qubits of the phase
+    estimation."""
+    qrout = QRoutine()
+    qpe_s = qrout.new_wires(len_s)
+    for j in range(len_s):
+        qrout.apply(X, qpe_s[j])
+    if len_s > 1:
+        qrout.apply(Z.ctrl(len_s - 1), qpe_s)
+    else:
+        qrout.apply(Z, qpe_s)
+    for j in range(len_s):
+        qrout.apply(X, qpe_s[j])
+    return qrout
+
+
+def external_iteration(n, k, m, len_s, n_qubits_sum, low_width):
+    """One external iteration of the search: the oracle, then the walk with
+    the phase estimation on `qpe_s`, and the reflection. The oracle, the walk
+    step and the reflection are named gates, defined once and applied by
+    reference. It does not depend on the data."""
+    qrw = QRoutineWrapper(QRoutine())
+    node_s_ones = qrw.qarray_wires(k, m, "s_1", int)
+    node_s_zeros = qrw.qarray_wires(n - k, m, "s_0", int)
+    node_t_ones = qrw.qarray_wires(k, m, "t_1", int)
+    node_t_zeros = qrw.qarray_wires(n - k, m, "t_0", int)
+    alpha_ones = qrw.qarray_wires(1, m, "a_1", int)
+    alpha_zeros = qrw.qarray_wires(1, m, "a_0", int)
+    wstate_ones = qrw.qarray_wires(k, 1, "w_1", str)
+    wstate_zeros = qrw.qarray_wires(n - k, 1, "w_0", str)
+    qpe_s = qrw.qarray_wires(len_s, 1, "qpe_s", str)
+    sum_reg = qrw.qarray_wires(1, n_qubits_sum, "sum", int)
+
+    qrw.apply(oracle_gate(n, k, m, n_qubits_sum), node_s_ones, sum_reg)
+
+    # walk
+    qrout_step = walk_step(n, k, m, low_width)
+    with qrw.compute():
+        for qw_iter in range(len_s):
+            qrw.apply(qrout_step, qpe_s[qw_iter], node_s_ones, node_s_zeros,
+                      node_t_ones, node_t_zeros, alpha_ones, alpha_zeros,
+                      wstate_ones, wstate_zeros)
+
+        # reset alpha_0/1
+        for j in range(k):
+            qrw.apply(
+                qregs_init.copy_register(m).ctrl(), wstate_ones[j],
+                node_s_ones[j], alpha_ones)
+        for j in range(n - k):
+            qrw.apply(
+                qregs_init.copy_register(m).ctrl(), wstate_zeros[j],
+                node_s_zeros[j], alpha_zeros)
+
+        qrw.apply(generate(k, 1), wstate_ones)
+        qrw.apply(generate(n - k, 1), wstate_zeros)
+        qrw.apply(QFT(len_s), qpe_s)
+    qrw.apply(reflection(len_s), qpe_s)
+    qrw.uncompute()
+    return qrw
+
+
+def parameters(n, k, values: list[int]) -> tuple[int, int, int, int]:
+    """Sizes of the CSSP program: the qubits `m` of each value, the qubits
+    `len_s` of the phase estimation, the qubits `n_qubits_sum` of the sum and
+    the number of external iterations."""
     # Assuming no duplicates
     m = max(values).bit_length()
+    return (m, *_sizes(n, k, m))
+
+
+def _sizes(n, k, m) -> tuple[int, int, int]:
     # the spectral gap of the johnson graph (n, k)
     delta = n / (k * (n - k))
     # 2^s >  \pi/(2 \sqrt(delta)) -> s > log_2(\pi/(2\sqrt(\delta)))
     len_s = int(np.ceil(np.log2(np.pi / (2 * np.sqrt(delta)))))
     # I need to store the sum of k elements, each one having size m qubits
     n_qubits_sum = int(np.ceil(np.log2(k))) + m
+    n_external_iters = int(np.ceil(np.sqrt(comb(n, k))))
+    return len_s, n_qubits_sum, n_external_iters
 
-    sorted_values = sorted(values)
-    prw = ProgramWrapper(Program())
-    dicke = prw.qarray_alloc(n, 1, "dicke", str)
-    node_s_ones = prw.qarray_alloc(k, m, "s_1", int)
-    node_s_zeros = prw.qarray_alloc(n - k, m, "s_0", int)
-    node_t_ones = prw.qarray_alloc(k, m, "t_1", int)
-    node_t_zeros = prw.qarray_alloc(n - k, m, "t_0", int)
-    alpha_ones = prw.qarray_alloc(1, m, "a_1", int)
-    alpha_zeros = prw.qarray_alloc(1, m, "a_0", int)
-    wstate_ones = prw.qarray_alloc(k, 1, "w_1", str)
-    wstate_zeros = prw.qarray_alloc(n - k, 1, "w_0", str)
-
-    qpe_s = prw.qarray_alloc(len_s, 1, "qpe_s", str)
-    sum_reg = prw.qarray_alloc(1, n_qubits_sum, "sum", int)
-    # a, b -> a+b, b
-    for qb in qpe_s:
+
+def _alloc(prw, n, k, m) -> dict[str, list]:
+    """Allocate the registers of the program, the same for all the instances
+    with the same `(n, k, m)`."""
+    len_s, n_qubits_sum, _ = _sizes(n, k, m)
+    shapes = [("dicke", n, 1, str), ("s_1", k, m, int), ("s_0", n - k, m, int),
+              ("t_1", k, m, int), ("t_0", n - k, m, int), ("a_1", 1, m, int),
+              ("a_0", 1, m, int), ("w_1", k, 1, str), ("w_0", n - k, 1, str),
+              ("qpe_s", len_s, 1, str), ("sum", 1, n_qubits_sum, int)]
+    return {
+        name: prw.qarray_alloc(cells, size, name, qtype)
+        for name, cells, size, qtype in shapes
+    }
+
+
+# the registers of the walk, in the order of `external_iteration`
+_WALK_REGS = ("s_1", "s_0", "t_1", "t_0", "a_1", "a_0", "w_1", "w_0")
+
+
+def _apply_head(prw, regs, n, k):
+    for qb in regs["qpe_s"]:
         prw.apply(H, qb)
+    prw.apply(generate(n, k), regs["dicke"])
 
-    # dicke + bix
-    prw.apply(generate(n, k), dicke)
-    prw.apply(bix.bix_data_compile_time(n, m, k, sorted_values), dicke,
-              node_s_ones, node_s_zeros)
-    qrw_update = update(n, k, m, insert)
-    prw.apply(qrw_update, node_s_ones, node_s_zeros, node_t_ones, node_t_zeros,
-              alpha_ones, alpha_zeros, wstate_ones, wstate_zeros)
 
-    # n iterations external
-    n_external_iters = int(np.ceil(np.sqrt(comb(n, k))))
-    for _ in range(n_external_iters):
-        # oracle
-        qf_ora = oracle(n, k, m, n_qubits_sum, target_sum)
-        prw.apply(qf_ora, node_s_ones, sum_reg)
-
-        # walk
-        with prw.compute():
-            for qw_iter in range(len_s):
-                prw.apply(qrw_update.dag(), node_s_ones, node_s_zeros,
-                          node_t_ones, node_t_zeros, alpha_ones, alpha_zeros,
-                          wstate_ones, wstate_zeros)
-                for j in range(k):
-                    prw.apply(X, wstate_ones[j])
-                prw.apply(Z.ctrl(k), qpe_s[qw_iter], wstate_ones)
-                for j in range(k):
-                    prw.apply(X, wstate_ones[j])
-                prw.apply(qrw_update, node_s_ones, node_s_zeros, node_t_ones,
-                          node_t_zeros, alpha_ones, alpha_zeros, wstate_ones,
-                          wstate_zeros)
-
-                # ref b
-                prw.apply(qrw_update.dag(), node_s_zeros, node_s_ones,
-                          node_t_zeros, node_t_ones, alpha_zeros, alpha_ones,
-                          wstate_zeros, wstate_ones)
-                for j in range(n - k):
-                    prw.apply(X, wstate_zeros[j])
-                prw.apply(Z.ctrl(n - k), qpe_s[qw_iter], wstate_zeros)
-                for j in range(k):
-                    prw.apply(X, wstate_zeros[j])
-                prw.apply(qrw_update, node_s_zeros, node_s_ones, node_t_zeros,
-                          node_t_ones, alpha_zeros, alpha_ones, wstate_zeros,
-                          wstate_ones)
-
-            # reset alpha_0/1
-            for j in range(k):
-                prw.apply(
-                    qregs_init.copy_register(m).ctrl(), wstate_ones[j],
-                    node_s_ones[j], alpha_ones)
-            for j in range(n - k):
-                prw.apply(
-                    qregs_init.copy_register(m).ctrl(), wstate_zeros[j],
-                    node_s_zeros[j], alpha_zeros)
-
-            prw.apply(generate(k, 1), wstate_ones)
-            prw.apply(generate(n - k, 1), wstate_zeros)
-            prw.apply(QFT(len_s), qpe_s)
-        # inversion around zero
-        for j in range(len_s):
-            prw.apply(X, qpe_s[j])
-        if len_s > 1:
-            prw.apply(Z.ctrl(len_s - 1), qpe_s)
-        else:
-            prw.apply(Z, qpe_s)
-        for j in range(len_s):
-            prw.apply(X, qpe_s[j])
-        prw.uncompute()
+def _apply_data(prw, regs, n, k, m, values, target_sum):
+    prw.apply(bix.bix_data_compile_time(n, m, k, sorted(values)),
+              regs["dicke"], regs["s_1"], regs["s_0"])
+    _apply_target(prw, regs, n, k, m, target_sum)
+
+
+def _apply_target(prw, regs, n, k, m, target_sum):
+    _, n_qubits_sum, _ = _sizes(n, k, m)
+    prw.apply(load_target(n_qubits_sum, target_sum), regs["sum"])
+
+
+def _apply_tail(prw, regs, n, k, m, low_width, n_external_iters):
+    len_s, n_qubits_sum, _ = _sizes(n, k, m)
+    prw.apply(update_gate(n, k, m, low_width),
+              *[regs[name] for name in _WALK_REGS])
+    # n iterations external, all the same: the iteration is defined once
+    if n_external_iters == 0:
+        return
+    qrw_iter = external_iteration(n, k, m, len_s, n_qubits_sum, low_width)
+    prw.apply(repeat(qrw_iter, n_external_iters),
+              *[regs[name] for name in _WALK_REGS], regs["qpe_s"],
+              regs["sum"])
+
 
+def build(n,
+          k,
+          values: list[int],
+          target_sum: int,
+          low_width=True,
+          n_external_iters=None):
+    """Build the CSSP program, returning its `ProgramWrapper`.
+    `n_external_iters` defaults to the square root of the number of nodes of
+    the Johnson graph.
+
+    Only the loading of the values (BIX) and of the target depend on the
+    data: see `build_circuit` to compile only them."""
+    m, _, _, default_iters = parameters(n, k, values)
+    if n_external_iters is None:
+        n_external_iters = default_iters
+    prw = ProgramWrapper(Program())
+    regs = _alloc(prw, n, k, m)
+    _apply_head(prw, regs, n, k)
+    _apply_data(prw, regs, n, k, m, values, target_sum)
+    _apply_tail(prw, regs, n, k, m, low_width, n_external_iters)
+    _apply_target(prw, regs, n, k, m, target_sum)
+    return prw
+
+
+def skeleton(n, k, m, part, low_width=True, n_external_iters=None):
+    """The data independent `part` of the program, "head" (the phase
+    estimation and Dicke states) or "tail" (the update and the external
+    iterations), on the registers of `build`."""
+    if n_external_iters is None:
+        n_external_iters = _sizes(n, k, m)[2]
+    prw = ProgramWrapper(Program())
+    regs = _alloc(prw, n, k, m)
+    if part == "head":
+        _apply_head(prw, regs, n, k)
+    elif part == "tail":
+        _apply_tail(prw, regs, n, k, m, low_width, n_external_iters)
+    else:
+        raise ValueError(f"unknown part {part}, expected head or tail")
+    return prw
+
+
+def _data_segment(n, k, m, values, target_sum, load_values):
+    prw = ProgramWrapper(Program())
+    regs = _alloc(prw, n, k, m)
+    if load_values:
+        _apply_data(prw, regs, n, k, m, values, target_sum)
+    else:
+        _apply_target(prw, regs, n, k, m, target_sum)
+    return prw
+
+
+@functools.lru_cache(maxsize=16)
+def _compiled_skeleton(n, k, m, part, low_width, n_external_iters):
+    return skeleton(n, k, m, part, low_width,
+                    n_external_iters).to_circ(link=LINK)
+
+
+def build_circuit(n,
+                  k,
+                  values: list[int],
+                  target_sum: int,
+                  low_width=True,
+                  n_external_iters=None,
+                  cache: Optional[CircuitCache] = None) -> CachedCircuit:
+    """The compiled circuit of `build` and its register map, compiling only
+    the data dependent segments: the skeleton of each `(n, k, m)` is
+    compiled once per process, or once for all if `cache` is given, and the
+    segments are spliced into it."""
+    m, _, _, default_iters = parameters(n, k, values)
+    if n_external_iters is None:
+        n_external_iters = default_iters
+    args = (n, k, m)
+    if cache is None:
+        head, tail = (_compiled_skeleton(*args, part, low_width,
+                                         n_external_iters)
+                      for part in ("head", "tail"))
+    else:
+        head, tail = (cache.build(skeleton,
+                                  *args,
+                                  part,
+                                  low_width,
+                                  n_external_iters,
+                                  link=LINK).circuit
+                      for part in ("head", "tail"))
+    data = _data_segment(*args, values, target_sum, True)
+    registers = data._qregnames_to_properties
+    segments = [
+        head,
+        data.to_circ(link=LINK), tail,
+        _data_segment(*args, values, target_sum, False).to_circ(link=LINK)
+    ]
+    # the segments have the same qubits, but not the same ancillae: an idle
+    # qubit more does not change a segment. The skeletons are shared with the
+    # next calls, so copies are padded
+    width = max(circ.nbqbits for circ in segments)
+    segments = [copy.copy(circ) for circ in segments]
+    for circ in segments:
+        circ.nbqbits = width
+    circ = segments[0]
+    for segment in segments[1:]:
+        circ = circ + segment
+    return CachedCircuit(circ, registers)
+
+
+def main(n,
+         k,
+         values: list[int],
+         target_sum: int,
+         low_width=True,
+         to_simulate=False,
+         cache: Optional[CircuitCache] = None):
+    """Print the registers and the resources of the program, and simulate
+    it if `to_simulate`. With a `cache`, the program is built and compiled
+    only if missing, and the resources are the ones of the cached circuit."""
+    if cache is None:
+        prw = build(n, k, values, target_sum, low_width)
+        registers = prw._qregnames_to_properties
+        # the flat circuit is needed only to simulate
+        resources = estimate_resources(prw, link=LINK)
+    else:
+        cr, registers = cache.build(build,
+                                    n,
+                                    k,
+                                    values,
+                                    target_sum,
+                                    low_width,
+                                    link=LINK)
+        resources = circuit_resources(
+            cr, max(v.slic.stop for v in registers.values()))
     print("Program qubits")
-    for k, v in prw._qregnames_to_properties.items():
-        print(k, v.slic)
-    cr = prw.to_circ(link=[classarith, cuccaro_arith])
-    print(cr.statistics())
-    job = cr.to_job(qubits=[*node_s_ones])
+    for name, v in registers.items():
+        print(name, v.slic)
+    print(resources)
     if to_simulate:
+        if cache is None:
+            cr = prw.to_circ(link=LINK)
+        node_s_ones = registers["s_1"].slic
+        job = cr.to_job(
+            qubits=list(range(node_s_ones.start, node_s_ones.stop)))
         res = QPU.submit(job)
         for sample in res:
             print(sample.probability, sample.state)
 
 
 if __name__ == '__main__':
+    import os
     import sys
     to_simulate = bool(sys.argv[1])
     print(f"To simulate is {to_simulate}")
@@ -198,4 +444,12 @@ if __name__ == '__main__':
     m = max(values).bit_length()
     ts = 3
     print(f"n {n}, k {k}, m {m}, values {values}, target sum = {ts}")
-    main(n, k, values, ts, low_width=True, to_simulate=to_simulate)
+    # the compiled circuits are cached only if asked, in the directory given
+    cache_directory = os.environ.get("QATEXT_CIRCUIT_CACHE")
+    main(n,
+         k,
+         values,
+         ts,
+         low_width=True,
+         to_simulate=to_simulate,
+         cache=CircuitCache(cache_directory) if cache_directory else None)
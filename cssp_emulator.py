@@ -0,0 +1,158 @@
+"""Classical emulation of the CSSP walk, without building the circuit.
+
+After `update` the registers hold an edge of the Johnson graph J(n, k): the
+node `t` the walk started from, the indexes `j` of the element leaving the
+ones and `l` of the element leaving the zeros (the W states), and the
+neighbour `s` obtained by swapping them. Every other register is a function
+of `(t, j, l)`, so the program lives in the space of `(q, t, j, l)`, `q` being
+the value of the phase estimation register:
+
+- the oracle flips the sign of the edges whose neighbour `s` sums to the
+  target;
+- the reflection on the ones of `walk_step` is `I - 2 P_j`, `P_j` being the
+  projector on the uniform superposition of `j` for fixed `(t, l)`, and the
+  one on the zeros is `I - 2 P_l`; both are controlled by a qubit of `q`, so
+  the walk applies `(R_l R_j)^popcount(q)`;
+- the alpha reset, the W states and the QFT of `external_iteration` commute
+  with the reflection around zero of `q`, which is then the reflection
+  around the uniform superposition of `q` conjugated by the walk.
+
+None of these moves `t`, so each node evolves on its own, and its evolution
+only depends on its marked edges. As the values are distinct, a node has at
+most one marked edge per `j` and per `l`: up to permutations of `j` and `l`,
+which commute with the walk, the marked edges are the first `r` of the
+diagonal, and the permutations of `j` and `l` fixing them leave the state
+of the node unchanged: it is constant on 5 classes of edges per value of
+`q`. The emulation restricts an iteration to these classes, a real matrix of
+size `5 * 2^len_s` per `r`, then applies it to the state of each `r`,
+weighted with the number of nodes having `r` marked edges, counted by
+dynamic programming. It reaches `n` in the dozens: for `n = 40, k = 20` the
+371278 iterations take a few seconds.
+"""
+from math import comb
+
+import numpy as np
+
+import cssp
+
+
+def marked_edges_count(values: list[int], k: int,
+                       target_sum: int) -> np.ndarray:
+    """`res[r]` is the number of nodes (`k`-subsets of the distinct
+    `values`) with exactly `r` neighbours summing to `target_sum`."""
+    values = sorted(values)
+    n = len(values)
+    res = np.zeros(min(k, n - k) + 1, dtype=np.int64)
+    present = set(values)
+    # the neighbour obtained swapping x in the node with y out of it sums to
+    # the target iff y - x = d, d being the target minus the sum of the node
+    for d in sorted({y - x for x in values for y in values if x != y}):
+        if target_sum - d >= 0:
+            res += _nodes_by_edges(values, present, k, target_sum - d, d)
+    res[0] = comb(n, k) - res[1:].sum()
+    return res
+
+
+def _nodes_by_edges(values: list[int], present: set, k: int, node_sum: int,
+                    d: int) -> np.ndarray:
+    """Number of `k`-subsets summing to `node_sum` with `r` elements `x` in
+    the subset such that `x + d` is a value out of it, for each `r`."""
+    nr = min(k, len(values) - k) + 1
+    # the values x, x + d, x + 2d, ... form a chain
+    chains = []
+    for x in sorted(values, key=lambda v: v if d > 0 else -v):
+        if x - d in present:
+            continue
+        chain = [x]
+        while chain[-1] + d in present:
+            chain.append(chain[-1] + d)
+        chains.append(chain)
+    # counts[b, c, s, r]: last element of the chain in the subset if b,
+    # c elements summing to s, r pairs in the subset and out of it
+    counts = np.zeros((2, k + 1, node_sum + 1, nr + 1), dtype=np.int64)
+    counts[0, 0, 0, 0] = 1
+    for chain in chains:
+        counts[0] += counts[1]
+        counts[1] = 0
+        for x in chain:
+            new = np.zeros_like(counts)
+            if x <= node_sum:
+                new[1, 1:, x:] = counts[0, :-1, :-x or None] + \
+                    counts[1, :-1, :-x or None]
+            new[0] = counts[0]
+            new[0, :, :, 1:] += counts[1, :, :, :-1]
+            counts = new
+    total = counts[0, k, node_sum] + counts[1, k, node_sum]
+    return total[:nr]
+
+
+def _walk(blocks: np.ndarray, popcounts: np.ndarray, inverse: bool = False):
+    """Apply `(R_l R_j)^popcount(q)` to the slice `q` of `blocks`, of shape
+    `(..., 2^len_s, k, n - k)`, or its inverse, in place."""
+    axes = (-1, -2) if inverse else (-2, -1)
+    for c in range(1, popcounts.max(initial=0) + 1):
+        selected = blocks[..., popcounts >= c, :, :]
+        for axis in axes:
+            selected -= 2 * selected.mean(axis=axis, keepdims=True)
+        blocks[..., popcounts >= c, :, :] = selected
+
+
+def _iteration(blocks: np.ndarray, sign: np.ndarray, popcounts: np.ndarray):
+    """One external iteration, in place: the oracle, then the reflection
+    around the uniform superposition of `q` conjugated by the walk."""
+    blocks *= sign
+    _walk(blocks, popcounts)
+    blocks -= 2 * blocks.mean(axis=-3, keepdims=True)
+    _walk(blocks, popcounts, inverse=True)
+
+
+def _classes(k: int, n: int, r: int) -> np.ndarray:
+    """Masks of the classes of the edges `(j, l)` of a node with `r` marked
+    edges, on the diagonal: marked, both ends of different marked edges,
+    only `j` or only `l` in a marked edge, neither."""
+    j, l = np.indices((k, n - k))
+    in_j, in_l = j < r, l < r
+    return np.array([in_j & (j == l), in_j & in_l & (j != l), in_j & ~in_l,
+                     ~in_j & in_l, ~in_j & ~in_l])
+
+
+def emulate(n: int,
+            k: int,
+            values: list[int],
+            target_sum: int,
+            n_external_iters=None) -> np.ndarray:
+    """Probability that the ones of the node hold `k` values summing to
+    `target_sum`, before the first external iteration and after each of
+    them; `n_external_iters` defaults to the one of `cssp.build`."""
+    if len(values) != n or len(set(values)) != n:
+        raise ValueError(f"{n} distinct values are needed, got {values}")
+    _, len_s, _, default_iters = cssp.parameters(n, k, values)
+    if n_external_iters is None:
+        n_external_iters = default_iters
+    nodes = marked_edges_count(values, k, target_sum)
+    nr, nq = len(nodes), 1 << len_s
+    popcounts = np.array([bin(q).count("1") for q in range(nq)])
+    # the permutations of j and l fixing the marked edges commute with the
+    # iteration, which then preserves the vectors constant on each class of
+    # edges: basis[r, q * 5 + c] is the normalized class c of the slice q
+    classes = np.array([_classes(k, n, r) for r in range(nr)])
+    sizes = classes.sum(axis=(2, 3))
+    unit = classes / np.sqrt(np.maximum(sizes, 1))[:, :, None, None]
+    basis = np.zeros((nr, nq, 5, nq, k, n - k))
+    for q in range(nq):
+        basis[:, q, :, q] = unit
+    basis = basis.reshape(nr, nq * 5, nq, k, n - k)
+    sign = np.where(classes[:, None, 0], -1.0, 1.0)[:, None]
+    images = basis.copy()
+    _iteration(images, sign, popcounts)
+    # the iteration restricted to the classes
+    matrices = np.einsum("rainm,rbinm->rab", basis, images)
+    amps = np.tile(np.sqrt(sizes / (nq * k * (n - k))), nq)
+    weights = nodes / comb(n, k)
+    res = np.zeros(n_external_iters + 1)
+    for i in range(n_external_iters + 1):
+        if i:
+            amps = np.einsum("rab,rb->ra", matrices, amps)
+        # the marked edges are the class 0 of each slice
+        res[i] = weights @ (amps[:, ::5]**2).sum(axis=1)
+    return res
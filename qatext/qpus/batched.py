@@ -0,0 +1,245 @@
+"""Bit-sliced reversible simulation of many basis inputs at once.
+
+Differently from :class:`~qatext.qpus.reversible.RProgram`, which pushes a
+single bitstring through the circuit, here every bit of the circuit is a row
+of uint64 words, and lane `j` of the rows is an independent input. A gate is
+then a handful of bitwise operations on whole rows, acting on 64 inputs per
+word.
+
+The circuit is first compiled into a tape, a list of `(RGate, ctrls,
+trgts)` tuples; the tape is a plain Python object, so it can be built once
+and shipped to other processes. A block repeated with
+`qatext.utils.qatmgmt.repeat` is kept as a single `(RGate.REPEAT, (times, ),
+body)` operation by `compile_program`, `body` being itself a tape.
+
+Compiled with `base_gates=PHASE_GATES`, a tape also holds Z, CSIGN and
+multi-controlled Z as `RGate.Z` operations: they leave the bits unchanged
+and flip the sign of the lanes having all their bits set, accumulated in
+`BatchedRProgram.phases`. A diagonal oracle then yields its whole +1/-1
+phase vector over a batch of basis inputs in one run.
+"""
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Optional, Sequence
+
+import numpy as np
+from qat.lang.AQASM.program import Program
+from qatext.qpus.reversible import RGate, base_gate_name
+from qatext.utils.bits.combinatorics import bitslice, unbitslice
+from qatext.utils.qatmgmt.program import ProgramWrapper
+from qatext.utils.qatmgmt.repeat import repeated
+
+if TYPE_CHECKING:
+    from qat.core.wrappers.circuit import Circuit
+
+LOGGER = logging.getLogger(__name__)
+
+TapeOp = tuple[RGate, tuple[int, ...], tuple]
+
+_BASE_GATES = {"X": RGate.NOT, "NOT": RGate.NOT, "SWAP": RGate.SWAP,
+               "I": RGate.I}
+# the reversible gates and Z, whose controlled versions include CSIGN
+PHASE_GATES = {**_BASE_GATES, "Z": RGate.Z}
+
+
+def compile_tape(circ: "Circuit",
+                 base_gates: Optional[dict] = None) -> list[TapeOp]:
+    """Compile a circuit made of X, SWAP, I (and their controlled versions)
+    and resets into a tape. Gates defined by a circuit implementation are
+    expanded; any other gate raises an AttributeError.
+
+    `base_gates` maps the name of each accepted base gate to the tape
+    operation it becomes; it defaults to the reversible gates."""
+    base_gates = _BASE_GATES if base_gates is None else base_gates
+    tape: list[TapeOp] = []
+    _compile_into(tape, circ, circ, list(range(circ.nbqbits)), base_gates)
+    return tape
+
+
+def _compile_into(tape: list[TapeOp], top_circ, operation_circ,
+                  qbits: Sequence[int], base_gates: dict):
+    for op in operation_circ:
+        op_qbits = tuple(qbits[q] for q in op.qbits)
+        if op.gate is None:
+            if op.type == 1:
+                # measure operation, NOP
+                continue
+            if op.type == 2:
+                for q in op_qbits:
+                    tape.append((RGate.RESET, (), (q, )))
+                continue
+            raise AttributeError(f"Unsupported operation type {op.type}")
+        subcirc = top_circ.gateDic[op.gate].circuit_implementation
+        if subcirc is not None:
+            _compile_into(tape, top_circ, subcirc, op_qbits, base_gates)
+            continue
+        basename, nbctrls = base_gate_name(top_circ.gateDic, op.gate)
+        if basename not in base_gates:
+            raise AttributeError(
+                f"Gates accepted: {', '.join(base_gates)} and their"
+                f" controlled versions, got {op.gate} ({basename})")
+        tape.append((base_gates[basename], op_qbits[:nbctrls],
+                     op_qbits[nbctrls:]))
+
+
+def compile_program(program,
+                    link: Optional[list] = None) -> tuple[list[TapeOp], int]:
+    """Compile a `Program` into a tape, one operation at a time, returning
+    the tape and the number of bits it needs.
+
+    Each distinct gate is compiled once, and a gate built by `repeat` becomes
+    a REPEAT operation on the tape of its body, instead of its flat
+    expansion. The ancillae of all the operations share the bits following
+    the ones of the program."""
+    if isinstance(program, ProgramWrapper):
+        program = program._program
+    nqbits = program.qbit_count
+    # by id of the gate: the gate, kept alive, its tape and width
+    compiled: dict[int, tuple[object, list[TapeOp], int]] = {}
+    tape: list[TapeOp] = []
+    nbits = nqbits
+    for op in program.op_list:
+        if op.gate is None:
+            raise AttributeError(f"Unsupported operation {op}")
+        qbits = list(op.qbits)
+        gate_tape, width = _compile_gate(op.gate, len(qbits), link, compiled)
+        # the ancillae of the gate follow the qubits of the program
+        wires = qbits + list(range(nqbits, nqbits + width - len(qbits)))
+        tape.extend(_remap(gate_tape, wires))
+        nbits = max(nbits, nqbits + width - len(qbits))
+    return tape, nbits
+
+
+def _compile_gate(gate, arity: int, link: Optional[list],
+                  compiled: dict) -> tuple[list[TapeOp], int]:
+    """Tape of `gate` applied on the first `arity` bits, its ancillae
+    following them, and the number of bits it uses."""
+    if id(gate) in compiled:
+        return compiled[id(gate)][1:]
+    repetition = repeated(gate)
+    if repetition is not None:
+        body, times = repetition
+        body_tape, width = _compile_gate(body, arity, link, compiled)
+        gate_tape = [(RGate.REPEAT, (times, ), tuple(body_tape))]
+    else:
+        pr = Program()
+        pr.apply(gate, pr.qalloc(arity))
+        circ = pr.to_circ(link=link, inline=True)
+        gate_tape, width = compile_tape(circ), circ.nbqbits
+    compiled[id(gate)] = gate, gate_tape, width
+    return gate_tape, width
+
+
+def _remap(tape: Sequence[TapeOp], wires: Sequence[int]) -> list[TapeOp]:
+    res = []
+    for gate, ctrls, trgts in tape:
+        if gate == RGate.REPEAT:
+            res.append((gate, ctrls, tuple(_remap(trgts, wires))))
+        else:
+            res.append((gate, tuple(wires[q] for q in ctrls),
+                        tuple(wires[q] for q in trgts)))
+    return res
+
+
+def invert_tape(tape: Sequence[TapeOp]) -> list[TapeOp]:
+    """Inverse of a tape: all the reversible gates are self-inverse, so it is
+    the same tape backwards, repeated blocks being inverted in turn. Resets
+    cannot be inverted."""
+    res = []
+    for gate, ctrls, trgts in reversed(tape):
+        if gate == RGate.RESET:
+            raise ValueError("a tape with resets cannot be inverted")
+        if gate == RGate.REPEAT:
+            trgts = tuple(invert_tape(trgts))
+        res.append((gate, ctrls, trgts))
+    return res
+
+
+class BatchedRProgram:
+    """A batch of `size` reversible registers of `nbits` bits each, stored
+    bit-sliced: `rows[i]` holds bit `i` of every input. Bit `j` of `phases`
+    is set iff the phase of lane `j` is -1."""
+
+    def __init__(self, nbits: int, size: int):
+        self.nbits = nbits
+        self.size = size
+        words = -(-size // 64)
+        self.rows = np.zeros((nbits, words), dtype=np.uint64)
+        # lanes actually used: the last word can be partially filled
+        self.lanes = bitslice(np.full(size, 1), 1)[0]
+        self.phases = np.zeros(words, dtype=np.uint64)
+
+    def set_ints(self, qbits: Sequence[int], values: np.ndarray):
+        """Load `values[j]` in lane `j` of `qbits`, `qbits[0]` being the
+        least significant bit."""
+        self.rows[list(qbits)] = bitslice(values, len(qbits))
+
+    def get_ints(self, qbits: Sequence[int]) -> np.ndarray:
+        """Inverse of `set_ints`."""
+        return unbitslice(self.rows[list(qbits)], self.size)
+
+    def set_bits(self, qbits: Sequence[int], bits: np.ndarray):
+        """Load the 0/1 matrix `bits`, one row per input and one column per
+        qubit of `qbits`."""
+        bits = np.asarray(bits, dtype=np.uint8)
+        words = self.rows.shape[1]
+        packed = np.zeros((len(qbits), words * 8), dtype=np.uint8)
+        packed[:, :-(-self.size // 8)] = np.packbits(bits.T,
+                                                      axis=1,
+                                                      bitorder="little")
+        self.rows[list(qbits)] = packed.view("<u8")
+
+    def get_bits(self, qbits: Sequence[int]) -> np.ndarray:
+        """Inverse of `set_bits`."""
+        rows = np.ascontiguousarray(self.rows[list(qbits)], dtype="<u8")
+        bits = np.unpackbits(rows.view(np.uint8), axis=1, bitorder="little")
+        return bits[:, :self.size].T
+
+    def differing_lanes(self, rows: np.ndarray) -> np.ndarray:
+        """Boolean array telling for each input if its bits differ from the
+        ones stored in `rows`, a previous copy of `self.rows`."""
+        acc = np.bitwise_or.reduce(self.rows ^ rows, axis=0)
+        return unbitslice(acc[None, :], self.size).astype(bool)
+
+    def nonzero_lanes(self, qbits: Sequence[int]) -> np.ndarray:
+        """Boolean array telling for each input if any of `qbits` is 1."""
+        if len(qbits) == 0:
+            return np.zeros(self.size, dtype=bool)
+        acc = np.bitwise_or.reduce(self.rows[list(qbits)], axis=0)
+        return unbitslice(acc[None, :], self.size).astype(bool)
+
+    def signs(self) -> np.ndarray:
+        """The +1/-1 phase of each input."""
+        return 1 - 2 * unbitslice(self.phases[None, :], self.size)
+
+    def run(self, tape: Sequence[TapeOp]):
+        """Apply all the operations of the tape to every lane."""
+        rows = self.rows
+        for gate, ctrls, trgts in tape:
+            if gate == RGate.REPEAT:
+                for _ in range(ctrls[0]):
+                    self.run(trgts)
+                continue
+            if len(ctrls) == 0:
+                mask = self.lanes
+            elif len(ctrls) == 1:
+                mask = rows[ctrls[0]]
+            elif len(ctrls) == 2:
+                mask = rows[ctrls[0]] & rows[ctrls[1]]
+            else:
+                mask = np.bitwise_and.reduce(rows[list(ctrls)], axis=0)
+            if gate == RGate.NOT:
+                rows[trgts[0]] ^= mask
+            elif gate == RGate.SWAP:
+                diff = (rows[trgts[0]] ^ rows[trgts[1]]) & mask
+                rows[trgts[0]] ^= diff
+                rows[trgts[1]] ^= diff
+            elif gate == RGate.RESET:
+                rows[trgts[0]] = 0
+            elif gate == RGate.I:
+                pass
+            elif gate == RGate.Z:
+                self.phases ^= mask & rows[trgts[0]]
+            else:
+                raise AttributeError(f"Unknown tape operation {gate}")
@@ -26,12 +26,38 @@ LOGGER = logging.getLogger(__name__)
 
 
 class RGate(Enum):
-    """Reversible Gate: NOT, SWAP or RESET."""
+    """Reversible Gate: NOT, SWAP or RESET. REPEAT marks a repeated block in
+    the tapes of the batched engine. Z flips the phase of the inputs having
+    all its bits set, when phases are tracked."""
 
     NOT = auto()
     SWAP = auto()
     RESET = auto()
     I = auto()
+    REPEAT = auto()
+    Z = auto()
+
+
+def resolve_gate(gate_dic, gatename: str) -> tuple[str, int]:
+    """Follow the chain of controlled definitions of `gatename` in the gate
+    dictionary of a circuit, returning the key of the base gate and the
+    total number of controls. E.g. `CCNOT` is a controlled `CNOT`, which is
+    a controlled `X`."""
+    nbctrls = 0
+    gate = gate_dic[gatename]
+    while gate.nbctrls:
+        nbctrls += gate.nbctrls
+        gatename = gate.subgate
+        gate = gate_dic[gatename]
+    return gatename, nbctrls
+
+
+def base_gate_name(gate_dic, gatename: str) -> tuple[str, int]:
+    """`resolve_gate`, the base gate being named as in its syntax if it has
+    one, e.g. Z for `CSIGN` or `Z.ctrl(3)`."""
+    gatename, nbctrls = resolve_gate(gate_dic, gatename)
+    syntax = gate_dic[gatename].syntax
+    return (gatename if syntax is None else syntax.name), nbctrls
 
 
 class RProgram:
@@ -39,15 +65,21 @@ class RProgram:
 
     Differently from it, when you call the apply function, the
     reversible gate is immediately applied onto the reversible bit.
+
+    With `track_phase`, Z and its controlled versions (CSIGN, multi-controlled
+    Z) are accepted too: they leave the bits unchanged and flip `phase`, the
+    +1/-1 sign of the basis state, when all their bits are set.
     """
 
     rev_gate_names = ("X", "NOT", "SWAP", "I")
 
-    def __init__(self):
+    def __init__(self, track_phase: bool = False):
         self.ops = [
         ]  # should contain the list of operations for logging purposes
         self.rbits: bitarray = bitarray()
         self.rregs: dict[str, QRegsProperties] = {}
+        self.track_phase = track_phase
+        self.phase = 1
 
     def ralloc(self, n=1, name: Optional[str] = None):
         """Allocate a register of `n` reversible bits.
@@ -82,6 +114,8 @@ class RProgram:
             ntrgts = 1
         elif gate == RGate.I:
             ntrgts = 1
+        elif gate == RGate.Z:
+            ntrgts = 1
         trgts = rbits[-1:-1 * ntrgts - 1:-1]
         ctrls = rbits[:len(rbits) - ntrgts]
         # arity = len(rbits) - ntrgts
@@ -111,6 +145,9 @@ class RProgram:
             self.rbits[trgts[0]] = 0
         elif gate == RGate.I:
             pass
+        elif gate == RGate.Z:
+            if self.rbits[trgts[0]]:
+                self.phase = -self.phase
 
     def _apply_gate_from_name(self, gatename: str, rbits: Sequence[int]):
         """Apply a gate given the gatename.
@@ -169,12 +206,14 @@ class RProgram:
     def circuit_to_rprogram(
         cls,
         qcirc: Circuit,
-        qregs_properties: dict[str, QRegsProperties] = dict()
+        qregs_properties: dict[str, QRegsProperties] = dict(),
+        track_phase: bool = False,
     ) -> RProgram:
         """Convert a qat Circuit object to a reversible program
         :class:`~qatext.qpus.reversible.RProgram`, applying all the
-        operations contained."""
-        rprogram = RProgram()
+        operations contained. With `track_phase`, the phase gates are
+        applied too (see :class:`RProgram`)."""
+        rprogram = RProgram(track_phase)
         # qreg_names_inv = dict((v, k) for k, v in reg_names.items())
         qreg_slices_to_names: dict[slice, str] = {}
         for name, qreg_properties in qregs_properties.items():
@@ -219,6 +258,10 @@ class RProgram:
             if subcirc is not None:
                 # subcirc can be applied to a different subset of qubits
                 self.apply_gates_from_circuit(top_circ, subcirc)
+            elif (self.track_phase and base_gate_name(
+                    top_circ.gateDic, gatename)[0] == "Z"):
+                # symmetric: any of its bits can be the target
+                self.apply(RGate.Z, *op.qbits)
             else:
                 if not gatename.endswith(self.rev_gate_names):
                     if gatename.startswith("_"):
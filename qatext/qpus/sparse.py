@@ -0,0 +1,138 @@
+"""Sparse state-vector simulation.
+
+Only the basis states with a nonzero amplitude are stored: the keys are the
+rows of a `(size, words)` uint64 matrix, bit `q` of the state being bit `q %
+64` of word `q // 64`, so the number of qubits is not bounded by the width
+of a machine integer. The circuits of this repo are mostly reversible, so
+the support of their states stays small even when the dense state vector
+would not fit in memory, e.g. the CSSP program on dozens of qubits.
+
+A gate whose matrix has a single nonzero entry per column (X, SWAP, Z, phases
+and their controlled versions) permutes the keys in place; any other gate
+(H, RY, ...) produces the combinations of the selected keys, which are
+merged and the ones whose amplitude vanishes dropped.
+"""
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Sequence
+
+import numpy as np
+from qatext.qpus.reversible import resolve_gate
+
+if TYPE_CHECKING:
+    from qat.core.wrappers.circuit import Circuit
+
+LOGGER = logging.getLogger(__name__)
+
+# amplitudes below this modulus are dropped
+EPS = 1e-12
+
+
+def _gate_matrix(gate_dic, gatename: str) -> tuple[np.ndarray, int]:
+    """Matrix of the base gate of `gatename` and its total number of
+    controls, see `reversible.resolve_gate`."""
+    basename, nbctrls = resolve_gate(gate_dic, gatename)
+    gate = gate_dic[basename]
+    if gate.matrix is None:
+        raise AttributeError(f"Gate {gatename} has no matrix")
+    mat = gate.matrix
+    data = np.array([complex(c.re, c.im) for c in mat.data])
+    return data.reshape(mat.nRows, mat.nCols), nbctrls
+
+
+class SparseState:
+    """The state of `nbqbits` qubits, initially all zeros."""
+
+    def __init__(self, nbqbits: int):
+        self.nbqbits = nbqbits
+        self.keys = np.zeros((1, max(1, -(-nbqbits // 64))), dtype=np.uint64)
+        self.amps = np.ones(1, dtype=complex)
+
+    def __len__(self) -> int:
+        return len(self.amps)
+
+    def _bits(self, keys: np.ndarray, q: int) -> np.ndarray:
+        return (keys[:, q >> 6] >> np.uint64(q & 63)) & np.uint64(1)
+
+    def _values(self, keys: np.ndarray, qbits: Sequence[int]) -> np.ndarray:
+        """Integer held by `qbits` in each key, `qbits[0]` being the most
+        significant bit as in qat."""
+        values = np.zeros(len(keys), dtype=np.int64)
+        for q in qbits:
+            values = (values << 1) | self._bits(keys, q).astype(np.int64)
+        return values
+
+    def _set_values(self, keys: np.ndarray, qbits: Sequence[int],
+                    values: np.ndarray):
+        for i, q in enumerate(reversed(qbits)):
+            bit = ((values >> i) & 1).astype(np.uint64)
+            word, shift = q >> 6, np.uint64(q & 63)
+            keys[:, word] &= ~(np.uint64(1) << shift)
+            keys[:, word] |= bit << shift
+
+    def apply(self, matrix: np.ndarray, ctrls: Sequence[int],
+              trgts: Sequence[int]):
+        """Apply `matrix` on `trgts`, controlled by `ctrls`."""
+        selected = np.ones(len(self), dtype=bool)
+        for q in ctrls:
+            selected &= self._bits(self.keys, q).astype(bool)
+        if not selected.any():
+            return
+        keys, amps = self.keys[selected], self.amps[selected]
+        values = self._values(keys, trgts)
+        nonzero = np.abs(matrix) > EPS
+        if (nonzero.sum(axis=0) == 1).all():
+            rows = nonzero.argmax(axis=0)
+            self._set_values(keys, trgts, rows[values])
+            self.keys[selected] = keys
+            self.amps[selected] = amps * matrix[rows[values], values]
+            return
+        dim = len(matrix)
+        new_keys = np.repeat(keys, dim, axis=0)
+        new_values = np.tile(np.arange(dim), len(keys))
+        self._set_values(new_keys, trgts, new_values)
+        new_amps = (matrix[:, values].T * amps[:, None]).ravel()
+        uniq, inverse = np.unique(new_keys, axis=0, return_inverse=True)
+        merged = np.zeros(len(uniq), dtype=complex)
+        np.add.at(merged, inverse.ravel(), new_amps)
+        kept = np.abs(merged) > EPS
+        self.keys = np.concatenate([self.keys[~selected], uniq[kept]])
+        self.amps = np.concatenate([self.amps[~selected], merged[kept]])
+
+    def run(self, circ: "Circuit"):
+        """Apply all the gates of the flattened `circ`; measures and resets
+        are not supported."""
+        if circ.nbqbits > self.nbqbits:
+            raise ValueError(f"the circuit has {circ.nbqbits} qubits, the "
+                             f"state only {self.nbqbits}")
+        matrices: dict[str, tuple[np.ndarray, int]] = {}
+        for op in circ:
+            if op.gate is None:
+                raise AttributeError(f"Unsupported operation type {op.type}")
+            if op.gate not in matrices:
+                matrices[op.gate] = _gate_matrix(circ.gateDic, op.gate)
+            matrix, nbctrls = matrices[op.gate]
+            self.apply(matrix, op.qbits[:nbctrls], op.qbits[nbctrls:])
+        LOGGER.debug("%d basis states after the circuit", len(self))
+
+    def probabilities(self, qbits: Sequence[int]) -> dict[int, float]:
+        """Distribution of the integer held by `qbits`, the first one being
+        the most significant bit."""
+        values = self._values(self.keys, qbits)
+        probs = np.bincount(values, weights=np.abs(self.amps)**2)
+        return {v: p for v, p in enumerate(probs) if p > EPS}
+
+    def to_dense(self) -> np.ndarray:
+        """The dense state vector, in the order of qat: qubit 0 is the most
+        significant bit of the index."""
+        res = np.zeros(1 << self.nbqbits, dtype=complex)
+        res[self._values(self.keys, range(self.nbqbits))] = self.amps
+        return res
+
+
+def simulate(circ: "Circuit") -> SparseState:
+    """Sparse state of `circ` applied to the all zeros state."""
+    state = SparseState(circ.nbqbits)
+    state.run(circ)
+    return state
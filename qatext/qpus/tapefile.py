@@ -0,0 +1,178 @@
+"""Compact binary files of reversible tapes, loaded with `np.memmap`.
+
+A tape of `qatext.qpus.batched` is a list of Python tuples, about a hundred
+bytes per operation; the flat tape of a large CSSP instance has millions of
+them. On disk, each operation is instead a fixed-width record:
+
+- `op`, the value of the `RGate`;
+- `nctrls` and `ntrgts`, the number of controls and targets used;
+- `ctrls`, `max_ctrls` uint32 bit indexes, the unused ones zero;
+- `trgts`, 2 uint32 bit indexes.
+
+A block repeated `times` times is a REPEAT record, with `trgts = (times,
+length)`, followed by the `length` records of its body.
+
+The file starts with the magic string, then the length of a JSON header,
+which holds the format version, the number of bits and of records,
+`max_ctrls` and the register map (name -> `[start, stop]`), then the records,
+aligned on 8 bytes. `read_tape` maps the records without reading them, so
+the processes of a pool share the pages of the same file, and
+`MappedTape.ops` decodes them a chunk at a time: `BatchedRProgram.run` can
+stream a tape larger than the memory.
+"""
+import json
+from typing import Iterator, NamedTuple, Optional, Sequence
+
+import numpy as np
+from qatext.qpus.batched import TapeOp
+from qatext.qpus.reversible import RGate
+
+MAGIC = b"QATTAPE\0"
+VERSION = 1
+_UINT32_MAX = (1 << 32) - 1
+
+
+def record_dtype(max_ctrls: int) -> np.dtype:
+    """The dtype of the records of a file with `max_ctrls` controls."""
+    return np.dtype([("op", "u1"), ("nctrls", "u1"), ("ntrgts", "u1"),
+                     ("ctrls", "<u4", (max_ctrls, )), ("trgts", "<u4", (2, ))],
+                    align=False)
+
+
+def _max_ctrls(tape: Sequence[TapeOp]) -> int:
+    res = 0
+    for gate, ctrls, trgts in tape:
+        if gate == RGate.REPEAT:
+            res = max(res, _max_ctrls(trgts))
+        else:
+            res = max(res, len(ctrls))
+    return res
+
+
+def _count(tape: Sequence[TapeOp]) -> int:
+    return sum(1 + (_count(trgts) if gate == RGate.REPEAT else 0)
+               for gate, _, trgts in tape)
+
+
+def _fill(records: np.ndarray, start: int, tape: Sequence[TapeOp]) -> int:
+    """Write `tape` from `records[start]`, returning the next index."""
+    i = start
+    for gate, ctrls, trgts in tape:
+        rec = records[i]
+        rec["op"] = gate.value
+        if gate == RGate.REPEAT:
+            end = _fill(records, i + 1, trgts)
+            if ctrls[0] > _UINT32_MAX:
+                raise ValueError(f"too many repetitions: {ctrls[0]}")
+            rec["trgts"] = (ctrls[0], end - i - 1)
+            i = end
+            continue
+        rec["nctrls"], rec["ntrgts"] = len(ctrls), len(trgts)
+        rec["ctrls"][:len(ctrls)] = ctrls
+        rec["trgts"][:len(trgts)] = trgts
+        i += 1
+    return i
+
+
+def encode_tape(tape: Sequence[TapeOp]) -> np.ndarray:
+    """The records of `tape`."""
+    records = np.zeros(_count(tape), dtype=record_dtype(_max_ctrls(tape)))
+    _fill(records, 0, tape)
+    return records
+
+
+def write_tape(path: str,
+               tape: Sequence[TapeOp],
+               nbits: int,
+               registers: Optional[dict] = None):
+    """Write `tape`, acting on `nbits` bits, to `path`. `registers` maps
+    names to slices or `QRegsProperties`, e.g. the register map of a
+    `ProgramWrapper`."""
+    records = encode_tape(tape)
+    header = json.dumps({
+        "version": VERSION,
+        "nbits": nbits,
+        "count": len(records),
+        "max_ctrls": records.dtype["ctrls"].shape[0],
+        "registers": {
+            name: [getattr(r, "slic", r).start, getattr(r, "slic", r).stop]
+            for name, r in (registers or {}).items()
+        },
+    }).encode()
+    # the records start on a multiple of 8 bytes
+    header += b" " * (-(len(MAGIC) + 8 + len(header)) % 8)
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header)).tobytes())
+        f.write(header)
+        f.write(records.tobytes())
+
+
+class MappedTape(NamedTuple):
+    # records mapped from the file, read only
+    records: np.ndarray
+    nbits: int
+    registers: dict[str, slice]
+
+    def ops(self, chunk: int = 1 << 16) -> Iterator[TapeOp]:
+        """The operations of the tape, decoded `chunk` records at a time;
+        the body of a repeated block is decoded as a whole."""
+        return _decode(self.records, 0, len(self.records), chunk)
+
+    def tape(self) -> list[TapeOp]:
+        """The whole tape, as built by `compile_program`."""
+        return list(self.ops())
+
+
+def read_tape(path: str) -> MappedTape:
+    """Map the tape written to `path` by `write_tape`."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a tape file")
+        length = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        header = json.loads(f.read(length))
+    if header["version"] != VERSION:
+        raise ValueError(f"unsupported tape version {header['version']}")
+    dtype = record_dtype(header["max_ctrls"])
+    if header["count"] == 0:
+        records = np.zeros(0, dtype=dtype)
+    else:
+        records = np.memmap(path,
+                            dtype=dtype,
+                            mode="r",
+                            offset=len(MAGIC) + 8 + length,
+                            shape=(header["count"], ))
+    registers = {
+        name: slice(start, stop)
+        for name, (start, stop) in header["registers"].items()
+    }
+    return MappedTape(records, header["nbits"], registers)
+
+
+def _decode(records: np.ndarray, start: int, stop: int,
+            chunk: int) -> Iterator[TapeOp]:
+    gates = {gate.value: gate for gate in RGate}
+    i = start
+    while i < stop:
+        block = records[i:min(i + chunk, stop)]
+        ops = block["op"].tolist()
+        nctrls = block["nctrls"].tolist()
+        ntrgts = block["ntrgts"].tolist()
+        ctrls = block["ctrls"].tolist()
+        trgts = block["trgts"].tolist()
+        j = 0
+        while j < len(ops):
+            gate = gates[ops[j]]
+            if gate == RGate.REPEAT:
+                times, length = trgts[j]
+                body_start = i + j + 1
+                body = tuple(
+                    _decode(records, body_start, body_start + length, chunk))
+                yield gate, (times, ), body
+                # continue after the body, which may end past this block
+                i = body_start + length
+                break
+            yield gate, tuple(ctrls[j][:nctrls[j]]), tuple(trgts[j][:ntrgts[j]])
+            j += 1
+        else:
+            i += len(ops)
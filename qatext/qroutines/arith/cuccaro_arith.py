@@ -13,13 +13,14 @@ from qat.lang.AQASM.routines import QRoutine
 LOGGER = logging.getLogger(__name__)
 
 
-def _common_init(a_l, b_l, overflow_qbit, little_endian):
+def _common_init(a_l, b_l, overflow_qbit, little_endian, cin_is_ancilla=True):
     """We are performing |a>|b> -> |a>|a+b> (or smthg similar, depending on the
     calling function). If len(b) > 1, then it allocates a new qubit for the carry-in, as per cuccaro scheme
 
     :param a_l, b_l: length of registers a and b, resp.
     :param overflow_qbit: if True, we need another additional ancilla containing the outcome of the (possible) overflow of the addition
-    :little_endian: if a and b are expected to be in BIG ENDIAN or LITTLE ENDIAN format"""
+    :little_endian: if a and b are expected to be in BIG ENDIAN or LITTLE ENDIAN format
+    :cin_is_ancilla: if False, the carry-in is a wire of the routine instead of an ancilla"""
     bits = min(a_l, b_l)
     # b_l contains the result
     b_is_bigger = b_l > bits
@@ -39,7 +40,8 @@ def _common_init(a_l, b_l, overflow_qbit, little_endian):
     LOGGER.debug("b %s", b)
     # When Cuccaro adder is used, we need an additional cin, that will be restored to 0 after the addition.
     cin = qfun.new_wires(1)
-    qfun.set_ancillae(cin)
+    if cin_is_ancilla:
+        qfun.set_ancillae(cin)
     LOGGER.debug("cin %s", cin)
 
     if overflow_qbit:
@@ -142,11 +144,10 @@ def _unmaj_chain(qfun, a, b, cin, mrange):
     qfun.apply(_unmajority(f"cin, b{0}, a{0}"), cin[0], b[0], a[0])
 
 
-@build_gate("MCOMP", [int, int, bool])
-def comparator(a_l: int, b_l: int, little_endian=False) -> QRoutine:
+def _comparator(a_l, b_l, little_endian, cin_is_ancilla):
     overflow_qbit = True
     qfun, a, b, cin, cout, bits, b_is_bigger = _common_init(
-        a_l, b_l, overflow_qbit, little_endian
+        a_l, b_l, overflow_qbit, little_endian, cin_is_ancilla
     )
     for qb in a:
         qfun.apply(X, qb)
@@ -163,6 +164,23 @@ def comparator(a_l: int, b_l: int, little_endian=False) -> QRoutine:
     return qfun
 
 
+@build_gate("MCOMP", [int, int, bool])
+def comparator(a_l: int, b_l: int, little_endian=False) -> QRoutine:
+    return _comparator(a_l, b_l, little_endian, True)
+
+
+@build_gate("MCOMP_CIN", [int, int, bool])
+def comparator_explicit_cin(a_l: int, b_l: int, little_endian=False) -> QRoutine:
+    """Same as `comparator`, but the carry-in is not an ancilla: it is the
+    third register (1 qubit), expected in |0> and restored to |0>. Comparators
+    that use different carry-in qubits can then run in parallel, instead of
+    sharing the ancilla allocated at compile time.
+
+    It should be applied to the following registers: a, b, cin, cout
+    """
+    return _comparator(a_l, b_l, little_endian, False)
+
+
 @build_gate("MSUB", [int, int, bool, bool])
 def subtractor(a_l: int, b_l: int, overflow_qbit=False, little_endian=False) -> QRoutine:
     qfun, a, b, cin, cout, bits, b_is_bigger = _common_init(
@@ -2,12 +2,13 @@ import logging
 from ctypes import ArgumentError
 from typing import List
 
-from qat.lang.AQASM.gates import SWAP, X
+import numpy as np
+from qat.lang.AQASM.gates import CNOT, SWAP, I, X
 from qat.lang.AQASM.misc import build_gate
 from qat.lang.AQASM.routines import QRoutine
-from qatext.qroutines import qregs_init
+from qatext.qroutines import qregs_init, qrom
 from qatext.qroutines.arith import adder
-from qatext.qroutines.qubitshuffle import rotate
+from qatext.qroutines.qubitshuffle import barrel, rotate
 from qatext.utils.bits.conversion import get_bitarray_from_int
 
 LOGGER = logging.getLogger(__name__)
@@ -295,6 +296,212 @@ def bix_data_compile_time(n: int, m: int, weight: int, elems: List):
 
     return qrout
 
+@build_gate("BIX_DATA_RUNTIME", [int, int, int],
+            lambda n, m, w: n + 2 * n * m)
+def bix_data_runtime(n: int, m: int, weight: int):
+    """Given a bitstring of length `n`, having exactly `weight` qubits set to
+    1, store into `weight` registers the values of the data registers
+    `qregs_data[i]` if `dicke[i] == 1`, and into `n - weight` registers the
+    ones of `qregs_data[i]` if `dicke[i] == 0`.
+
+    It should be applied to the following registers:
+    - qreg_dicke: the register containing the dicke state
+    - qregs_data: the `n` registers holding the data, of `m` qubits each,
+      left unchanged
+    - qreg_ones: the register that will contain the `weight` element for which the corresponding indexes is 1
+    - qreg_zeros: the register that will contain the `weight` element for which the corresponding indexes is 0
+
+    It is `bix_data_compile_time` with the controlled initializations
+    replaced by controlled copies of the data registers: the same circuit
+    serves every dataset of `n` values of `m` bits. It uses no ancillae.
+    """
+
+    if weight < 1 or weight >= n:
+        raise ArgumentError(
+            "Weight should be >=1 and < n, given {}".format(weight))
+
+    qrout = QRoutine()
+    wreg = qrout.new_wires(n)
+    dregs = [qrout.new_wires(m) for _ in range(n)]
+    oregs = [qrout.new_wires(m) for _ in range(weight)]
+    zregs = [qrout.new_wires(m) for _ in range(n - weight)]
+
+    qleftrotones = rotate.reg_reversal(len(oregs), m, 1)
+    qleftrotzeros = rotate.reg_reversal(len(zregs), m, 1)
+    qxor = qregs_init.copy_register(m)
+
+    for i in range(n):
+        # copy the data register in the first element
+        qrout.apply(qxor.ctrl(1), wreg[i], dregs[i], oregs[0])
+        if weight > 1:
+            # if wreg[i] is 1, we left rotate the ones
+            qrout.apply(qleftrotones.ctrl(1), wreg[i], *oregs)
+
+        # ...otw, we left rotate the zeros
+        qrout.apply(X, wreg[i])
+        qrout.apply(qxor.ctrl(1), wreg[i], dregs[i], zregs[0])
+        if n - weight > 1:
+            qrout.apply(qleftrotzeros.ctrl(1), wreg[i], *zregs)
+        qrout.apply(X, wreg[i])
+
+    return qrout
+
+
+@build_gate("BIX_DATA_UNARY", [int, int, int, List],
+            lambda n, m, w, x: n + n * m)
+def bix_data_unary(n: int, m: int, weight: int, elems: List):
+    """`bix_data_compile_time` by unary iteration: instead of rotating the
+    arrays at each step, a one-hot pointer marks the next free register of
+    the ones, and another one that of the zeros. At step `i`, `elems[i]` is
+    written into the register marked by the pointer of the ones if
+    `dicke[i] == 1`, which then moves by one, and likewise for the zeros.
+
+    It should be applied to the same registers as `bix_data_compile_time`.
+
+    At step `i` the `j`-th register of the ones can be written only if
+    `i - (n - weight) <= j <= i`, and only these are iterated over. The
+    pointer being in a superposition of all of them, each one costs a
+    `qrom.write` controlled by `dicke[i]` and by the pointer, i.e. at most 2
+    Toffolis and a CNOT per bit set of `elems[i]`, and a Fredkin moving the
+    pointer. A register of the ones is reachable at `n - weight + 1` steps
+    and one of the zeros at `weight + 1` steps, hence
+    `2 * weight * (n - weight) + n` Fredkins, at most twice as many Toffolis
+    and `O(n * min(weight, n - weight) * m)` CNOTs.
+
+    Both this loader and `bix_data_compile_time`, which rotates the
+    `n * m` qubits of the arrays at each of the `n` steps, thus cost a number
+    of gates quadratic in `n`; here however, the gates on three qubits do not
+    grow with `m`.
+
+    It uses additional ancillae, reset to zero at the end:
+    - the two pointers, of `weight + 1` and `n - weight + 1` qubits
+    - one qubit holding the AND of the controls of a write
+    """
+    if weight < 1 or weight >= n:
+        raise ArgumentError(
+            "Weight should be >=1 and < n, given {}".format(weight))
+
+    qrout = QRoutine()
+    wreg = qrout.new_wires(n)
+    oregs = [qrout.new_wires(m) for _ in range(weight)]
+    zregs = [qrout.new_wires(m) for _ in range(n - weight)]
+    opointer = qrout.new_wires(weight + 1)
+    zpointer = qrout.new_wires(n - weight + 1)
+    anc = qrout.new_wires(1)
+    for wires in (opointer, zpointer, anc):
+        qrout.set_ancillae(wires)
+
+    # both pointers start on their first register, and end past the last one
+    qrout.apply(X, opointer[0])
+    qrout.apply(X, zpointer[0])
+    for i in range(n):
+        for regs, pointer in ((oregs, opointer), (zregs, zpointer)):
+            if regs is zregs:
+                qrout.apply(X, wreg[i])
+            # the registers the pointer can be on
+            reachable = range(max(0, i - (n - len(regs))),
+                              min(i, len(regs) - 1) + 1)
+            for j in reachable:
+                qrom.write(qrout, (wreg[i], pointer[j]), regs[j], elems[i],
+                           anc)
+            for j in reversed(reachable):
+                qrout.apply(SWAP.ctrl(), wreg[i], pointer[j], pointer[j + 1])
+            if regs is zregs:
+                qrout.apply(X, wreg[i])
+    qrout.apply(X, opointer[weight])
+    qrout.apply(X, zpointer[n - weight])
+
+    return qrout
+
+
+def _increment(qrout, ctrl, counter):
+    """Add 1 to `counter`, big endian, if `ctrl` is set; it is its own
+    inverse once the gates are applied in reverse order."""
+    gates = []
+    for k in range(len(counter)):
+        lower = list(counter[k + 1:])
+        gates.append((X.ctrl(1 + len(lower)), [ctrl, *lower, counter[k]]))
+    for gate, qbits in gates:
+        qrout.apply(gate, *qbits)
+    return gates
+
+
+@build_gate("BIX_DATA_BLOCKS", [int, int, int, List, int, bool],
+            lambda n, m, w, x, b, _: n + n * m)
+def bix_data_blocks(n: int, m: int, weight: int, elems: List, block: int,
+                    log_depth: bool):
+    """`bix_data_compile_time` rotating the arrays once per `block` elements
+    instead of once per element.
+
+    It should be applied to the same registers as `bix_data_compile_time`.
+
+    `bix_data_compile_time` writes each element in the first register of
+    its array, then rotates the array by one. Here, within a block, a counter
+    accumulates the number of elements of the array so far: the element goes
+    into the register indexed by the counter, selected by unary iteration
+    (see `qrom.iterate`), then the counter is incremented. At the end of the
+    block, the array is rotated by the value of the counter with
+    `barrel.barrel_shift`, in `log2(block + 1)` controlled rotations, of
+    logarithmic depth if `log_depth`, and the counter is uncomputed. With
+    `block = 1` and `log_depth`, it is `bix_data_compile_time` with the
+    rotations of `barrel`.
+
+    It uses additional ancillae, reset to zero at the end:
+    - the counter, `block.bit_length()` qubits
+    - the ancillae of the unary iteration, as many
+    """
+    if weight < 1 or weight >= n:
+        raise ArgumentError(
+            "Weight should be >=1 and < n, given {}".format(weight))
+    if block < 1:
+        raise ArgumentError("Block should be >= 1, given {}".format(block))
+
+    qrout = QRoutine()
+    wreg = qrout.new_wires(n)
+    oregs = [qrout.new_wires(m) for _ in range(weight)]
+    zregs = [qrout.new_wires(m) for _ in range(n - weight)]
+    nbits = block.bit_length()
+    counter = qrout.new_wires(nbits)
+    qrout.set_ancillae(counter)
+    ancillae = qrout.new_wires(nbits)
+    qrout.set_ancillae(ancillae)
+
+    for first in range(0, n, block):
+        last = min(first + block, n)
+        for regs in (oregs, zregs):
+            increments = []
+            for i in range(first, last):
+                if regs is zregs:
+                    qrout.apply(X, wreg[i])
+                # the counter is at most i - first, and below len(regs)
+                qrom.iterate(
+                    qrout,
+                    counter,
+                    ancillae,
+                    0,
+                    min(i - first, len(regs) - 1) + 1,
+                    lambda qrout, ctrl, j, i=i, regs=regs: qrom.write(
+                        qrout, ctrl, regs[j], elems[i]),
+                    ctrl=wreg[i])
+                increments.append(
+                    (i, _increment(qrout, wreg[i], counter)))
+                if regs is zregs:
+                    qrout.apply(X, wreg[i])
+            if len(regs) > 1:
+                qrout.apply(
+                    barrel.barrel_shift(len(regs), m, nbits, log_depth),
+                    counter, *regs)
+            for i, gates in reversed(increments):
+                if regs is zregs:
+                    qrout.apply(X, wreg[i])
+                for gate, qbits in reversed(gates):
+                    qrout.apply(gate, *qbits)
+                if regs is zregs:
+                    qrout.apply(X, wreg[i])
+
+    return qrout
+
+
 @build_gate("BIX_MATRIX", [int, int, int, int, List],
             lambda n, r, m, w, x: n * r * m + n)
 def bix_matrix_compile_time(n: int, columns: int, m: int, weight: int,
@@ -370,3 +577,70 @@ def bix_matrix_compile_time(n: int, columns: int, m: int, weight: int,
             qrout.apply(X, wreg[row])
 
     return qrout
+
+
+def bix_matrix_gf2(n: int, columns: int, weight: int, packed: np.ndarray):
+    """`bix_matrix_compile_time` for a binary matrix (`m = 1`), e.g. a
+    parity-check matrix, given bit-packed: `packed` is
+    `np.packbits(matrix, axis=1)`, of shape `(n, ceil(columns / 8))`.
+
+    It should be applied to the same registers as `bix_matrix_compile_time`
+    with `m = 1`."""
+    packed = np.asarray(packed, dtype=np.uint8)
+    if packed.shape != (n, -(-columns // 8)):
+        raise ArgumentError(
+            "Packed matrix should have shape {}, given {}".format(
+                (n, -(-columns // 8)), packed.shape))
+    # each row as an integer, column 0 being the most significant bit
+    pad = 8 * packed.shape[1] - columns
+    rows = [int.from_bytes(row.tobytes(), "big") >> pad for row in packed]
+    return _bix_matrix_gf2(n, columns, weight, rows)
+
+
+@build_gate("BIX_MATRIX_GF2", [int, int, int, List],
+            lambda n, r, w, x: n * r + n)
+def _bix_matrix_gf2(n: int, columns: int, weight: int, rows: List):
+    """`bix_matrix_gf2`, the rows being integers, column 0 being their most
+    significant bit.
+
+    Each row is written with one CNOT per bit set, controlled by its bit of
+    the dicke state, instead of a controlled initializer per cell. The
+    columns which are zero in every row stay zero in every register, so the
+    rotations skip their qubits."""
+    if weight < 1 or weight >= n:
+        raise ArgumentError(
+            "Weight should be >=1 and < n, given {}".format(weight))
+
+    qrout = QRoutine()
+    wreg = qrout.new_wires(n)
+    oregs = [qrout.new_wires(columns) for _ in range(weight)]
+    zregs = [qrout.new_wires(columns) for _ in range(n - weight)]
+
+    used = 0
+    for row in rows:
+        used |= row
+    # the columns used, as indexes in a register
+    cols = [c for c in range(columns) if (used >> (columns - 1 - c)) & 1]
+    LOGGER.debug("%d columns used out of %d", len(cols), columns)
+    if not cols:
+        qrout.apply(I, wreg[0])
+        return qrout
+
+    qleftrotones = rotate.reg_reversal(weight, len(cols), 1)
+    qleftrotzeros = rotate.reg_reversal(n - weight, len(cols), 1)
+    ones_used = [qreg[c] for qreg in oregs for c in cols]
+    zeros_used = [qreg[c] for qreg in zregs for c in cols]
+    for i, row in enumerate(rows):
+        targets = [c for c in cols if (row >> (columns - 1 - c)) & 1]
+        for c in targets:
+            qrout.apply(CNOT, wreg[i], oregs[0][c])
+        if weight != 1:
+            qrout.apply(qleftrotones.ctrl(1), wreg[i], ones_used)
+        qrout.apply(X, wreg[i])
+        for c in targets:
+            qrout.apply(CNOT, wreg[i], zregs[0][c])
+        if n - weight != 1:
+            qrout.apply(qleftrotzeros.ctrl(1), wreg[i], zeros_used)
+        qrout.apply(X, wreg[i])
+
+    return qrout
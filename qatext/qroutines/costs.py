@@ -0,0 +1,261 @@
+"""Closed-form cost models of the main routines, answering questions like
+"what does BIX cost for n=500" without building anything.
+
+Every function returns the `Resources` of the routine applied on a program
+and compiled with `to_circ`: the gate counts named as in
+`Circuit.statistics()`, the number of qubits including the ancillae, and the
+ASAP depth of the flat circuit (see `qatext.utils.qatmgmt.circuit.depth`).
+The models assume the links used in this repo: the Cuccaro adder for
+`qatext.qroutines.arith` and `classarith` for the comparisons of `QInt`s.
+
+The gate counts and the width are exact. So is the depth, except for the BIX
+routines, where consecutive steps partially overlap in a way which depends
+on the data: there the depth is the upper bound obtained by running the
+steps one after the other.
+
+Only the register sizes used in the repo are modelled, i.e. the two
+operands of the Cuccaro routines have the same size `m`.
+"""
+from collections import Counter
+from math import gcd
+from typing import Sequence
+
+from qatext.utils.qatmgmt.resources import Resources
+
+# gates of the comparison of two QInts of m qubits, per qubit and constant
+_QINT_CMP_PER_QUBIT = {"CNOT": 8, "CCNOT": 4}
+_QINT_CMP_CONST = {"CNOT": 3, "X": 1}
+_QINT_CMP_ANCILLAE = 2
+
+
+def _resources(gates: Counter, arity: int, ancillae: int,
+               depth: int) -> Resources:
+    return Resources({k: v for k, v in gates.items() if v}, arity + ancillae,
+                     ancillae, depth)
+
+
+def _scaled(gates, factor: int) -> Counter:
+    return Counter({k: v * factor for k, v in gates.items()})
+
+
+def _ctrl(gates) -> Counter:
+    return Counter({"C-" + k: v for k, v in gates.items()})
+
+
+def _popcount(values: Sequence[int]) -> int:
+    return sum(int(v).bit_count() for v in values)
+
+
+def adder(m: int, overflow_qbit: bool = False) -> Resources:
+    """`cuccaro_arith.adder(m, m, overflow_qbit, little_endian)`."""
+    if m == 1:
+        gates = Counter(CNOT=1)
+        if overflow_qbit:
+            gates.update(X=2, CCNOT=1)
+        return _resources(gates, 2 + overflow_qbit, int(overflow_qbit),
+                          4 if overflow_qbit else 1)
+    # MAJ and UMA blocks
+    blocks = m if overflow_qbit else m - 1
+    gates = Counter(CNOT=5 * blocks + (1 if overflow_qbit else 2),
+                    CCNOT=2 * blocks,
+                    X=2 * blocks)
+    return _resources(gates, 2 * m + overflow_qbit, 1,
+                      4 * m + 4 * overflow_qbit)
+
+
+def subtractor(m: int, overflow_qbit: bool = False) -> Resources:
+    """`cuccaro_arith.subtractor(m, m, overflow_qbit, little_endian)`: the
+    adder, negating `a` before and `a`, `b` after it."""
+    add = adder(m, overflow_qbit)
+    gates = Counter(add.gates)
+    gates["X"] += 3 * m
+    return add._replace(gates=dict(gates), depth=add.depth + 2)
+
+
+def comparator(m: int, explicit_cin: bool = False) -> Resources:
+    """`cuccaro_arith.comparator(m, m, little_endian)`, or
+    `comparator_explicit_cin` if `explicit_cin`."""
+    if m == 1:
+        gates = Counter(X=4, CNOT=1, CCNOT=1)
+        depth = 5
+    else:
+        gates = Counter(X=2 * m, CNOT=4 * m + 1, CCNOT=2 * m)
+        depth = 4 * m + 5
+    return _resources(gates, 2 * m + 1 + explicit_cin, int(not explicit_cin),
+                      depth)
+
+
+def _qint_compare(m: int) -> Counter:
+    gates = _scaled(_QINT_CMP_PER_QUBIT, m)
+    gates.update(_QINT_CMP_CONST)
+    return gates
+
+
+def _qint_compare_depth(m: int) -> int:
+    return 10 * m + 4
+
+
+def insert_ld(n: int, m: int) -> Resources:
+    """`sliding_sort_array.insert_ld(n, m)`. All the comparisons share the
+    ancillae of `classarith`, so they run one after the other; for `n = 1`
+    the fan-outs are not hidden behind them and the depth is 2 more."""
+    gates = _scaled(_qint_compare(m), 2 * n)
+    gates.update({"CNOT": (n + 1) * m, "C-SWAP": 2 * (n - 1) * m,
+                  "C-X": n * m})
+    ancillae = n * m + n + _QINT_CMP_ANCILLAE
+    return _resources(gates, (n + 1) * m, ancillae,
+                      2 * n * _qint_compare_depth(m) + 2 * (n == 1))
+
+
+def insert_lw(n: int, m: int) -> Resources:
+    """`sliding_sort_array.insert_lw(n, m)`."""
+    gates = _scaled(_qint_compare(m), 2 * (n - 1))
+    gates.update({"CNOT": m, "C-SWAP": (n - 1) * m})
+    ancillae = 1 + _QINT_CMP_ANCILLAE if n > 1 else 0
+    depth = (n - 1) * (2 * _qint_compare_depth(m) + 1) if n > 1 else 1
+    return _resources(gates, (n + 1) * m, ancillae, depth)
+
+
+def dicke(n: int, k: int) -> Resources:
+    """`bartschiE19.generate(n, k)`, preparing the state of weight
+    `min(k, n - k)` and negating it if needed."""
+    if k <= 0 or n < k:
+        return _resources(Counter(), n, 0, 0)
+    if k == n:
+        return _resources(Counter(X=n), n, 0, 1)
+    low = min(k, n - k)
+    negate = low != k
+    gates = Counter({
+        "X": low + n * negate,
+        "CNOT": 2 * low * (n - low) + low * (low - 1),
+        "C-RY": n - 1,
+        "C-C-RY": (n - low) * (low - 1) + (low - 1) * (low - 2) // 2,
+    })
+    # the SCS blocks pipeline: the depth grows with n only
+    if low == 1:
+        depth = 3 * n - 2
+    elif low == 2:
+        depth = 6 * n - 8
+    else:
+        depth = 8 * n - 14
+    return _resources(gates, n, 0, depth + negate)
+
+
+def _register_rotation(nregs: int, m: int, d: int = 1) -> Counter:
+    """`rotate.reg_reversal(nregs, m, d)`: one SWAP per qubit but one per
+    cycle of the rotation, of which there are `m gcd(nregs, d)`; its depth
+    is at most 2 unless it is an identity."""
+    swaps = m * (nregs - gcd(nregs, d))
+    if swaps == 0:
+        return Counter(I=1)
+    return Counter(SWAP=swaps)
+
+
+def _bix_tail(m: int, final: int, weight: int, n: int) -> tuple[Counter,
+                                                                 int]:
+    """Gates and depth of the final part of `bix_indexes_compile_time` and
+    `bix_data_diff_compile_time`: the subtraction of `final` from the first
+    register of both arrays, and the last rotation of the arrays."""
+    add = adder(m)
+    init = int(final).bit_count()
+    gates = Counter(X=2 * init + 4 * m, SWAP=4 * m)
+    gates.update(_scaled(add.gates, 2))
+    gates.update(_register_rotation(weight + 1, m))
+    gates.update(_register_rotation(n - weight + 1, m))
+    depth = 2 * (init > 0) + 2 * (4 + add.depth) + 2
+    return gates, depth
+
+
+def _bix_step(m: int, weight: int, n: int) -> tuple[Counter, int]:
+    """Gates and depth of the controlled rotations and copies of a step of
+    `bix_indexes_compile_time` and `bix_data_diff_compile_time`."""
+    rot_ones = _register_rotation(weight + 1, m)
+    rot_zeros = _register_rotation(n - weight + 1, m)
+    gates = _ctrl(rot_ones + rot_zeros)
+    gates.update({"C-CNOT": 2 * m, "X": 2})
+    # a controlled block is serialised on its control
+    depth = sum(rot_ones.values()) + sum(rot_zeros.values()) + 2 * m + 2
+    return gates, depth
+
+
+def _bix_width(n: int, m: int) -> int:
+    # two support registers, the constant and the carry of the adder
+    return 3 * m + adder(m).ancillae
+
+
+def bix_indexes(n: int, weight: int, idx_start_at_one: bool) -> Resources:
+    """`bix.bix_indexes_compile_time(n, weight, idx_start_at_one)`."""
+    nadds = n - 1 + idx_start_at_one
+    m = nadds.bit_length()
+    add = adder(m)
+    step, step_depth = _bix_step(m, weight, n)
+    tail, tail_depth = _bix_tail(m, nadds, weight, n)
+    gates = _scaled(step, n)
+    gates.update(_scaled(add.gates, 2 * nadds))
+    gates.update(tail)
+    # the constant 1 is set and reset
+    gates["X"] += 2
+    depth = n * step_depth + 2 * nadds * add.depth + tail_depth + 2
+    return _resources(gates, n + n * m, _bix_width(n, m), depth)
+
+
+def bix_data_diff(n: int, m: int, weight: int,
+                  elems: Sequence[int]) -> Resources:
+    """`bix.bix_data_diff_compile_time(n, m, weight, elems)`."""
+    add = adder(m)
+    diffs = [elems[0]] + [j - i for i, j in zip(elems, elems[1:])]
+    nadds = sum(1 for d in diffs if d != 0)
+    step, step_depth = _bix_step(m, weight, n)
+    tail, tail_depth = _bix_tail(m, elems[-1], weight, n)
+    gates = _scaled(step, n)
+    gates.update(_scaled(add.gates, 2 * nadds))
+    gates.update(tail)
+    # each difference is set and reset in the constant register
+    gates["X"] += 2 * _popcount(diffs)
+    depth = (n * step_depth + 2 * nadds * add.depth + tail_depth +
+             2 * sum(1 for d in diffs if d != 0))
+    return _resources(gates, n + n * m, _bix_width(n, m), depth)
+
+
+def bix_data(n: int, m: int, weight: int, elems: Sequence[int]) -> Resources:
+    """`bix.bix_data_compile_time(n, m, weight, elems)`."""
+    rot_ones = _register_rotation(weight, m) if weight > 1 else Counter()
+    rot_zeros = (_register_rotation(n - weight, m)
+                 if n - weight > 1 else Counter())
+    gates = _scaled(_ctrl(rot_ones + rot_zeros), n)
+    ones = _popcount(elems)
+    gates.update({"C-X": 2 * ones, "X": 2 * n})
+    depth = (n * (sum(rot_ones.values()) + sum(rot_zeros.values()) + 2) +
+             2 * ones)
+    return _resources(gates, n + n * m, 0, depth)
+
+
+def bix_data_runtime(n: int, m: int, weight: int) -> Resources:
+    """`bix.bix_data_runtime(n, m, weight)`: the copies of the data
+    registers, serialised on their control, replace the initializations of
+    `bix_data`."""
+    rot_ones = _register_rotation(weight, m) if weight > 1 else Counter()
+    rot_zeros = (_register_rotation(n - weight, m)
+                 if n - weight > 1 else Counter())
+    gates = _scaled(_ctrl(rot_ones + rot_zeros), n)
+    gates.update({"C-CNOT": 2 * n * m, "X": 2 * n})
+    depth = n * (sum(rot_ones.values()) + sum(rot_zeros.values()) + 2 +
+                 2 * m)
+    return _resources(gates, n + 2 * n * m, 0, depth)
+
+
+def bix_matrix(n: int, columns: int, m: int, weight: int,
+               matrix: Sequence[int]) -> Resources:
+    """`bix.bix_matrix_compile_time(n, columns, m, weight, matrix)`, the
+    matrix being flattened row-wise."""
+    rot_ones = (_register_rotation(weight * columns, m, columns)
+                if weight != 1 else Counter())
+    rot_zeros = (_register_rotation((n - weight) * columns, m, columns)
+                 if n - weight != 1 else Counter())
+    gates = _scaled(_ctrl(rot_ones + rot_zeros), n)
+    ones = _popcount(matrix)
+    flips = 2 * columns + (2 if n - weight != 1 else 0)
+    gates.update({"C-X": 2 * ones, "X": n * flips})
+    depth = (n * (sum(rot_ones.values()) + sum(rot_zeros.values()) + flips)
+             + 2 * ones)
+    return _resources(gates, n + n * columns * m, 0, depth)
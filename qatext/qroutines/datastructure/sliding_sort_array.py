@@ -2,6 +2,7 @@ from qat.lang.AQASM.gates import CNOT, SWAP, X
 from qat.lang.AQASM.misc import build_gate
 from qat.lang.AQASM.qint import QInt
 from qat.lang.AQASM.routines import QRoutine
+from qatext.qroutines.arith.cuccaro_arith import comparator_explicit_cin
 from qatext.qroutines.qregs_init import copy_register
 from qatext.qroutines.qubitshuffle.rotate import swap_qreg_cells
 from qatext.utils.qatmgmt.routines import QRoutineWrapper
@@ -97,3 +98,71 @@ def insert_lw(n, m):
         qrw.apply(swap_qreg_cells(m).ctrl(), qr_out, qarray[j], qarray[j + 1])
         (qarray[j] >= qr_val[0]).evaluate(output=qr_out)
     return qrw._qroutine
+
+
+def _merge_schedule(n, k):
+    """Order in which the bubbling steps of `k` consecutive low-width inserts
+    can be interleaved.
+
+    Pass `t` inserts into cells `0..n-k+t` and its step `j` compare-and-swaps
+    cells `j` and `j+1`, from `j = n-k+t-1` down to `0`. Step `(t, j)` only
+    depends on step `(t-1, j-1)`, so we assign it to the time slot
+    `n-k+t-1-j+t`: pass `t` trails pass `t-1` by one slot, and steps in the
+    same slot touch disjoint pairs of cells.
+    """
+    slots = {}
+    for t in range(k):
+        for j in range(n - k + t - 1, -1, -1):
+            slots.setdefault(n - k + 2 * t - 1 - j, []).append((t, j))
+    return [slots[s] for s in sorted(slots)]
+
+
+@build_gate('SLIDING_SORT_MERGE', [int, int, int],
+            lambda n, k, m: k * m + n * m)
+def merge_lw(n, k, m):
+    """Low-Width insertion of `k` values at once.
+    N cells, each one of size m; the last `k` cells must be empty.
+    Expect qregs in this order: X (k cells), A (n cells)
+
+    It has the same effect of `k` consecutive `insert_lw`, one per cell of X,
+    but the bubbling passes are interleaved: each value moves down one cell
+    behind the previous one, so the depth is O(n + k) compare-and-swap steps
+    instead of O(n * k). To let the passes run in parallel, each one has its
+    own comparison bit and comparator carry-in, hence `2k` ancillae, all reset
+    to 0.
+    """
+    qrw = QRoutineWrapper(QRoutine())
+    qrs_val = qrw.qarray_wires(k, m, "X", int)
+    qarray = qrw.qarray_wires(n, m, "A", int)
+    qr_out = qrw.new_wires(k)
+    qrw.set_ancillae(qr_out)
+    qrw.qarray_wires_noalloc(1, k, "out", qr_out[0].index, str, False)
+    qr_cin = qrw.new_wires(k)
+    qrw.set_ancillae(qr_cin)
+    qrw.qarray_wires_noalloc(1, k, "cin", qr_cin[0].index, str, False)
+
+    for t in range(k):
+        qrw.apply(copy_register(m), qrs_val[t], qarray[n - k + t])
+
+    # out ^= X[t] > A[j], i.e. out is 0 when A[j] >= X[t]
+    qrout_comp = comparator_explicit_cin(m, m, False)
+    qrout_swap = swap_qreg_cells(m).ctrl()
+    for slot in _merge_schedule(n, k):
+        for t, j in slot:
+            qrw.apply(qrout_comp, qarray[j], qrs_val[t], qr_cin[t], qr_out[t])
+            qrw.apply(X, qr_out[t])
+            qrw.apply(qrout_swap, qr_out[t], qarray[j], qarray[j + 1])
+            qrw.apply(X, qr_out[t])
+            qrw.apply(qrout_comp, qarray[j], qrs_val[t], qr_cin[t], qr_out[t])
+    return qrw._qroutine
+
+
+@build_gate('SLIDING_SORT_DELETE_MANY', [int, int, int],
+            lambda n, k, m: k * m + n * m)
+def delete_many(n, k, m):
+    """Remove the `k` values of X from the array, leaving the last `k` cells
+    empty. It is the inverse of `merge_lw`."""
+    qf = QRoutine()
+    qw = qf.new_wires(k * m + n * m)
+    qf.apply(merge_lw(n, k, m).dag(), *qw)
+    return qf
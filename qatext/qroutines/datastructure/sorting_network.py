@@ -0,0 +1,126 @@
+"""Sorting of an array of quantum registers through Batcher's odd-even
+mergesort network.
+
+A compare-and-swap leaves behind the bit telling whether the two cells were
+swapped, and this bit cannot be erased in place. For this reason, the network
+is applied with the compute-copy-uncompute scheme: the network sorts the input
+array in place, the sorted array is copied onto the output array, and the
+network is undone. In the end the input array is unchanged, the output array
+contains the sorted values, and all the comparison bits are back to 0, so that
+they can be reused by the following routines.
+"""
+import logging
+
+from qat.lang.AQASM.misc import build_gate
+from qat.lang.AQASM.routines import QRoutine
+from qatext.qroutines.arith.cuccaro_arith import comparator_explicit_cin
+from qatext.qroutines.qregs_init import copy_register
+from qatext.qroutines.qubitshuffle.rotate import swap_qreg_cells
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _odd_even_mergesort_layers(p: int) -> list[list[tuple[int, int]]]:
+    """Comparators of Batcher's odd-even mergesort on `p` (a power of 2)
+    elements, grouped in layers of disjoint comparators. There are
+    log2(p) * (log2(p) + 1) / 2 layers."""
+    layers = []
+    q = 1
+    while q < p:
+        k = q
+        while k >= 1:
+            layer = []
+            for j in range(k % q, p - k, 2 * k):
+                for i in range(min(k, p - j - k)):
+                    if (i + j) // (2 * q) == (i + j + k) // (2 * q):
+                        layer.append((i + j, i + j + k))
+            layers.append(layer)
+            k //= 2
+        q *= 2
+    return layers
+
+
+def sorting_schedule(n: int):
+    """Compare-and-swap layers sorting `n` cells.
+
+    The network is built for the next power of two, padding the array with
+    virtual +inf cells at the end. The outcome of a comparator involving a
+    virtual cell is known at compile time: it never swaps two virtual cells,
+    and when it would move a real cell it is replaced by a relabelling of the
+    positions, which costs no gates.
+
+    Returns the list of layers, each one a list of pairs `(a, b)` of cell
+    indexes after which cell `a` holds the minimum and cell `b` the maximum,
+    and the list `order` such that the `i`-th smallest value ends in cell
+    `order[i]`.
+    """
+    p = 1 << max(n - 1, 0).bit_length()
+    # position -> cell index, None for virtual +inf
+    cell_at: list[int | None] = [i if i < n else None for i in range(p)]
+    layers = []
+    for layer in _odd_even_mergesort_layers(p):
+        comparators = []
+        for i, j in layer:
+            ci, cj = cell_at[i], cell_at[j]
+            if ci is not None and cj is not None:
+                comparators.append((ci, cj))
+            elif ci is None and cj is not None:
+                cell_at[i], cell_at[j] = cj, ci
+        if comparators:
+            layers.append(comparators)
+    order = cell_at[:n]
+    assert None not in order, "virtual cells should end after the real ones"
+    return layers, order
+
+
+def _sorting_network(n: int, m: int):
+    qrout = QRoutine()
+    qrs_in = [qrout.new_wires(m) for _ in range(n)]
+    layers, order = sorting_schedule(n)
+    n_flags = sum(len(layer) for layer in layers)
+    max_width = max((len(layer) for layer in layers), default=0)
+    qr_flags = qrout.new_wires(n_flags) if n_flags > 0 else []
+    qr_cins = qrout.new_wires(max_width) if max_width > 0 else []
+
+    qrout_comp = comparator_explicit_cin(m, m, False)
+    qrout_swap = swap_qreg_cells(m).ctrl()
+    flag = 0
+    for layer in layers:
+        for cin, (a, b) in zip(qr_cins, layer):
+            # flag ^= A[a] > A[b]
+            qrout.apply(qrout_comp, qrs_in[b], qrs_in[a], cin, qr_flags[flag])
+            qrout.apply(qrout_swap, qr_flags[flag], qrs_in[a], qrs_in[b])
+            flag += 1
+    return qrout, qrs_in, qr_flags, qr_cins, order
+
+
+@build_gate("SORTING_NETWORK", [int, int], lambda n, m: 2 * n * m)
+def sort(n: int, m: int):
+    """Sort `n` registers, each of size `m`, in ascending order.
+
+    It acts on two quantum arrays:
+    - The array to sort, left unchanged
+    - The array, initially all zeros, upon which the sorted values are copied
+
+    The network has O(log^2 n) layers of parallel compare-and-swaps. It uses
+    one ancilla for each comparator, plus one carry-in for each comparator
+    of the widest layer; all of them are reset to 0.
+    """
+    qrout = QRoutine()
+    qrs_in = [qrout.new_wires(m) for _ in range(n)]
+    qrs_out = [qrout.new_wires(m) for _ in range(n)]
+    if n == 1:
+        qrout.apply(copy_register(m), qrs_in[0], qrs_out[0])
+        return qrout
+
+    qrout_net, _, qr_flags, qr_cins, order = _sorting_network(n, m)
+    anc = qrout.new_wires(len(qr_flags) + len(qr_cins))
+    qrout.set_ancillae(anc)
+    LOGGER.debug("%d comparators, %d carry-ins", len(qr_flags), len(qr_cins))
+    # The network acts on the input array and on its own ancillae
+    net_wires = [qb for qr in qrs_in for qb in qr] + list(anc)
+    qrout.apply(qrout_net, net_wires)
+    for i, cell in enumerate(order):
+        qrout.apply(copy_register(m), qrs_in[cell], qrs_out[i])
+    qrout.apply(qrout_net.dag(), net_wires)
+    return qrout
@@ -1,3 +1,4 @@
+import functools
 import logging
 
 import numpy as np
@@ -8,51 +9,63 @@ from qat.lang.AQASM.misc import build_gate
 logger = logging.getLogger(__name__)
 
 
-@build_gate("_BARTSCHI_I", [float])
-def _igate(angle: float) -> QRoutine:
-    qf = QRoutine()
-    wires = qf.new_wires(2)
-    # n-2 -> 0, n-1 -> 1
-    qf.apply(CNOT, wires[0], wires[1])
-    qf.apply(RY(angle).ctrl(), wires[1], wires[0])
-    qf.apply(CNOT, wires[0], wires[1])
-    return qf
+@functools.lru_cache(maxsize=None)
+def scs_angles(n: int, k: int) -> np.ndarray:
+    """RY angles of the Split & Cyclic Shift block SCS_{n,k}, computed in one
+    vectorised pass: entry `l - 1` is the angle 2 arccos(sqrt(l / n)) of gate
+    (ii)_l, gate (i) being l = 1.
 
-
-@build_gate("_BARTSCHI_II", [float])
-def _iigate(angle: float) -> QRoutine:
-    qf = QRoutine()
-    wires = qf.new_wires(3)
-    # n-l-1 -> 0, n-l -> 1, n - 1 ->2
-    qf.apply(CNOT, wires[0], wires[2])
-    qf.apply(RY(angle).ctrl(2), wires[2], wires[1], wires[0])
-    qf.apply(CNOT, wires[0], wires[2])
-    return qf
+    The block SCS_{n,k} appears in the preparation of every Dicke state of
+    weight `k` on at least `n` qubits, so the angles are cached and shared."""
+    angles = 2 * np.arccos(np.sqrt(np.arange(1, k + 1) / n))
+    angles.setflags(write=False)
+    return angles
 
 
+@build_gate("_BARTSCHI_SCS", [int, int], lambda n, k: n)
+@functools.lru_cache(maxsize=None)
 def _scs(n: int, k: int) -> QRoutine:
     qf = QRoutine()
     wires = qf.new_wires(n)
-    angle = 2 * np.arccos(1 / np.sqrt(n))
+    angles = scs_angles(n, k)
     # (i)
     # n-2 -> 0, n-1 -> 1
-    qf.apply(_igate(angle), wires[n - 2], wires[n - 1])
-    # qfi.apply(CNOT, wires[n - 2], wires[n - 1])
-    # qfi.apply(RY(angle).ctrl(), wires[n - 1], wires[n - 2])
-    # qfi.apply(CNOT, wires[n - 2], wires[n - 1])
+    qf.apply(CNOT, wires[n - 2], wires[n - 1])
+    qf.apply(RY(angles[0]).ctrl(), wires[n - 1], wires[n - 2])
+    qf.apply(CNOT, wires[n - 2], wires[n - 1])
     # (ii)_l
     for l in range(2, k + 1):
-        angle = 2 * np.arccos(np.sqrt(l / n))
         # n-l-1 -> 0, n-l -> 1, n - 1 ->2
-        qf.apply(_iigate(angle), n - l - 1, n - l, n - 1)
-        # qf.apply(CNOT, wires[n - l - 1], wires[n - 1])
-        # qf.apply(RY(angle).ctrl(2), wires[n - 1], wires[n - l], wires[n - l - 1])
-        # qf.apply(CNOT, wires[n - l - 1], wires[n - 1])
+        qf.apply(CNOT, wires[n - l - 1], wires[n - 1])
+        qf.apply(RY(angles[l - 1]).ctrl(2), wires[n - 1], wires[n - l],
+                 wires[n - l - 1])
+        qf.apply(CNOT, wires[n - l - 1], wires[n - 1])
+    return qf
+
+
+@build_gate("_BARTSCHI_U", [int, int], lambda n, k: n)
+@functools.lru_cache(maxsize=None)
+def unary_to_dicke(n: int, k: int) -> QRoutine:
+    """Cascade of SCS blocks U_{n,k}, mapping |0^{n-l} 1^l> to the Dicke state
+    of `n` qubits and weight `l`, for every `l <= k`; `k` must be < `n`."""
+    qf = QRoutine()
+    wires = qf.new_wires(n)
+    for i in range(n, k, -1):
+        qf.apply(_scs(i, k), wires[:i])
+    for i in range(k, 1, -1):
+        qf.apply(_scs(i, i - 1), wires[:i])
     return qf
 
 
 @build_gate("DICKE", [int, int])
+@functools.lru_cache(maxsize=None)
 def generate(n: int, k: int) -> QRoutine:
+    """Prepare the Dicke state of `n` qubits and weight `k`, following
+    Bärtschi & Eidenbenz 2019.
+
+    The routine body and its SCS blocks are memoized on their parameters:
+    building the same state again, even in a different program, costs a
+    cache lookup, and blocks are shared between different `(n, k)`."""
     qf = QRoutine()
     wires = qf.new_wires(n)
     if k <= 0 or n < k:
@@ -66,10 +79,7 @@ def generate(n: int, k: int) -> QRoutine:
     for i in range(n - 1, n - localk - 1, -1):
         qf.apply(X, wires[i])
 
-    for i in range(n, localk, -1):
-        qf.apply(_scs(i, localk), wires[:i])
-    for i in range(localk, 1, -1):
-        qf.apply(_scs(i, i - 1), wires[:i])
+    qf.apply(unary_to_dicke(n, localk), wires)
 
     if localk != k:
         for qb in wires:
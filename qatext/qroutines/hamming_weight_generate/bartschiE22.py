@@ -0,0 +1,135 @@
+"""Divide-and-conquer Dicke state preparation, following Bärtschi & Eidenbenz
+2022 (Short-Depth Circuits for Dicke State Preparation).
+
+As in `bartschiE19`, the core is a unitary U_{n,k} mapping |0^{n-l} 1^l> to
+the Dicke state D^n_l, for every `l <= k`. Here U_{n,k} splits the register
+in two halves, L and R, with the ones initially in R. A Weight Distribution
+Block (WDB) moves `r` of the `l` ones to the end of L, with the hypergeometric
+amplitude sqrt(C(|L|, r) C(|R|, l - r) / C(n, l)); then U_{|L|,k} and
+U_{|R|,k} run in parallel on the two halves. Once a half is shorter than
+`2k`, the linear SCS cascade of `bartschiE19` takes over.
+
+The recursion has log(n/k) levels, each with a WDB of O(k^2) gates, so for
+W states (k = 1) the depth is O(log n) instead of O(n).
+"""
+import functools
+import logging
+from math import comb
+
+import numpy as np
+from qat.lang.AQASM.gates import CNOT, RY, X
+from qat.lang.AQASM.misc import build_gate
+from qat.lang.AQASM.routines import QRoutine
+from qatext.qroutines.hamming_weight_generate.bartschiE19 import \
+    unary_to_dicke
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def wdb_angles(n1: int, n2: int, k: int) -> np.ndarray:
+    """RY angles of the WDB moving ones from a half of size `n2` to a half of
+    size `n1`, for a total weight up to `k`.
+
+    Entry `[j, s]` is the angle moving the `s`-th one when the total weight is
+    `j`, i.e. 2 arcsin(sqrt(P(r >= s | r >= s - 1))), `r` being hypergeometric;
+    unused entries are nan."""
+    n = n1 + n2
+    pmf = np.zeros((k + 1, k + 1))
+    for j in range(k + 1):
+        for r in range(min(j, n1) + 1):
+            pmf[j, r] = comb(n1, r) * comb(n2, j - r) / comb(n, j)
+    # tails[j, s] = P(r >= s), for total weight j
+    tails = np.cumsum(pmf[:, ::-1], axis=1)[:, ::-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = tails[:, 1:] / tails[:, :-1]
+    angles = np.full((k + 1, k + 1), np.nan)
+    angles[:, 1:] = 2 * np.arcsin(np.sqrt(np.clip(ratios, 0, 1)))
+    angles.setflags(write=False)
+    return angles
+
+
+@build_gate("_WDB", [int, int, int], lambda n1, n2, k: min(k, n1) + k)
+@functools.lru_cache(maxsize=None)
+def _wdb(n1: int, n2: int, k: int) -> QRoutine:
+    """Weight distribution block.
+
+    It acts on the last `min(k, n1)` qubits of L and on the last `k` qubits of
+    R, the latter holding up to `k` ones at its end. Step `s` moves the first
+    one of R to the `s`-th cell from the end of L, with the amplitude given by
+    `wdb_angles`. Since the weight `j` is not known, the rotation moving the
+    one at position `i` is controlled on position `i` being the first one of
+    R, i.e. on the previous cell being 0."""
+    qf = QRoutine()
+    b = min(k, n1)
+    lwires = qf.new_wires(b)
+    rwires = qf.new_wires(k)
+    # reversed views: ones are a prefix of `ones`, moved ones a prefix of `dst`
+    ones = list(reversed(rwires))
+    dst = list(reversed(lwires))
+    angles = wdb_angles(n1, n2, k)
+    for s in range(1, b + 1):
+        for i in range(k - s, -1, -1):
+            j = i + s
+            angle = angles[j, s]
+            if np.isnan(angle) or angle == 0:
+                continue
+            ctrls = [dst[s - 1]]
+            if s > 1:
+                ctrls.append(dst[s - 2])
+            if i + 1 < k:
+                ctrls.append(ones[i + 1])
+                qf.apply(X, ones[i + 1])
+            qf.apply(CNOT, ones[i], dst[s - 1])
+            qf.apply(RY(-angle).ctrl(len(ctrls)), *ctrls, ones[i])
+            qf.apply(CNOT, ones[i], dst[s - 1])
+            if i + 1 < k:
+                qf.apply(X, ones[i + 1])
+    return qf
+
+
+@build_gate("_BARTSCHI_LOG_U", [int, int], lambda n, k: n)
+@functools.lru_cache(maxsize=None)
+def unary_to_dicke_log(n: int, k: int) -> QRoutine:
+    """Divide-and-conquer U_{n,k}: maps |0^{n-l} 1^l> to the Dicke state of
+    `n` qubits and weight `l`, for every `l <= k`."""
+    qf = QRoutine()
+    wires = qf.new_wires(n)
+    if n == 1 or k == 0:
+        return qf
+    if n < 2 * k:
+        qf.apply(unary_to_dicke(n, min(k, n - 1)), wires)
+        return qf
+    n2 = (n + 1) // 2
+    n1 = n - n2
+    lwires, rwires = wires[:n1], wires[n1:]
+    qf.apply(_wdb(n1, n2, k), lwires[n1 - min(k, n1):], rwires[n2 - k:])
+    qf.apply(unary_to_dicke_log(n1, k), lwires)
+    qf.apply(unary_to_dicke_log(n2, k), rwires)
+    return qf
+
+
+@build_gate("DICKE_LOG", [int, int])
+@functools.lru_cache(maxsize=None)
+def generate(n: int, k: int) -> QRoutine:
+    """Prepare the Dicke state of `n` qubits and weight `k` with depth
+    O(k^2 log(n/k)); drop-in replacement of `bartschiE19.generate`."""
+    qf = QRoutine()
+    wires = qf.new_wires(n)
+    if k <= 0 or n < k:
+        return qf
+    if k == n:
+        for qb in wires:
+            qf.apply(X, qb)
+        return qf
+
+    localk = k if k <= n / 2 else n - k
+    for i in range(n - 1, n - localk - 1, -1):
+        qf.apply(X, wires[i])
+
+    qf.apply(unary_to_dicke_log(n, localk), wires)
+
+    if localk != k:
+        for qb in wires:
+            qf.apply(X, qb)
+    return qf
@@ -206,3 +206,28 @@ def copy_array_of_registers(n: int, m: int):
     for qr_in, qr_out in zip(qarr_in, qarr_out):
         qrout.apply(qrout_copy_cell, qr_in, qr_out)
     return qrout
+
+
+@build_gate("FAN_OUT", [int, int], lambda n, m: (n + 1) * m)
+def fan_out_register(n: int, m: int):
+    """Copy basis state 0/1 of a register of `m` qubits to `n` registers, all
+    0, through a tree of CNOTs: each layer copies every register already
+    holding the value onto a new one, so the depth is `ceil(log2(n + 1))`
+    instead of `n`. An array of cells is copied as a single register.
+
+    It acts on:
+    - The register to copy
+    - The `n` registers upon which we need to copy
+
+    Its inverse, `fan_out_register(n, m).dag()`, resets the `n` registers
+    to 0, provided they all hold a copy of the first one.
+    """
+    qrout = QRoutine()
+    copies = [qrout.new_wires(m) for _ in range(n + 1)]
+    qrout_copy = copy_register(m)
+    done = 1
+    while done <= n:
+        for i in range(min(done, n + 1 - done)):
+            qrout.apply(qrout_copy, copies[i], copies[done + i])
+        done *= 2
+    return qrout
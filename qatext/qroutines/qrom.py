@@ -0,0 +1,133 @@
+"""Table lookup (QROM) by unary iteration.
+
+`lookup` XORs `table[address - start]` into a target register, the address
+being held by a quantum register and the table being classical. The
+addresses are enumerated by a binary tree over the bits of the address
+register, from the most significant one: each internal node computes into
+an ancilla the AND of its control and of the value of its bit, lets the
+left subtree use it, turns it into the control of the right subtree with a
+single CNOT and uncomputes it. A leaf, i.e. an address, writes its entry
+with one CNOT per bit set, controlled by the ancilla of its parent.
+
+The address is promised to be in `[start, start + len(table))`: the
+subtrees outside the range are skipped, and the bit of a node only one
+child of which intersects the range is not tested at all. The lookup then
+costs at most `2 (len(table) - 1)` Toffolis and `m` CNOTs per entry, and uses
+`address_size - 1` ancillae, reset to zero.
+
+`iterate` exposes the enumeration itself, calling a function for each
+address with the qubit controlling it, and `write` the writing of an entry,
+also used by `bix.bix_data_unary`.
+"""
+from typing import Callable, List, Optional
+
+from qat.lang.AQASM.gates import CCNOT, CNOT, X
+from qat.lang.AQASM.misc import build_gate
+from qat.lang.AQASM.routines import QRoutine
+
+
+def iterate(qrout, address, ancillae, start: int, stop: int,
+            leaf: Callable, ctrl: Optional = None):
+    """Unary iteration over the addresses `[start, stop)` of `address`, big
+    endian, promised to hold one of them if `ctrl` is set (or if `ctrl` is
+    None): `leaf(qrout, ctrl_v, v)` is called for each address `v`, `ctrl_v`
+    being a qubit set iff `ctrl` is and the address is `v`, or None if the
+    address is known to be `v`. It needs `len(address)` ancillae, or one less
+    if `ctrl` is None, reset to zero."""
+    _iterate(qrout, address, ancillae, start, stop, leaf, ctrl,
+             len(address), 0)
+
+
+def _iterate(qrout, address, ancillae, start, stop, leaf, ctrl, level: int,
+             base: int):
+    """Enumerate the addresses `[base, base + 2^level)` of the range, `ctrl`
+    being set iff the address is one of them."""
+    if level == 0:
+        leaf(qrout, ctrl, base)
+        return
+    half = 1 << (level - 1)
+    has_left = base + half > start
+    has_right = base + half < stop
+    if not has_right:
+        _iterate(qrout, address, ancillae, start, stop, leaf, ctrl,
+                 level - 1, base)
+        return
+    if not has_left:
+        _iterate(qrout, address, ancillae, start, stop, leaf, ctrl,
+                 level - 1, base + half)
+        return
+    bit = address[len(address) - level]
+    if ctrl is None:
+        # the root tests its bit directly
+        qrout.apply(X, bit)
+        _iterate(qrout, address, ancillae, start, stop, leaf, bit,
+                 level - 1, base)
+        qrout.apply(X, bit)
+        _iterate(qrout, address, ancillae, start, stop, leaf, bit,
+                 level - 1, base + half)
+        return
+    anc = ancillae[level - 1]
+    qrout.apply(X, bit)
+    qrout.apply(CCNOT, ctrl, bit, anc)
+    qrout.apply(X, bit)
+    _iterate(qrout, address, ancillae, start, stop, leaf, anc, level - 1,
+             base)
+    # ctrl and not bit -> ctrl and bit
+    qrout.apply(CNOT, ctrl, anc)
+    _iterate(qrout, address, ancillae, start, stop, leaf, anc, level - 1,
+             base + half)
+    qrout.apply(CCNOT, ctrl, bit, anc)
+
+
+def write(qrout, ctrl: Optional, target, value: int, anc: Optional = None):
+    """XOR `value` into `target`, big endian, if `ctrl` is set, or
+    unconditionally if it is None.
+
+    `ctrl` may also be a pair of qubits, both of which must be set: each bit
+    set of `value` then costs a Toffoli, unless there are more than two of
+    them and an ancilla `anc` is given, in which case the AND of the pair is
+    computed into `anc` and reset to zero after the CNOTs."""
+    m = len(target)
+    bits = [target[i] for i in range(m) if (value >> (m - 1 - i)) & 1]
+    if isinstance(ctrl, tuple):
+        if anc is None or len(bits) <= 2:
+            for q in bits:
+                qrout.apply(CCNOT, *ctrl, q)
+            return
+        qrout.apply(CCNOT, *ctrl, anc)
+        write(qrout, anc, target, value)
+        qrout.apply(CCNOT, *ctrl, anc)
+        return
+    for q in bits:
+        if ctrl is None:
+            qrout.apply(X, q)
+        else:
+            qrout.apply(CNOT, ctrl, q)
+
+
+@build_gate("QROM", [int, int, List, int], lambda a, m, t, s: a + m)
+def lookup(address_size: int, m: int, table: List, start: int):
+    """XOR `table[address - start]` into the target register.
+
+    It should be applied to the following registers:
+    - the address, of `address_size` qubits, big endian, holding a value in
+      `[start, start + len(table))`; it is left unchanged
+    - the target, of `m` qubits, big endian
+
+    It uses `address_size - 1` ancillae, reset to zero at the end."""
+    if not table or start < 0 or start + len(table) > 1 << address_size:
+        raise ValueError(
+            f"the table of {len(table)} entries from {start} does not fit "
+            f"in {address_size} address qubits")
+    qrout = QRoutine()
+    address = qrout.new_wires(address_size)
+    target = qrout.new_wires(m)
+    ancillae = []
+    if address_size > 1:
+        ancillae = qrout.new_wires(address_size - 1)
+        qrout.set_ancillae(ancillae)
+    table = list(table)
+    iterate(
+        qrout, address, ancillae, start, start + len(table),
+        lambda qrout, ctrl, v: write(qrout, ctrl, target, table[v - start]))
+    return qrout
@@ -0,0 +1,71 @@
+"""Controlled cyclic shifts of arrays of registers, in logarithmic depth.
+
+A rotation is two layers of disjoint SWAPs (see `rotate.reversal`).
+Controlling it controls each SWAP, and the Fredkins of a layer, which all
+share the control qubit, run one after the other: the depth of
+`rotate.reg_reversal(...).ctrl()` grows with the size of the array.
+`controlled_rotation` is `permutation.controlled_permutation` with
+`log_depth`: it first copies the control onto one ancilla per SWAP of a
+layer with `qregs_init.fan_out_register`, so that all the Fredkins of a
+layer run in parallel, then erases the copies: its depth is at most
+`2 ceil(log2(nregs * m / 2)) + 2`.
+
+`barrel_shift` rotates by the value of a quantum register, one controlled
+rotation by a power of two per bit.
+"""
+from qat.lang.AQASM.gates import I
+from qat.lang.AQASM.misc import build_gate
+from qat.lang.AQASM.routines import QRoutine
+from qatext.qroutines.qubitshuffle import permutation
+from qatext.qroutines.qubitshuffle.rotate import reg_reversal
+
+
+@build_gate("CROT_REG_D", [int, int, int], arity=lambda n, m, _: 1 + n * m)
+def controlled_rotation(nregs: int, m: int, d: int):
+    """Rotate an array of `nregs` registers of `m` qubits by `d` positions if
+    the control is set: left if `d > 0`, right if `d < 0`.
+
+    It should be applied to the following registers:
+    - the control qubit
+    - the array, `nregs * m` qubits
+
+    It uses at most `nregs * m // 2 - 1` ancillae, holding the copies of the
+    control, reset to zero at the end."""
+    qrout = QRoutine()
+    ctrl = qrout.new_wires(1)
+    wires = qrout.new_wires(nregs * m)
+    qrout.apply(
+        permutation.controlled_permutation(
+            permutation.rotation(nregs * m, d * m), True), ctrl, wires)
+    return qrout
+
+
+@build_gate("BARREL_SHIFT", [int, int, int, bool],
+            arity=lambda n, m, b, _: b + n * m)
+def barrel_shift(nregs: int, m: int, nbits: int, log_depth: bool):
+    """Rotate an array of `nregs` registers of `m` qubits to the left by the
+    value of a register of `nbits` qubits, modulo `nregs`.
+
+    It should be applied to the following registers:
+    - the shift, `nbits` qubits, big endian, left unchanged
+    - the array, `nregs * m` qubits
+
+    Each bit of the shift controls a rotation by its power of two: if
+    `log_depth`, a `controlled_rotation`, otherwise `rotate.reg_reversal`
+    controlled by qat, with half the gates and no ancilla, but a depth
+    linear in the size of the array."""
+    qrout = QRoutine()
+    shift = qrout.new_wires(nbits)
+    wires = qrout.new_wires(nregs * m)
+    amounts = [(k, (1 << k) % nregs) for k in range(nbits)]
+    for k, d in amounts:
+        if not d:
+            continue
+        if log_depth:
+            qrot = controlled_rotation(nregs, m, d)
+        else:
+            qrot = reg_reversal(nregs, m, d).ctrl()
+        qrout.apply(qrot, shift[nbits - 1 - k], wires)
+    if not any(d for _, d in amounts):
+        qrout.apply(I, wires[0])
+    return qrout
@@ -0,0 +1,151 @@
+"""SWAP networks of arbitrary permutations of wires.
+
+A permutation of `n` wires is given as a list `perm`, the state on wire `i`
+moving to wire `perm[i]`. It is synthesised as layers of disjoint SWAPs,
+either:
+
+- `swap_layers`: the fewest SWAPs, `n` minus the number of cycles, in at
+  most two layers. A cycle `c_0 -> c_1 -> ... -> c_{L-1}` is the product of
+  two reflections, `c_k <-> c_{-k}` then `c_k <-> c_{1-k}`, of `L - 1` SWAPs
+  together; the permutation is one layer if it is an involution.
+- `adjacent_swap_layers`: SWAPs of neighbouring wires only, by odd-even
+  transposition sort on the destinations: as many SWAPs as inversions, the
+  fewest possible, in at most `n` layers.
+
+`permutation` applies one of the networks. `controlled_permutation` applies
+the first one controlled by a qubit, one Fredkin per SWAP; with
+`log_depth`, the control is first copied onto one ancilla per SWAP of a
+layer with `qregs_init.fan_out_register`, so that the Fredkins of a layer
+run in parallel.
+
+`reverse.reverse`, `rotate.reversal` and `barrel.controlled_rotation` are
+built on it: a rotation of `n` wires by `d` takes `n - gcd(n, d)` SWAPs
+instead of about `1.5 n` with three reversals.
+"""
+from typing import List
+
+from qat.lang.AQASM.gates import SWAP, I
+from qat.lang.AQASM.misc import build_gate
+from qat.lang.AQASM.routines import QRoutine
+from qatext.qroutines.qregs_init import fan_out_register
+
+Layers = list[list[tuple[int, int]]]
+
+
+def _check(perm: List):
+    if sorted(perm) != list(range(len(perm))):
+        raise ValueError(f"{perm} is not a permutation")
+
+
+def rotation(nqubits: int, d: int) -> list[int]:
+    """The permutation rotating `nqubits` wires by `d` positions, left if
+    `d > 0`, right if `d < 0`."""
+    return [(i - d) % nqubits for i in range(nqubits)]
+
+
+def reversal(nqubits: int) -> list[int]:
+    """The permutation reversing `nqubits` wires."""
+    return [nqubits - 1 - i for i in range(nqubits)]
+
+
+def cycles(perm: List) -> list[list[int]]:
+    """The cycles of `perm` of two wires or more, each from its smallest
+    wire."""
+    _check(perm)
+    seen = [False] * len(perm)
+    res = []
+    for start in range(len(perm)):
+        cycle = []
+        i = start
+        while not seen[i]:
+            seen[i] = True
+            cycle.append(i)
+            i = perm[i]
+        if len(cycle) > 1:
+            res.append(cycle)
+    return res
+
+
+def swap_layers(perm: List) -> Layers:
+    """The fewest SWAPs applying `perm`, in at most two layers."""
+    first, second = [], []
+    for cycle in cycles(perm):
+        size = len(cycle)
+        first += [(cycle[k], cycle[size - k])
+                  for k in range(1, (size + 1) // 2)]
+        second += [(cycle[1 - k], cycle[k])
+                   for k in range(1, size // 2 + 1)]
+    return [layer for layer in (first, second) if layer]
+
+
+def adjacent_swap_layers(perm: List) -> Layers:
+    """The fewest SWAPs of neighbouring wires applying `perm`, in at most
+    `len(perm)` layers."""
+    _check(perm)
+    # the destination of the state on each wire
+    dest = list(perm)
+    layers = []
+    for parity in range(len(dest)):
+        layer = []
+        for i in range(parity % 2, len(dest) - 1, 2):
+            if dest[i] > dest[i + 1]:
+                dest[i], dest[i + 1] = dest[i + 1], dest[i]
+                layer.append((i, i + 1))
+        if layer:
+            layers.append(layer)
+    return layers
+
+
+def apply_layers(qrout: QRoutine, wires, layers: Layers):
+    """Apply the SWAPs of `layers` to `wires`, or an identity if there are
+    none."""
+    for layer in layers:
+        for q1, q2 in layer:
+            qrout.apply(SWAP, wires[q1], wires[q2])
+    if not layers:
+        qrout.apply(I, wires[0])
+
+
+@build_gate("PERMUTE", [List, bool], arity=lambda p, _: len(p))
+def permutation(perm: List, adjacent: bool):
+    """Move the state on wire `i` to wire `perm[i]`, with `swap_layers`, or
+    `adjacent_swap_layers` if `adjacent`."""
+    qrout = QRoutine()
+    wires = qrout.new_wires(len(perm))
+    layers = adjacent_swap_layers(perm) if adjacent else swap_layers(perm)
+    apply_layers(qrout, wires, layers)
+    return qrout
+
+
+@build_gate("CPERMUTE", [List, bool], arity=lambda p, _: 1 + len(p))
+def controlled_permutation(perm: List, log_depth: bool):
+    """`permutation(perm, False)` if the control is set.
+
+    It should be applied to the following registers:
+    - the control qubit
+    - the wires, `len(perm)` qubits
+
+    With `log_depth`, it uses one ancilla less than the SWAPs of the largest
+    layer, holding the copies of the control, reset to zero at the end."""
+    qrout = QRoutine()
+    ctrl = qrout.new_wires(1)
+    wires = qrout.new_wires(len(perm))
+    layers = swap_layers(perm)
+    if not layers:
+        qrout.apply(I, wires[0])
+        return qrout
+    copies = [ctrl]
+    ncopies = max(len(layer) for layer in layers)
+    if log_depth and ncopies > 1:
+        ancillae = qrout.new_wires(ncopies - 1)
+        qrout.set_ancillae(ancillae)
+        copies += list(ancillae)
+        qrout_fan_out = fan_out_register(ncopies - 1, 1)
+        qrout.apply(qrout_fan_out, copies)
+    for layer in layers:
+        for i, (q1, q2) in enumerate(layer):
+            qrout.apply(SWAP.ctrl(), copies[i % len(copies)], wires[q1],
+                        wires[q2])
+    if len(copies) > 1:
+        qrout.apply(qrout_fan_out.dag(), copies)
+    return qrout
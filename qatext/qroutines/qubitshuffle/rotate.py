@@ -1,8 +1,8 @@
-from qat.lang.AQASM.gates import SWAP, I
+from qat.lang.AQASM.gates import SWAP
 from qat.lang.AQASM.routines import QRoutine
 from qat.lang.AQASM.misc import build_gate
 from qat.lang.AQASM.gates import AbstractGate
-from qatext.qroutines.qubitshuffle.reverse import reverse
+from qatext.qroutines.qubitshuffle import permutation
 
 rotate = AbstractGate("ROT_D", [int, int], arity=lambda n, _: n)
 rotate_reg = AbstractGate("ROT_REG_D", [int, int], arity=lambda n, _: n)
@@ -38,22 +38,19 @@ def swap_qreg_cells(n_cell_size):
 @build_gate("ROT_D", [int, int], arity=lambda n, _: n)
 def reversal(nqubits: int, d: int):
     """Rotate a set of nqbubits by d position. If d is >0, then it's a left
-    rotation; if it's < 0, it's a right rotation."""
+    rotation; if it's < 0, it's a right rotation.
+
+    Despite its name, it no longer composes three reversals: the rotation is
+    synthesised by `permutation.swap_layers`, `nqubits - gcd(nqubits, d)`
+    SWAPs in two layers."""
     qrout = QRoutine()
     wires = qrout.new_wires(nqubits)
-    d1 = abs(d) % nqubits
-    if d1 == 0 or d1 == nqubits:
-        qrout.apply(I, wires[0])
-        return qrout
-    qrout.apply(reverse(nqubits), wires)
-    if d > 0:
-        qrout.apply(reverse(d1), wires[nqubits-d1:])
-        qrout.apply(reverse(nqubits-d1), wires[:nqubits-d1])
-    else:
-        qrout.apply(reverse(d1), wires[:d1])
-        qrout.apply(reverse(nqubits-d1), wires[d1:])
+    permutation.apply_layers(qrout, wires,
+                             permutation.swap_layers(
+                                 permutation.rotation(nqubits, d)))
     return qrout
 
+
 @build_gate("ROT_REG_D", [int, int, int], arity=lambda n, n2, _: n * n2)
 def reg_reversal(nregs: int,  qreg_size: int, d: int):
     """Rotate a set of `nregs` register by `d` positions. If d is >0, then it's
@@ -0,0 +1,173 @@
+"""Enumeration and ranking of the bitstrings of length `n` and Hamming weight
+`k`, i.e. of the basis states in the support of a Dicke state.
+
+A bitstring is handled as the integer whose `i`-th bit is the `i`-th bit of
+the string, counting from the least significant one; `littleEndian` has the
+same meaning as in `conversion`, when turning the integers back to bits.
+
+The integers of weight `k` are ranked in the combinatorial number system:
+the integer with bits set in positions c_1 < ... < c_k has rank
+sum_i C(c_i, i), which is also its position in ascending order. Ranks are
+contiguous, hence a range of ranks is a natural unit of work to split the
+enumeration in chunks or among processes.
+
+The NumPy functions work on int64 and support `n` up to 63.
+"""
+import functools
+import logging
+from math import comb
+from typing import Iterator
+
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+
+MAX_BITS = 63
+
+
+def next_same_weight(x: int) -> int:
+    """Smallest integer greater than `x` with the same Hamming weight
+    (Gosper's hack); `x` must be positive."""
+    lowest = x & -x
+    ripple = x + lowest
+    return (((ripple ^ x) >> 2) // lowest) | ripple
+
+
+def weight_k_ints(n: int, k: int) -> Iterator[int]:
+    """All the C(n, k) integers of `n` bits having weight `k`, in ascending
+    order."""
+    if k < 0 or k > n:
+        return
+    if k == 0:
+        yield 0
+        return
+    x = (1 << k) - 1
+    end = 1 << n
+    while x < end:
+        yield x
+        x = next_same_weight(x)
+
+
+def rank(x: int) -> int:
+    """Rank of `x` among the integers having its same weight."""
+    r = 0
+    i = 0
+    while x:
+        c = (x & -x).bit_length() - 1
+        i += 1
+        r += comb(c, i)
+        x &= x - 1
+    return r
+
+
+def unrank(r: int, k: int) -> int:
+    """Integer of weight `k` having rank `r`."""
+    x = 0
+    for i in range(k, 0, -1):
+        # largest c such that C(c, i) <= r
+        c = i - 1
+        while comb(c + 1, i) <= r:
+            c += 1
+        r -= comb(c, i)
+        x |= 1 << c
+    return x
+
+
+@functools.lru_cache(maxsize=None)
+def _binomials(n: int) -> np.ndarray:
+    """Table `t[c, i] = C(c, i)`, for `0 <= c, i <= n`."""
+    if n > MAX_BITS:
+        raise ValueError(f"at most {MAX_BITS} bits are supported, given {n}")
+    table = np.array([[comb(c, i) for i in range(n + 1)]
+                      for c in range(n + 1)],
+                     dtype=np.int64)
+    table.setflags(write=False)
+    return table
+
+
+def rank_array(xs: np.ndarray, n: int) -> np.ndarray:
+    """Vectorised `rank` of integers of `n` bits, all of the same weight."""
+    xs = np.asarray(xs, dtype=np.int64)
+    table = _binomials(n)
+    ranks = np.zeros(xs.shape, dtype=np.int64)
+    seen = np.zeros(xs.shape, dtype=np.int64)
+    for c in range(n):
+        bit = (xs >> c) & 1
+        seen += bit
+        ranks += bit * table[c, seen]
+    return ranks
+
+
+def unrank_array(ranks: np.ndarray, n: int, k: int) -> np.ndarray:
+    """Vectorised `unrank` of ranks `0 <= r < C(n, k)`; it takes `k` passes
+    of binary search over the columns of the table of binomials."""
+    ranks = np.array(ranks, dtype=np.int64)
+    table = _binomials(n)
+    xs = np.zeros(ranks.shape, dtype=np.int64)
+    for i in range(k, 0, -1):
+        # column i is non-decreasing in c
+        c = np.searchsorted(table[:n, i], ranks, side="right") - 1
+        ranks -= table[c, i]
+        xs |= np.left_shift(1, c, dtype=np.int64)
+    return xs
+
+
+def weight_k_chunks(n: int,
+                    k: int,
+                    chunk_size: int = 1 << 16,
+                    start: int = 0,
+                    stop: int | None = None) -> Iterator[np.ndarray]:
+    """Integers of weight `k` with ranks in `[start, stop)`, in ascending
+    order and in arrays of at most `chunk_size` elements; `stop` defaults to
+    C(n, k). The memory used is bounded by `chunk_size`, not by C(n, k)."""
+    if k < 0 or k > n:
+        return
+    stop = comb(n, k) if stop is None else min(stop, comb(n, k))
+    for lo in range(start, stop, chunk_size):
+        hi = min(lo + chunk_size, stop)
+        yield unrank_array(np.arange(lo, hi, dtype=np.int64), n, k)
+
+
+def to_bitarrays(xs: np.ndarray, n: int, littleEndian=False) -> np.ndarray:
+    """Matrix of bits, one row of length `n` for each integer; the
+    vectorised `conversion.get_bitarray_from_int`."""
+    xs = np.asarray(xs, dtype=np.int64)
+    shifts = np.arange(n) if littleEndian else np.arange(n - 1, -1, -1)
+    return ((xs[:, None] >> shifts) & 1).astype(np.uint8)
+
+
+def weight_k_packed_chunks(n: int,
+                           k: int,
+                           chunk_size: int = 1 << 16,
+                           littleEndian=False,
+                           start: int = 0,
+                           stop: int | None = None) -> Iterator[np.ndarray]:
+    """As `weight_k_chunks`, but each bitstring is a row of ceil(n / 8)
+    bytes, packed with `np.packbits` from `to_bitarrays`."""
+    for xs in weight_k_chunks(n, k, chunk_size, start, stop):
+        yield np.packbits(to_bitarrays(xs, n, littleEndian), axis=1)
+
+
+def bitslice(xs: np.ndarray, n: int) -> np.ndarray:
+    """Transpose a batch of integers of `n` bits into `n` rows of uint64
+    words: bit `j` of word `w` in row `i` is bit `i` of `xs[64 * w + j]`.
+    Missing elements of the last word are 0.
+
+    This is the layout of a bit-sliced simulation, where a single bitwise
+    operation on a row acts on 64 inputs at once."""
+    xs = np.asarray(xs, dtype=np.int64)
+    words = -(-len(xs) // 64)
+    bits = ((xs[None, :] >> np.arange(n)[:, None]) & 1).astype(np.uint8)
+    packed = np.zeros((n, words * 8), dtype=np.uint8)
+    packed[:, :-(-len(xs) // 8)] = np.packbits(bits, axis=1,
+                                                bitorder="little")
+    return packed.view("<u8").astype(np.uint64)
+
+
+def unbitslice(rows: np.ndarray, size: int) -> np.ndarray:
+    """Inverse of `bitslice`, returning the first `size` integers."""
+    rows = np.ascontiguousarray(rows, dtype="<u8")
+    n = rows.shape[0]
+    bits = np.unpackbits(rows.view(np.uint8), axis=1,
+                         bitorder="little")[:, :size].astype(np.int64)
+    return (bits << np.arange(n)[:, None]).sum(axis=0)
@@ -0,0 +1,270 @@
+"""On-disk cache of compiled circuits.
+
+`CircuitCache.build(builder, *args, link=...)` returns the circuit of
+`builder(*args).to_circ(link=link)` together with the register map
+(`_qregnames_to_properties`) of the `ProgramWrapper` or `QRoutineWrapper`
+built. The first call builds and compiles; the next ones, in this process
+or any later one, load both from disk without calling `builder`.
+
+An entry is keyed by a hash of the builder (module and qualified name), of
+its arguments and of the link, and of the versions of the
+libraries: myqlm and the sources of `qatext`, so that editing a routine
+invalidates the circuits using it. Builders defined outside `qatext`, e.g.
+`cssp.build`, also hash the source of their module. The arguments are
+serialised by `_canonical`: their `repr`, except for the NumPy arrays, whose
+`repr` elides the middle of the large ones, and which are hashed entirely.
+
+Each entry is a `.circ` file, written with `Circuit.dump`, and a `.json`
+file holding the register map. Reading an entry touches it; when the
+entries exceed `max_bytes`, the least recently used ones are deleted.
+Writes go through a file of the `tmp` subdirectory and `os.replace`, so
+that concurrent processes never read a partial entry, nor evict one being
+written; the files another process removes meanwhile are skipped.
+
+The registers of a cached map are not rebuilt: `qregs` is None, and the
+qubits are the ones of `slic`.
+"""
+import functools
+import hashlib
+import importlib.metadata
+import inspect
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+import numpy as np
+from qat.core import Circuit
+from qat.lang.AQASM.program import Program
+from qatext.utils.qatmgmt.program import QRegsProperties
+from qatext.utils.qatmgmt.routines import QRoutineWrapper
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_DIRECTORY = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+    "qatext", "circuits")
+DEFAULT_MAX_BYTES = 1 << 30
+
+_QTYPES = {"int": int, "bool": bool, "str": str}
+
+
+class CachedCircuit(NamedTuple):
+    circuit: Circuit
+    registers: dict[str, QRegsProperties]
+
+
+@functools.lru_cache(maxsize=None)
+def _sources_digest(path: str) -> str:
+    """Digest of all the Python sources under `path`."""
+    digest = hashlib.sha256()
+    for source in sorted(Path(path).rglob("*.py")):
+        digest.update(str(source.relative_to(path)).encode())
+        digest.update(source.read_bytes())
+    return digest.hexdigest()
+
+
+def _library_version() -> str:
+    import qatext
+    return "/".join([
+        importlib.metadata.version("myqlm"),
+        _sources_digest(list(qatext.__path__)[0]),
+    ])
+
+
+def _link_name(item) -> str:
+    return getattr(item, "__name__", None) or getattr(item, "name", repr(item))
+
+
+def _canonical(value) -> str:
+    """Serialisation of `value` telling apart any two different arguments,
+    looking into the containers for NumPy arrays."""
+    if isinstance(value, np.ndarray):
+        data = hashlib.sha256(np.ascontiguousarray(value).tobytes())
+        return f"ndarray({value.dtype.str}, {value.shape}, {data.hexdigest()})"
+    if isinstance(value, (list, tuple)):
+        items = ", ".join(_canonical(item) for item in value)
+        return f"{type(value).__name__}({items})"
+    if isinstance(value, (set, frozenset)):
+        items = ", ".join(sorted(_canonical(item) for item in value))
+        return f"{type(value).__name__}({items})"
+    if isinstance(value, dict):
+        items = ", ".join(
+            sorted(f"{_canonical(k)}: {_canonical(v)}"
+                   for k, v in value.items()))
+        return f"dict({items})"
+    return repr(value)
+
+
+def _compile(built, link: Optional[list]) -> Circuit:
+    if isinstance(built, QRoutineWrapper):
+        pr = Program()
+        pr.apply(built._qroutine, pr.qalloc(built.arity))
+        return pr.to_circ(link=link)
+    return built.to_circ(link=link)
+
+
+def _registers_to_json(registers: dict[str, QRegsProperties]) -> dict:
+    return {
+        name: {
+            "start": p.slic.start,
+            "stop": p.slic.stop,
+            "n": p.n,
+            "m": p.m,
+            "qtype": p.qtype.__name__,
+            "unknown_size": p.unknown_size,
+        }
+        for name, p in registers.items()
+    }
+
+
+def _registers_from_json(data: dict) -> dict[str, QRegsProperties]:
+    return {
+        name: QRegsProperties(slice(p["start"], p["stop"]), p["n"], p["m"],
+                              None, _QTYPES[p["qtype"]], p["unknown_size"])
+        for name, p in data.items()
+    }
+
+
+class CircuitCache:
+    """Compiled circuits stored in `directory`, at most `max_bytes` of
+    them."""
+
+    def __init__(self,
+                 directory: Optional[str] = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory or DEFAULT_DIRECTORY)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # the files being written, out of the globs of the entries
+        self._tmp_directory = self.directory / "tmp"
+        self._tmp_directory.mkdir(exist_ok=True)
+
+    def key(self, builder: Callable, args: tuple, kwargs: dict,
+            link: Optional[list]) -> str:
+        """Key of the circuit of `builder(*args, **kwargs)` compiled with
+        `link`."""
+        module = inspect.getmodule(builder)
+        parts = [
+            _library_version(),
+            f"{builder.__module__}.{builder.__qualname__}",
+            _canonical(args),
+            _canonical(kwargs),
+            repr([_link_name(item) for item in link or []]),
+        ]
+        if not builder.__module__.startswith("qatext"):
+            parts.append(inspect.getsource(module) if module else "")
+        return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.directory / f"{key}.circ", self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[CachedCircuit]:
+        """The entry of `key`, None if missing."""
+        circ_path, json_path = self._paths(key)
+        try:
+            registers = json.loads(json_path.read_text())
+            circ = Circuit.load(str(circ_path))
+            for path in (circ_path, json_path):
+                os.utime(path)
+        except OSError:
+            # missing, or evicted by another process meanwhile
+            return None
+        return CachedCircuit(circ, _registers_from_json(registers))
+
+    def put(self, key: str, circ: Circuit, registers: dict):
+        """Store an entry, `registers` being the register map as given by
+        `_registers_to_json`, then evict the least recently used entries
+        above the size limit."""
+        circ_path, json_path = self._paths(key)
+        self._write(circ_path, circ.dump)
+
+        def dump_registers(tmp: str):
+            with open(tmp, "w") as f:
+                json.dump(registers, f)
+
+        # the json is written last: an entry is complete once it exists
+        self._write(json_path, dump_registers)
+        self._evict()
+
+    def _write(self, path: Path, write: Callable[[str], None]):
+        """Write `path` with `write(tmp)` then `os.replace`; the temporary
+        file is removed if `write` fails."""
+        # Circuit.dump adds the suffix if missing
+        fd, tmp = tempfile.mkstemp(suffix=path.suffix,
+                                   dir=self._tmp_directory)
+        os.close(fd)
+        try:
+            write(tmp)
+            os.replace(tmp, path)
+        finally:
+            Path(tmp).unlink(missing_ok=True)
+
+    def build(self,
+              builder: Callable,
+              *args,
+              link: Optional[list] = None,
+              **kwargs) -> CachedCircuit:
+        """The circuit of `builder(*args, **kwargs)`, which returns a
+        `ProgramWrapper`, a `QRoutineWrapper` or a `Program`, compiled with
+        `link`; it is built only if not in the cache."""
+        key = self.key(builder, args, kwargs, link)
+        cached = self.get(key)
+        if cached is not None:
+            LOGGER.debug("cache hit %s", key)
+            return cached
+        built = builder(*args, **kwargs)
+        circ = _compile(built, link)
+        registers = _registers_to_json(
+            getattr(built, "_qregnames_to_properties", {}))
+        self.put(key, circ, registers)
+        # the same map as a cache hit would give
+        return CachedCircuit(circ, _registers_from_json(registers))
+
+    def entries(self) -> list[str]:
+        """Keys of the entries, the least recently used first."""
+        jsons = []
+        for path in self.directory.glob("*.json"):
+            stat = _stat(path)
+            if stat is not None:
+                jsons.append((stat.st_mtime, path.stem))
+        return [key for _, key in sorted(jsons)]
+
+    def size(self) -> int:
+        """Bytes used by the entries."""
+        return sum(
+            _size(p) for p in self.directory.iterdir()
+            if p.suffix in (".circ", ".json"))
+
+    def clear(self):
+        for key in self.entries():
+            self._remove(key)
+
+    def _remove(self, key: str):
+        for path in self._paths(key):
+            path.unlink(missing_ok=True)
+
+    def _evict(self):
+        size = self.size()
+        for key in self.entries():
+            if size <= self.max_bytes:
+                break
+            freed = sum(_size(p) for p in self._paths(key))
+            self._remove(key)
+            size -= freed
+            LOGGER.debug("evicted %s", key)
+
+
+def _stat(path: Path) -> Optional[os.stat_result]:
+    """The stat of `path`, None if another process removed it meanwhile."""
+    try:
+        return path.stat()
+    except FileNotFoundError:
+        return None
+
+
+def _size(path: Path) -> int:
+    stat = _stat(path)
+    return 0 if stat is None else stat.st_size
@@ -0,0 +1,40 @@
+"""Measures of compiled circuits, shared by the tests and the benchmarks:
+the flat circuit of a gate, its gate counts and its ASAP depth, and the
+`Resources` of a circuit, e.g. one loaded from a `CircuitCache`."""
+from typing import Optional
+
+from qat.lang.AQASM.program import Program
+from qatext.utils.qatmgmt.resources import Resources
+
+
+def flat_circuit(gate, link: Optional[list] = None, nqbits=None):
+    """Apply `gate` on a fresh program of `nqbits` qubits (by default the
+    arity of the gate) and compile it to an inlined circuit."""
+    pr = Program()
+    qbits = pr.qalloc(gate.arity if nqbits is None else nqbits)
+    pr.apply(gate, qbits[:gate.arity or nqbits])
+    return pr.to_circ(link=link, inline=True)
+
+
+def gate_counts(circ) -> dict[str, int]:
+    """Non-zero entries of the gate statistics of `circ`."""
+    return {k: v for k, v in circ.statistics()["gates"].items() if v > 0}
+
+
+def depth(circ) -> int:
+    """ASAP depth of the inlined circuit, each operation counting as one
+    layer."""
+    qbit_depth = [0] * circ.nbqbits
+    for op in circ:
+        layer = 1 + max(qbit_depth[q] for q in op.qbits)
+        for q in op.qbits:
+            qbit_depth[q] = layer
+    return max(qbit_depth, default=0)
+
+
+def circuit_resources(circ, nqbits: int) -> Resources:
+    """Resources of the compiled circuit of a program of `nqbits` qubits, the
+    other qubits of `circ` being its ancillae. Unlike `estimate_resources`,
+    the depth is the exact ASAP depth."""
+    return Resources(gate_counts(circ), circ.nbqbits, circ.nbqbits - nqbits,
+                     depth(circ))
@@ -0,0 +1,78 @@
+"""Repetition of a gate, e.g. the external iterations of the CSSP walk.
+
+`repeat(gate, times)` is a single gate standing for `gate` applied `times`
+times in a row. It is defined by squaring: `REPEAT(t)` applies `REPEAT(t //
+2)` twice, plus `gate` once if `t` is odd. Compiled with `to_circ(inline=
+False)` the circuit holds O(log t) definitions instead of `t` copies of the
+body; the flat expansion happens only when a consumer asks for it, e.g.
+`to_circ(inline=True)` or iterating over the circuit.
+
+The consumers of this repo recognise the repetition and do not expand it:
+`resources.ResourceEstimator` scales the cost of the body, and
+`qatext.qpus.batched.compile_program` emits a single repeated block.
+"""
+import itertools
+import weakref
+from typing import Optional
+
+from qat.lang.AQASM.gates import AbstractGate, ParamGate
+from qat.lang.AQASM.routines import QRoutine
+from qatext.utils.qatmgmt.routines import QRoutineWrapper
+
+# abstract gate of the repetitions of each body, by id of the body, as long
+# as the abstract gate is in use; as it holds the body, the id is not
+# reused meanwhile
+_ABSTRACT_GATES: "weakref.WeakValueDictionary[int, _RepeatGate]" = \
+    weakref.WeakValueDictionary()
+_NAMES = itertools.count()
+
+
+class _RepeatGate(AbstractGate):
+    """The abstract gate of the repetitions of `body`."""
+
+    def __init__(self, body, arity: int, name: str):
+        super().__init__(name, [int],
+                         arity=lambda _: arity,
+                         circuit_generator=self._power)
+        self.body = body
+        self.body_arity = arity
+
+    def _power(self, times: int) -> QRoutine:
+        qrout = QRoutine()
+        wires = qrout.new_wires(self.body_arity)
+        if times > 1:
+            half = self(times // 2)
+            qrout.apply(half, wires)
+            qrout.apply(half, wires)
+        if times % 2:
+            qrout.apply(self.body, wires)
+        return qrout
+
+
+def repeat(gate, times: int, arity: Optional[int] = None) -> ParamGate:
+    """The gate applying `gate` `times` times; `times` must be positive.
+    `arity` is needed only for gates without a fixed arity.
+
+    Repetitions of the same `gate` object share their definitions while
+    any of them is alive."""
+    if times < 1:
+        raise ValueError(f"a gate must be repeated at least once, got {times}")
+    if isinstance(gate, QRoutineWrapper):
+        gate = gate._qroutine
+    abstract_gate = _ABSTRACT_GATES.get(id(gate))
+    if abstract_gate is None:
+        arity = gate.arity if arity is None else arity
+        if arity is None:
+            raise ValueError("the gate has no arity, arity must be given")
+        abstract_gate = _RepeatGate(gate, arity, f"REPEAT_{next(_NAMES)}")
+        _ABSTRACT_GATES[id(gate)] = abstract_gate
+    return abstract_gate(times)
+
+
+def repeated(gate) -> Optional[tuple[object, int]]:
+    """The body and the number of repetitions of a gate built by `repeat`,
+    None for any other gate."""
+    if not isinstance(gate, ParamGate) or not isinstance(
+            gate.abstract_gate, _RepeatGate):
+        return None
+    return gate.abstract_gate.body, gate.parameters[0]
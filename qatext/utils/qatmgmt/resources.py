@@ -0,0 +1,275 @@
+"""Resource estimation without building the flat circuit.
+
+`Program.to_circ` inlines every routine, so learning the gate counts of a
+program repeating the same blocks many times (e.g. the external iterations
+of the CSSP walk) costs as much as compiling all of them. The estimator
+instead walks the hierarchy of routines and computes the cost of each
+definition once:
+- a `QRoutine` is memoised by identity;
+- a gate built by an `AbstractGate` with a circuit generator (e.g. every
+  `build_gate` routine of this repo, or `classarith.add`) is memoised by
+  abstract gate and parameters;
+- the controlled and daggered versions of a definition are derived from its
+  cost, without expanding them;
+- a gate built by `repeat.repeat` costs its body as many times as it is
+  repeated, one repetition after the other.
+The totals of a block are then the sum of the costs of its operations.
+
+Gates are named as in `Circuit.statistics()`, i.e. `C-` for each control
+and `D-` for the dagger of a gate which is not self-adjoint (e.g. `C-D-T`).
+The number of qubits includes the ancillae, which the routines allocate
+when applied and release at their end. The depth is an upper bound: each
+block is scheduled as soon as all its qubits are free, and occupies them
+until its last layer. Controlling a block serialises all its gates on the
+control qubit, so its depth becomes its gate count.
+
+Note that qat builds `routine.ctrl()` and `routine.dag()` eagerly for a
+`QRoutine`, copying all its operations: applying them repeatedly creates new
+definitions every time. Gates generated by an `AbstractGate` do not have
+this issue.
+"""
+from __future__ import annotations
+
+import logging
+from collections import Counter, defaultdict
+from typing import Hashable, NamedTuple, Optional
+
+from qat.lang.AQASM.gates import (CCNOT, CNOT, CSIGN, AbstractGate,
+                                  ParamGate)
+from qat.lang.AQASM.program import Program
+from qat.lang.AQASM.routines import QRoutine
+from qatext.utils.qatmgmt.program import ProgramWrapper
+from qatext.utils.qatmgmt.repeat import repeated
+from qatext.utils.qatmgmt.routines import QRoutineWrapper
+
+LOGGER = logging.getLogger(__name__)
+
+# operations used by qat to protect the ancillae, removed by `to_circ`
+_IGNORED_GATES = frozenset(("LOCK", "RELEASE"))
+
+# a single control on these gates gives another predefined gate
+_SINGLY_CONTROLLED = {"X": CNOT, "CNOT": CCNOT, "Z": CSIGN}
+
+# ancillae slots in the schedule of a block, negative to avoid its qubits
+_ANCILLAE = range(-1, -(1 << 62), -1)
+
+# (base gate name, number of controls, daggered)
+GateKey = tuple[str, int, bool]
+
+
+class _Cost(NamedTuple):
+    counts: Counter
+    arity: int
+    # peak number of ancillae allocated while the block runs
+    ancillae: int
+    depth: int
+    size: int
+
+
+class Resources(NamedTuple):
+    gates: dict[str, int]
+    qubits: int
+    ancillae: int
+    depth: int
+
+    @property
+    def gate_count(self) -> int:
+        return sum(self.gates.values())
+
+
+def gate_name(key: GateKey) -> str:
+    """Name used by qat for the base gate `key[0]` with `key[1]` controls,
+    daggered if `key[2]`."""
+    base, nbctrls, dag = key
+    return "C-" * nbctrls + ("D-" if dag else "") + base
+
+
+class ResourceEstimator:
+    """Estimate the resources of programs and routines, sharing the memoised
+    costs of the definitions across calls."""
+
+    def __init__(self, link: Optional[list] = None):
+        """`link` lists the modules or abstract gates implementing the gates
+        declared without a circuit generator, as in `Program.to_circ`."""
+        self._linked = _linked_gates(link or [])
+        self._costs: dict[Hashable, Optional[_Cost]] = {}
+        # keep the memoised routines alive, so that their ids are not reused
+        self._routines: list[QRoutine] = []
+        # base gates which are their own inverse, up to the parameters
+        self._self_adjoint: dict[str, bool] = {}
+
+    @property
+    def definitions(self) -> int:
+        """Number of distinct definitions met so far, including the
+        controlled and daggered variants."""
+        return len(self._costs)
+
+    def estimate(self, obj) -> Resources:
+        """Resources of a `Program`, a routine or a gate; the wrappers of
+        `qatext.utils.qatmgmt` are accepted as well."""
+        if isinstance(obj, ProgramWrapper):
+            obj = obj._program
+        if isinstance(obj, Program):
+            cost = self._block_cost(obj.op_list, "qbits", True)
+            cost = cost._replace(arity=obj.qbit_count)
+        else:
+            cost = self._cost(obj, True)[1]
+            if cost is None:
+                cost = _Cost(Counter(), obj.arity, 0, 0, 0)
+        gates = {gate_name(k): v for k, v in cost.counts.items() if v}
+        return Resources(gates, cost.arity + cost.ancillae, cost.ancillae,
+                         cost.depth)
+
+    def _cost(self, gate,
+              inlined: bool) -> tuple[Hashable, Optional[_Cost]]:
+        """Memoised cost of `gate`, None for the operations dropped by qat.
+        Returns also the key of the definition.
+
+        `inlined` tells if `gate` is applied by the program or by one of the
+        `QRoutine`s it applies, rather than by a generated circuit: only
+        there, qat renames the singly controlled X, CNOT and Z."""
+        # a failed attribute lookup on a QRoutine is slow: no getattr here
+        if isinstance(gate, QRoutineWrapper):
+            gate = gate._qroutine
+        if isinstance(gate, QRoutine):
+            key: Hashable = ("routine", id(gate), inlined)
+            if key not in self._costs:
+                self._routines.append(gate)
+                self._costs[key] = self._routine_cost(gate, inlined)
+            return key, self._costs[key]
+        if _is_variant(gate):
+            nbctrls, dag = 0, False
+            while _is_variant(gate):
+                nbctrls += gate.nb_ctrls or 0
+                dag ^= bool(gate.is_dag)
+                gate = gate.subgate
+            if inlined and nbctrls == 1 and gate.name in _SINGLY_CONTROLLED:
+                return self._cost(_SINGLY_CONTROLLED[gate.name], inlined)
+            sub_key, sub_cost = self._cost(gate, inlined)
+            key = ("variant", sub_key, nbctrls, dag, inlined)
+            if key not in self._costs:
+                cost = sub_cost
+                if cost is not None and dag:
+                    cost = self._dag(cost)
+                if cost is not None and nbctrls:
+                    cost = _ctrl(cost, nbctrls)
+                self._costs[key] = cost
+            return key, self._costs[key]
+        repetition = repeated(gate)
+        if repetition is not None:
+            body, times = repetition
+            body_key, body_cost = self._cost(body, False)
+            key = ("repeat", body_key, times)
+            if key not in self._costs:
+                self._costs[key] = (None if body_cost is None else
+                                    _repeat(body_cost, times))
+            return key, self._costs[key]
+        abstract_gate = self._implementation(gate)
+        if abstract_gate is not None:
+            key = ("generated", id(abstract_gate), repr(gate.parameters))
+            if key not in self._costs:
+                body = abstract_gate.circuit_generator(*gate.parameters)
+                self._routines.append(body)
+                self._costs[key] = self._routine_cost(body, False)
+            return key, self._costs[key]
+        key = ("leaf", gate.name, gate.arity)
+        if key not in self._costs:
+            self._costs[key] = self._leaf_cost(gate)
+        return key, self._costs[key]
+
+    def _implementation(self, gate) -> Optional[AbstractGate]:
+        """The abstract gate generating the circuit of `gate`, if any."""
+        if not isinstance(gate, ParamGate) or gate.abstract_gate is None:
+            return None
+        # as in qat, the linked implementations take precedence
+        if gate.name in self._linked:
+            return self._linked[gate.name]
+        if gate.abstract_gate.circuit_generator is not None:
+            return gate.abstract_gate
+        return None
+
+    def _leaf_cost(self, gate) -> Optional[_Cost]:
+        if gate.name in _IGNORED_GATES:
+            return None
+        if gate.name not in self._self_adjoint:
+            inverse = gate.dag()
+            self._self_adjoint[gate.name] = not (inverse.subgate is not None
+                                                 and inverse.is_dag)
+        return _Cost(Counter({(gate.name, 0, False): 1}), gate.arity, 0, 1, 1)
+
+    def _routine_cost(self, routine: QRoutine, inlined: bool) -> _Cost:
+        cost = self._block_cost(routine.op_list, "args", inlined)
+        width = routine.max_wire + 1
+        return cost._replace(arity=routine.arity,
+                             ancillae=width - routine.arity + cost.ancillae)
+
+    def _block_cost(self, op_list, qbits_attr: str, inlined: bool) -> _Cost:
+        counts: Counter = Counter()
+        levels: dict[int, int] = defaultdict(int)
+        ancillae = 0
+        size = 0
+        for op in op_list:
+            gate = getattr(op, "gate", None)
+            if gate is None:
+                continue
+            cost = self._cost(gate, inlined)[1]
+            if cost is None:
+                continue
+            counts.update(cost.counts)
+            size += cost.size
+            ancillae = max(ancillae, cost.ancillae)
+            # qat reuses the same ancillae for all the operations of a block
+            qbits = [*getattr(op, qbits_attr), *_ANCILLAE[:cost.ancillae]]
+            end = max(levels[q] for q in qbits) + cost.depth
+            for q in qbits:
+                levels[q] = end
+        return _Cost(counts, 0, ancillae, max(levels.values(), default=0),
+                     size)
+
+    def _dag(self, cost: _Cost) -> _Cost:
+        counts: Counter = Counter()
+        for (base, nbctrls, dag), v in cost.counts.items():
+            if not self._self_adjoint[base]:
+                dag = not dag
+            counts[base, nbctrls, dag] += v
+        return cost._replace(counts=counts)
+
+
+def _linked_gates(link: list) -> dict[str, AbstractGate]:
+    linked = {}
+    for item in link:
+        gates = [item] if isinstance(item, AbstractGate) else [
+            getattr(item, attr) for attr in dir(item)
+        ]
+        for gate in gates:
+            if (isinstance(gate, AbstractGate)
+                    and gate.circuit_generator is not None):
+                linked[gate.name] = gate
+    return linked
+
+
+def _is_variant(gate) -> bool:
+    """True for the controlled or daggered version of another gate."""
+    return gate.subgate is not None and bool(gate.nb_ctrls or gate.is_dag)
+
+
+def _ctrl(cost: _Cost, nbctrls: int) -> _Cost:
+    counts = Counter({(base, c + nbctrls, dag): v
+                      for (base, c, dag), v in cost.counts.items()})
+    # every gate now acts on the control qubits
+    return cost._replace(counts=counts,
+                         arity=cost.arity + nbctrls,
+                         depth=cost.size)
+
+
+def _repeat(cost: _Cost, times: int) -> _Cost:
+    counts = Counter({k: v * times for k, v in cost.counts.items()})
+    return cost._replace(counts=counts,
+                         depth=cost.depth * times,
+                         size=cost.size * times)
+
+
+def estimate_resources(obj, link: Optional[list] = None) -> Resources:
+    """Resources of a `Program`, a routine or a gate, estimated with a fresh
+    `ResourceEstimator`."""
+    return ResourceEstimator(link).estimate(obj)
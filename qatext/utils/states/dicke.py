@@ -0,0 +1,95 @@
+"""Exact Dicke states, to be used as a reference in place of simulating the
+preparation circuit.
+
+The Dicke state D^n_k is the uniform superposition of the C(n, k) bitstrings
+of length `n` and Hamming weight `k`, all with amplitude 1/sqrt(C(n, k)). It
+is symmetric under any permutation of the qubits, hence it does not depend
+on the endianness used to turn a bitstring into an index.
+"""
+import functools
+import logging
+from math import comb
+from typing import TYPE_CHECKING
+
+import numpy as np
+from qatext.utils.bits.combinatorics import weight_k_chunks
+
+if TYPE_CHECKING:
+    from qat.core.wrappers.result import Result
+
+LOGGER = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def dicke_support(n: int, k: int) -> np.ndarray:
+    """Indexes of the basis states of weight `k` on `n` qubits, in ascending
+    order.
+
+    The position of an index in this array is its rank in the combinatorial
+    number system (see `qatext.utils.bits.combinatorics`)."""
+    if k < 0 or k > n:
+        raise ValueError(f"weight {k} not in [0, {n}]")
+    support = np.concatenate(list(weight_k_chunks(n, k)))
+    support.setflags(write=False)
+    return support
+
+
+def dicke_amplitude(n: int, k: int) -> float:
+    """Amplitude of each basis state in the support of D^n_k."""
+    return 1 / np.sqrt(comb(n, k))
+
+
+def dicke_statevector(n: int, k: int, sparse=False):
+    """Statevector of D^n_k.
+
+    If `sparse` is False, the dense complex vector of size 2^n; otherwise,
+    the pair `(indexes, amplitudes)` of the non-zero entries, with `indexes`
+    sorted in ascending order."""
+    indexes = dicke_support(n, k)
+    amplitudes = np.full(len(indexes), dicke_amplitude(n, k), dtype=complex)
+    if sparse:
+        return indexes, amplitudes
+    statevector = np.zeros(1 << n, dtype=complex)
+    statevector[indexes] = amplitudes
+    return statevector
+
+
+def result_to_sparse(result: "Result"):
+    """Non-zero entries `(indexes, amplitudes)` of the state held by a
+    simulation `Result`, sorted by index.
+
+    The `Result` must come from a job sampling all the qubits with no shots,
+    so that the amplitudes are available."""
+    indexes = np.fromiter((sample.state.int for sample in result),
+                          dtype=np.int64)
+    amplitudes = np.empty(len(indexes), dtype=complex)
+    for i, sample in enumerate(result):
+        if sample.amplitude is None:
+            raise ValueError("the result does not hold the amplitudes")
+        amplitudes[i] = sample.amplitude
+    order = np.argsort(indexes)
+    return indexes[order], amplitudes[order]
+
+
+def fidelity(result: "Result", indexes: np.ndarray,
+             amplitudes: np.ndarray) -> float:
+    """Fidelity |<ref|psi>|^2 between the state of a simulation `Result` and
+    the reference state given by its sorted non-zero `indexes` and their
+    `amplitudes`, e.g. the output of `dicke_statevector(n, k, sparse=True)`.
+    """
+    res_indexes, res_amplitudes = result_to_sparse(result)
+    pos = np.searchsorted(indexes, res_indexes)
+    pos[pos == len(indexes)] = 0
+    found = indexes[pos] == res_indexes
+    overlap = np.vdot(amplitudes[pos[found]], res_amplitudes[found])
+    return float(abs(overlap)**2)
+
+
+def dicke_fidelity(result: "Result", n: int, k: int) -> float:
+    """Fidelity between the state of a simulation `Result` on `n` qubits and
+    D^n_k. Since all the amplitudes of D^n_k are equal, it only requires the
+    Hamming weight of each sample."""
+    res_indexes, res_amplitudes = result_to_sparse(result)
+    weights = np.bitwise_count(res_indexes)
+    overlap = res_amplitudes[weights == k].sum() * dicke_amplitude(n, k)
+    return float(abs(overlap)**2)
@@ -0,0 +1,123 @@
+"""Ancilla-cleanliness and uncompute checker for any reversible routine.
+
+The routine is compiled once, together with its inverse `routine.dag()`.
+Random basis inputs, set on the qubits the routine is applied to, are then
+pushed through the batched engine and for each of them it is checked that:
+- every ancilla (the qubits allocated by the routine beyond its arity,
+  e.g. the registers passed to `set_ancillae`) is back to 0;
+- running `routine.dag()` afterwards restores the input.
+
+Several routines are correct only on part of the input space, e.g. the
+insertion into the sliding sorted array requires a sorted array. In this
+case, a `sampler(rng, size)` returns the inputs to use, as a 0/1 matrix with
+one row per input and one column per qubit; to pass it to a process pool,
+it must be picklable (a module-level function or a `functools.partial`).
+
+A failing input is reported as the integer whose bit `i` is qubit `i`.
+
+The inverse is obtained by compiling `routine.dag()`, so that what is
+checked is the circuit qat generates for it. For some routines, e.g.
+`bix_data_compile_time`, qat crashes while compiling the dagger; for them,
+`dag_from_tape=True` inverts the compiled tape instead, and only the
+ancillae are really checked.
+"""
+import functools
+import logging
+import time
+from typing import Callable, Optional
+
+import numpy as np
+from qatext.qpus.batched import BatchedRProgram, invert_tape
+from qatext.verification.common import (MAX_REPORTED_FAILURES,
+                                        ShardResult, VerificationReport,
+                                        bits_to_int, compile_gate,
+                                        run_sharded)
+
+LOGGER = logging.getLogger(__name__)
+
+Sampler = Callable[[np.random.Generator, int], np.ndarray]
+
+
+def uniform_sampler(arity: int) -> Sampler:
+    """Sampler drawing every qubit uniformly at random."""
+    return functools.partial(_uniform, arity)
+
+
+def _uniform(arity: int, rng: np.random.Generator, size: int) -> np.ndarray:
+    return rng.integers(0, 2, (size, arity), dtype=np.uint8)
+
+
+def check_ancillae_range(state, start: int, stop: int) -> ShardResult:
+    """Check the random inputs `[start, stop)`; input `i` is the same for
+    any split of the range."""
+    compiled, compiled_dag, sampler, seed, chunk_size = state
+    arity = compiled.arity
+    nbqbits = max(compiled.nbqbits, compiled_dag.nbqbits)
+    failures = 0
+    first_failure = None
+    reason = None
+    failing: tuple[int, ...] = ()
+    for lo in range(start, stop, chunk_size):
+        hi = min(lo + chunk_size, stop)
+        # one stream per chunk, so that sharding does not change the inputs
+        rng = np.random.default_rng([seed, lo])
+        bits = sampler(rng, hi - lo)
+        bprogram = BatchedRProgram(nbqbits, hi - lo)
+        bprogram.set_bits(range(arity), bits)
+        initial = bprogram.rows.copy()
+        bprogram.run(compiled.tape)
+        dirty = bprogram.nonzero_lanes(range(arity, nbqbits))
+        bprogram.run(compiled_dag.tape)
+        not_restored = bprogram.differing_lanes(initial)
+        bad = dirty | not_restored
+        nbad = int(bad.sum())
+        if nbad and first_failure is None:
+            lane = int(np.argmax(bad))
+            first_failure = bits_to_int(bits[lane])
+            reason = ", ".join(
+                r for r, v in (("dirty ancillae", dirty),
+                               ("dag does not restore the input",
+                                not_restored)) if v[lane])
+        failing += tuple(
+            bits_to_int(row)
+            for row in bits[bad][:MAX_REPORTED_FAILURES - len(failing)])
+        failures += nbad
+    return ShardResult(stop - start, failures, first_failure, reason,
+                       failing)
+
+
+def check_ancillae(gate,
+                   nqbits: Optional[int] = None,
+                   link: Optional[list] = None,
+                   sampler: Optional[Sampler] = None,
+                   samples: int = 1 << 12,
+                   seed: int = 0,
+                   processes: Optional[int] = 1,
+                   chunk_size: int = 1 << 12,
+                   dag_from_tape=False) -> VerificationReport:
+    """Run `samples` random inputs through `gate` and `gate.dag()`, checking
+    the ancillae and the uncomputation.
+
+    `nqbits` is needed only for gates without a fixed arity, `link` is
+    passed to `to_circ`. See `run_sharded` for `processes`."""
+    start = time.perf_counter()
+    compiled = compile_gate(gate, nqbits, link)
+    if dag_from_tape:
+        compiled_dag = compiled._replace(tape=invert_tape(compiled.tape))
+    else:
+        compiled_dag = compile_gate(gate.dag(), compiled.arity, link)
+    compile_time = time.perf_counter() - start
+    LOGGER.debug("compiled %d + %d ops on %d qubits, arity %d",
+                 len(compiled.tape), len(compiled_dag.tape),
+                 compiled.nbqbits, compiled.arity)
+    if sampler is None:
+        sampler = uniform_sampler(compiled.arity)
+    res, elapsed = run_sharded(
+        check_ancillae_range,
+        (compiled, compiled_dag, sampler, seed, chunk_size), samples,
+        processes)
+    if res.failures:
+        LOGGER.info("%d failures out of %d, first on input %s: %s",
+                    res.failures, res.inputs, bin(res.first_failure),
+                    res.reason)
+    return VerificationReport.from_shard(res, compile_time, elapsed)
@@ -0,0 +1,165 @@
+"""Exhaustive verification of the BIX routines of `qatext.qroutines.bix`.
+
+All the BIX variants select rows of a classical table according to a
+bitstring of length `n` and weight `weight`: the rows indexed by the 1's,
+in ascending order, go into the ones array, the remaining rows into the
+zeros array. The table holds the indexes (`bix_indexes_compile_time`), the
+elements (`bix_data_compile_time`, `bix_data_diff_compile_time`) or the
+matrix rows (`bix_matrix_compile_time`).
+
+The routine is compiled once; then every one of the C(n, weight) inputs,
+enumerated by rank, runs through the batched engine. For each input it is
+checked that:
+- the bitstring register is unchanged;
+- the ones and zeros arrays match the classical model;
+- all the ancillae are back to 0.
+
+Register layout, as in the tests: bitstring (bit `i` of the input is qubit
+`i`), then `weight * cols` registers for the ones and `(n - weight) * cols`
+for the zeros, each of `m` qubits in big endian.
+"""
+import logging
+import time
+from math import comb
+from typing import NamedTuple, Optional
+
+import numpy as np
+from qatext.qpus.batched import BatchedRProgram
+from qatext.qroutines import bix
+from qatext.qroutines.arith import cuccaro_arith
+from qatext.utils.bits.combinatorics import to_bitarrays, unrank_array
+from qatext.verification.common import (MAX_REPORTED_FAILURES,
+                                        CompiledGate, ShardResult,
+                                        VerificationReport, compile_gate,
+                                        run_sharded)
+
+LOGGER = logging.getLogger(__name__)
+
+LINK = [cuccaro_arith.adder, cuccaro_arith.subtractor]
+
+
+class SelectionSpec(NamedTuple):
+    n: int
+    weight: int
+    # size of each register
+    m: int
+    # table of n rows and `cols` columns
+    table: np.ndarray
+
+
+def selection_model(xs: np.ndarray, spec: SelectionSpec):
+    """Vectorised classical model of BIX: for each input of `xs`, the values
+    expected in the ones and in the zeros arrays, flattened row-wise."""
+    n, weight, table = spec.n, spec.weight, spec.table
+    bits = to_bitarrays(xs, n, littleEndian=True)
+    # stable sorts keep the ascending order of the positions
+    pos_ones = np.argsort(1 - bits, axis=1, kind="stable")[:, :weight]
+    pos_zeros = np.argsort(bits, axis=1, kind="stable")[:, :n - weight]
+    ones = table[pos_ones].reshape(len(xs), -1)
+    zeros = table[pos_zeros].reshape(len(xs), -1)
+    return ones, zeros
+
+
+def _read_registers(bprogram: BatchedRProgram, start: int, count: int,
+                    m: int) -> np.ndarray:
+    """Values of `count` consecutive big endian registers of size `m`."""
+    values = np.empty((bprogram.size, count), dtype=np.int64)
+    for r in range(count):
+        first = start + r * m
+        values[:, r] = bprogram.get_ints(range(first + m - 1, first - 1, -1))
+    return values
+
+
+def check_selection_range(state: tuple[CompiledGate, SelectionSpec,
+                                       int], start: int,
+                          stop: int) -> ShardResult:
+    """Check the inputs having rank in `[start, stop)`."""
+    compiled, spec, chunk_size = state
+    n, weight, m = spec.n, spec.weight, spec.m
+    cols = spec.table.shape[1]
+    failures = 0
+    first_failure = None
+    reason = None
+    failing: tuple[int, ...] = ()
+    for lo in range(start, stop, chunk_size):
+        hi = min(lo + chunk_size, stop)
+        xs = unrank_array(np.arange(lo, hi), n, weight)
+        bprogram = BatchedRProgram(compiled.nbqbits, len(xs))
+        bprogram.set_ints(range(n), xs)
+        bprogram.run(compiled.tape)
+
+        exp_ones, exp_zeros = selection_model(xs, spec)
+        ones = _read_registers(bprogram, n, weight * cols, m)
+        zeros = _read_registers(bprogram, n + weight * cols * m,
+                                (n - weight) * cols, m)
+        checks = {
+            "bitstring changed": bprogram.get_ints(range(n)) != xs,
+            "wrong ones": (ones != exp_ones).any(axis=1),
+            "wrong zeros": (zeros != exp_zeros).any(axis=1),
+            "dirty ancillae": bprogram.nonzero_lanes(
+                range(compiled.arity, compiled.nbqbits)),
+        }
+        bad = np.logical_or.reduce(list(checks.values()))
+        nbad = int(bad.sum())
+        if nbad and first_failure is None:
+            lane = int(np.argmax(bad))
+            first_failure = int(xs[lane])
+            reason = ", ".join(k for k, v in checks.items() if v[lane])
+        failing += tuple(
+            int(x) for x in xs[bad][:MAX_REPORTED_FAILURES - len(failing)])
+        failures += nbad
+    return ShardResult(stop - start, failures, first_failure, reason,
+                       failing)
+
+
+def verify_selection(gate,
+                     spec: SelectionSpec,
+                     link: Optional[list] = None,
+                     processes: Optional[int] = 1,
+                     chunk_size: int = 1 << 12) -> VerificationReport:
+    """Verify `gate`, a BIX routine selecting the rows of `spec.table`, on
+    all the inputs of weight `spec.weight`. See `run_sharded` for
+    `processes`."""
+    start = time.perf_counter()
+    compiled = compile_gate(gate, link=LINK if link is None else link)
+    compile_time = time.perf_counter() - start
+    LOGGER.debug("compiled %d ops on %d qubits in %.3fs",
+                 len(compiled.tape), compiled.nbqbits, compile_time)
+    res, elapsed = run_sharded(check_selection_range,
+                               (compiled, spec, chunk_size),
+                               comb(spec.n, spec.weight), processes)
+    return VerificationReport.from_shard(res, compile_time, elapsed)
+
+
+def verify_bix_indexes(n: int, weight: int, idx_start_at_one: bool,
+                       **kwargs) -> VerificationReport:
+    add = 1 if idx_start_at_one else 0
+    m = (n - 1 + add).bit_length()
+    table = (np.arange(n) + add)[:, None]
+    return verify_selection(
+        bix.bix_indexes_compile_time(n, weight, idx_start_at_one),
+        SelectionSpec(n, weight, m, table), **kwargs)
+
+
+def verify_bix_data(n: int,
+                    m: int,
+                    weight: int,
+                    elems: list[int],
+                    diff=False,
+                    **kwargs) -> VerificationReport:
+    """Verify `bix_data_compile_time` or, if `diff` is True,
+    `bix_data_diff_compile_time`; the latter requires sorted `elems`."""
+    routine = (bix.bix_data_diff_compile_time
+               if diff else bix.bix_data_compile_time)
+    table = np.array(elems, dtype=np.int64)[:, None]
+    return verify_selection(routine(n, m, weight, list(elems)),
+                            SelectionSpec(n, weight, m, table), **kwargs)
+
+
+def verify_bix_matrix(n: int, columns: int, m: int, weight: int,
+                      matrix: list[int], **kwargs) -> VerificationReport:
+    """Verify `bix_matrix_compile_time`; `matrix` is flattened row-wise."""
+    table = np.array(matrix, dtype=np.int64).reshape(n, columns)
+    return verify_selection(
+        bix.bix_matrix_compile_time(n, columns, m, weight, list(matrix)),
+        SelectionSpec(n, weight, m, table), **kwargs)
@@ -0,0 +1,151 @@
+"""Pieces shared by the verification harnesses: compile a gate once into a
+tape for the batched engine, and stream a range of inputs through it,
+optionally sharding the range across a process pool."""
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, NamedTuple, Optional
+
+from qat.lang.AQASM.program import Program
+from qatext.qpus.batched import TapeOp, compile_tape
+
+LOGGER = logging.getLogger(__name__)
+
+
+class CompiledGate(NamedTuple):
+    tape: list[TapeOp]
+    # qubits of the whole circuit, ancillae included
+    nbqbits: int
+    # qubits the gate is applied to; the following ones are its ancillae
+    arity: int
+
+
+# failing inputs kept by each shard, besides their count
+MAX_REPORTED_FAILURES = 16
+
+
+class ShardResult(NamedTuple):
+    inputs: int
+    failures: int
+    # first failing input of the shard, if any
+    first_failure: Optional[int]
+    # what went wrong with the first failing input
+    reason: Optional[str] = None
+    # the first MAX_REPORTED_FAILURES failing inputs
+    failing_inputs: tuple[int, ...] = ()
+
+
+class VerificationReport(NamedTuple):
+    inputs: int
+    failures: int
+    first_failure: Optional[int]
+    compile_time: float
+    elapsed: float
+    reason: Optional[str] = None
+    failing_inputs: tuple[int, ...] = ()
+
+    @classmethod
+    def from_shard(cls, res: ShardResult, compile_time: float,
+                   elapsed: float) -> "VerificationReport":
+        return cls(res.inputs, res.failures, res.first_failure,
+                   compile_time, elapsed, res.reason,
+                   res.failing_inputs[:MAX_REPORTED_FAILURES])
+
+    @property
+    def inputs_per_second(self) -> float:
+        return self.inputs / self.elapsed if self.elapsed > 0 else float(
+            "inf")
+
+    @property
+    def ok(self) -> bool:
+        return self.failures == 0
+
+
+def bits_to_int(bits) -> int:
+    """Integer whose bit `i` is `bits[i]`, the way failing inputs are
+    reported when they may not fit in 64 bits."""
+    return sum(int(b) << i for i, b in enumerate(bits))
+
+
+def gate_arity(gate) -> Optional[int]:
+    """Number of qubits `gate` acts on. Gates built with `build_gate` and no
+    arity function are generated once to find it out."""
+    if gate.arity is not None:
+        return gate.arity
+    abstract_gate = getattr(gate, "abstract_gate", None)
+    if abstract_gate is not None and abstract_gate.circuit_generator:
+        return abstract_gate.circuit_generator(*gate.parameters).arity
+    subgate = getattr(gate, "subgate", None)
+    if subgate is not None:
+        arity = gate_arity(subgate)
+        return None if arity is None else arity + (gate.nb_ctrls or 0)
+    return None
+
+
+def compile_gate(gate,
+                 nqbits: Optional[int] = None,
+                 link: Optional[list] = None,
+                 base_gates: Optional[dict] = None) -> CompiledGate:
+    """Apply `gate` on the first qubits of a fresh program and compile it to
+    a tape, accepting the gates of `base_gates` (see `compile_tape`).
+    `nqbits` is needed only when the arity cannot be inferred."""
+    arity = gate_arity(gate) if nqbits is None else nqbits
+    if arity is None:
+        raise ValueError("the gate has no arity, nqbits must be given")
+    pr = Program()
+    qbits = pr.qalloc(arity)
+    pr.apply(gate, qbits)
+    circ = pr.to_circ(link=link, inline=True)
+    return CompiledGate(compile_tape(circ, base_gates), circ.nbqbits, arity)
+
+
+# State of the worker processes, set once by the pool initializer so that
+# the tape is not pickled again for each shard
+_WORKER_STATE: Any = None
+
+
+def _init_worker(state):
+    global _WORKER_STATE
+    _WORKER_STATE = state
+
+
+def _run_shard(check: Callable, start: int, stop: int) -> ShardResult:
+    return check(_WORKER_STATE, start, stop)
+
+
+def run_sharded(check: Callable[[Any, int, int], ShardResult],
+                state,
+                total: int,
+                processes: Optional[int] = 1,
+                shards_per_process: int = 4) -> tuple[ShardResult, float]:
+    """Run `check(state, start, stop)` over `[0, total)`.
+
+    With `processes` equal to 1 everything runs in this process; otherwise
+    the range is split in `processes * shards_per_process` contiguous shards
+    run by a pool (`None` means one process per CPU). `check` must be a
+    module-level function. Returns the merged result and the wall time."""
+    start_time = time.perf_counter()
+    if processes == 1 or total == 0:
+        res = check(state, 0, total)
+        return res, time.perf_counter() - start_time
+
+    processes = processes or os.cpu_count() or 1
+    nshards = min(total, processes * shards_per_process)
+    bounds = [total * i // nshards for i in range(nshards + 1)]
+    LOGGER.debug("%d shards over %d processes", nshards, processes)
+    with ProcessPoolExecutor(processes, initializer=_init_worker,
+                             initargs=(state, )) as pool:
+        futures = [
+            pool.submit(_run_shard, check, lo, hi)
+            for lo, hi in zip(bounds, bounds[1:])
+        ]
+        results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - start_time
+    first = next((r for r in results if r.first_failure is not None), None)
+    merged = ShardResult(sum(r.inputs for r in results),
+                         sum(r.failures for r in results),
+                         first.first_failure if first else None,
+                         first.reason if first else None,
+                         sum((r.failing_inputs for r in results), ()))
+    return merged, elapsed
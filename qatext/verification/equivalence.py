@@ -0,0 +1,135 @@
+"""Functional equivalence between two implementations of the same routine,
+e.g. `insert_ld` and `insert_lw`, `bix_data_compile_time` and
+`bix_data_diff_compile_time`, or the Cuccaro adder and qat `classarith`.
+
+The two routines act on the same logical qubits, possibly laid out in a
+different way: logical qubit `i` is qubit `i` of routine A and qubit
+`wires_b[i]` of routine B. Both are compiled once; then the same inputs go
+through the two tapes on the batched engine, and the logical qubits are
+compared at the end. Ancillae are not compared, since each routine may use
+different ones; see `ancillae.check_ancillae` for them.
+
+Up to `exhaustive_bits` logical qubits, the whole input space is
+enumerated, input `x` setting logical qubit `i` to bit `i` of `x`; a
+`valid(bits)` predicate can restrict it to the inputs the routines are
+defined on. Above the threshold, or if a `sampler` is given, random inputs
+are drawn instead (see `ancillae` for the sampler protocol).
+"""
+import logging
+import time
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+from qatext.qpus.batched import BatchedRProgram
+from qatext.utils.bits.combinatorics import to_bitarrays
+from qatext.verification.ancillae import Sampler, uniform_sampler
+from qatext.verification.common import (MAX_REPORTED_FAILURES,
+                                        ShardResult, VerificationReport,
+                                        bits_to_int, compile_gate,
+                                        gate_arity, run_sharded)
+
+LOGGER = logging.getLogger(__name__)
+
+Predicate = Callable[[np.ndarray], np.ndarray]
+
+
+def check_equivalence_range(state, start: int, stop: int) -> ShardResult:
+    """Compare the two routines on the inputs `[start, stop)`, either the
+    integers themselves or the indexes of the random samples."""
+    (compiled_a, compiled_b, wires_b, compare, exhaustive, sampler, valid,
+     seed, chunk_size) = state
+    arity = compiled_a.arity
+    inputs = 0
+    failures = 0
+    first_failure = None
+    reason = None
+    failing: tuple[int, ...] = ()
+    for lo in range(start, stop, chunk_size):
+        hi = min(lo + chunk_size, stop)
+        if exhaustive:
+            bits = to_bitarrays(np.arange(lo, hi), arity, littleEndian=True)
+        else:
+            bits = sampler(np.random.default_rng([seed, lo]), hi - lo)
+        if valid is not None:
+            bits = bits[valid(bits)]
+        if len(bits) == 0:
+            continue
+        inputs += len(bits)
+
+        bprogram_a = BatchedRProgram(compiled_a.nbqbits, len(bits))
+        bprogram_a.set_bits(range(arity), bits)
+        bprogram_a.run(compiled_a.tape)
+        bprogram_b = BatchedRProgram(compiled_b.nbqbits, len(bits))
+        bprogram_b.set_bits(wires_b, bits)
+        bprogram_b.run(compiled_b.tape)
+
+        out_a = bprogram_a.get_bits(compare)
+        out_b = bprogram_b.get_bits([wires_b[i] for i in compare])
+        differ = out_a != out_b
+        bad = differ.any(axis=1)
+        nbad = int(bad.sum())
+        if nbad and first_failure is None:
+            lane = int(np.argmax(bad))
+            first_failure = bits_to_int(bits[lane])
+            qubits = [compare[i] for i in np.flatnonzero(differ[lane])]
+            reason = f"logical qubits {qubits} differ"
+        failing += tuple(
+            bits_to_int(row)
+            for row in bits[bad][:MAX_REPORTED_FAILURES - len(failing)])
+        failures += nbad
+    return ShardResult(inputs, failures, first_failure, reason, failing)
+
+
+def check_equivalence(gate_a,
+                      gate_b,
+                      wires_b: Optional[Sequence[int]] = None,
+                      compare: Optional[Sequence[int]] = None,
+                      link_a: Optional[list] = None,
+                      link_b: Optional[list] = None,
+                      exhaustive_bits: int = 20,
+                      valid: Optional[Predicate] = None,
+                      sampler: Optional[Sampler] = None,
+                      samples: int = 1 << 14,
+                      seed: int = 0,
+                      processes: Optional[int] = 1,
+                      chunk_size: int = 1 << 12) -> VerificationReport:
+    """Check that `gate_a` and `gate_b` compute the same function.
+
+    :param wires_b: qubit of `gate_b` holding each logical qubit; by
+        default the same qubit.
+    :param compare: logical qubits compared at the end; by default all.
+    :param link_a, link_b: passed to `to_circ` for each routine.
+    :param valid: predicate on the 0/1 input matrix (one row per input),
+        filtering the inputs to use.
+
+    The report counts only the valid inputs; `failing_inputs` holds the
+    first diverging ones. See `run_sharded` for `processes`."""
+    arity = gate_arity(gate_a)
+    wires_b = list(range(arity)) if wires_b is None else list(wires_b)
+    if len(wires_b) != arity or len(set(wires_b)) != arity:
+        raise ValueError(
+            f"wires_b must map the {arity} logical qubits to distinct wires")
+    compare = list(range(arity)) if compare is None else list(compare)
+
+    start = time.perf_counter()
+    compiled_a = compile_gate(gate_a, arity, link_a)
+    compiled_b = compile_gate(gate_b, gate_arity(gate_b), link_b)
+    compile_time = time.perf_counter() - start
+    if max(wires_b) >= compiled_b.arity:
+        raise ValueError("wires_b maps a logical qubit on an ancilla of B")
+
+    exhaustive = sampler is None and arity <= exhaustive_bits
+    if sampler is None:
+        sampler = uniform_sampler(arity)
+    total = 1 << arity if exhaustive else samples
+    LOGGER.debug("%s check over %d inputs",
+                 "exhaustive" if exhaustive else "random", total)
+    res, elapsed = run_sharded(
+        check_equivalence_range,
+        (compiled_a, compiled_b, wires_b, compare, exhaustive, sampler,
+         valid, seed, chunk_size), total, processes)
+    if res.failures:
+        LOGGER.info("%d diverging inputs out of %d, first %s: %s",
+                    res.failures, res.inputs, bin(res.first_failure),
+                    res.reason)
+    return VerificationReport.from_shard(res, compile_time, elapsed)
@@ -0,0 +1,109 @@
+"""Exhaustive verification of phase oracles over Dicke inputs.
+
+An oracle marks a basis state by flipping its phase and leaves every qubit
+as it was, e.g. `cssp.oracle` or a BIX followed by a check and by the
+inverse BIX. The routine is compiled once with `batched.PHASE_GATES`, so
+that Z, CSIGN and multi-controlled Z are kept on the tape; then every one of
+the C(n, weight) bitstrings, enumerated by rank and set on the first `n`
+qubits, runs through the batched engine. For each input it is checked that:
+- the phase is -1 iff the input is marked;
+- every qubit is back to its initial value, the other qubits being 0.
+
+`phase_vector` returns the phases themselves, indexed by rank.
+"""
+import logging
+import time
+from math import comb
+from typing import Optional
+
+import numpy as np
+from qatext.qpus.batched import PHASE_GATES, BatchedRProgram
+from qatext.utils.bits.combinatorics import unrank_array
+from qatext.verification.common import (MAX_REPORTED_FAILURES,
+                                        CompiledGate, ShardResult,
+                                        VerificationReport, compile_gate,
+                                        run_sharded)
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _run_ranks(compiled: CompiledGate, n: int, weight: int, lo: int,
+               hi: int) -> tuple[np.ndarray, BatchedRProgram]:
+    """The inputs of rank in `[lo, hi)` and the batch they ran through."""
+    xs = unrank_array(np.arange(lo, hi), n, weight)
+    bprogram = BatchedRProgram(compiled.nbqbits, len(xs))
+    bprogram.set_ints(range(n), xs)
+    bprogram.run(compiled.tape)
+    return xs, bprogram
+
+
+def check_marking_range(state: tuple[CompiledGate, int, int, np.ndarray,
+                                     int], start: int,
+                        stop: int) -> ShardResult:
+    """Check the inputs having rank in `[start, stop)`."""
+    compiled, n, weight, marked, chunk_size = state
+    failures = 0
+    first_failure = None
+    reason = None
+    failing: tuple[int, ...] = ()
+    for lo in range(start, stop, chunk_size):
+        hi = min(lo + chunk_size, stop)
+        xs, bprogram = _run_ranks(compiled, n, weight, lo, hi)
+        checks = {
+            "wrong phase": (bprogram.signs() == -1) != marked[lo:hi],
+            "bits changed": (bprogram.get_ints(range(n)) != xs)
+            | bprogram.nonzero_lanes(range(n, compiled.nbqbits)),
+        }
+        bad = np.logical_or.reduce(list(checks.values()))
+        nbad = int(bad.sum())
+        if nbad and first_failure is None:
+            lane = int(np.argmax(bad))
+            first_failure = int(xs[lane])
+            reason = ", ".join(k for k, v in checks.items() if v[lane])
+        failing += tuple(
+            int(x) for x in xs[bad][:MAX_REPORTED_FAILURES - len(failing)])
+        failures += nbad
+    return ShardResult(stop - start, failures, first_failure, reason,
+                       failing)
+
+
+def phase_vector(gate,
+                 n: int,
+                 weight: int,
+                 nqbits: Optional[int] = None,
+                 link: Optional[list] = None,
+                 chunk_size: int = 1 << 12) -> np.ndarray:
+    """The +1/-1 phase `gate` gives to each of the C(n, weight) inputs,
+    indexed by rank. The bits themselves are not checked."""
+    compiled = compile_gate(gate, nqbits, link, PHASE_GATES)
+    total = comb(n, weight)
+    res = np.empty(total, dtype=np.int64)
+    for lo in range(0, total, chunk_size):
+        hi = min(lo + chunk_size, total)
+        res[lo:hi] = _run_ranks(compiled, n, weight, lo, hi)[1].signs()
+    return res
+
+
+def verify_marking(gate,
+                   n: int,
+                   weight: int,
+                   marked: np.ndarray,
+                   nqbits: Optional[int] = None,
+                   link: Optional[list] = None,
+                   processes: Optional[int] = 1,
+                   chunk_size: int = 1 << 12) -> VerificationReport:
+    """Verify that `gate` flips the phase of the inputs of weight `weight`
+    whose rank is marked in the boolean array `marked`, and of those only.
+    See `run_sharded` for `processes`."""
+    start = time.perf_counter()
+    compiled = compile_gate(gate, nqbits, link, PHASE_GATES)
+    compile_time = time.perf_counter() - start
+    LOGGER.debug("compiled %d ops on %d qubits in %.3fs",
+                 len(compiled.tape), compiled.nbqbits, compile_time)
+    marked = np.asarray(marked, dtype=bool)
+    if len(marked) != comb(n, weight):
+        raise ValueError(f"{len(marked)} marks for {comb(n, weight)} inputs")
+    res, elapsed = run_sharded(check_marking_range,
+                               (compiled, n, weight, marked, chunk_size),
+                               len(marked), processes)
+    return VerificationReport.from_shard(res, compile_time, elapsed)
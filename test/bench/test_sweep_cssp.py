@@ -0,0 +1,66 @@
+import pytest
+from bench.sweep_cssp import FIELDS, Instance, grid, read_rows, sweep
+
+import cssp
+
+# one instance per target
+INSTANCES = grid([3], [1], ["range"], ["min", "max", "random"], [0])
+
+
+def _keys(rows):
+    return [tuple(str(row[f]) for f in Instance._fields) for row in rows]
+
+
+@pytest.fixture(params=["sweep.csv", "sweep.jsonl"])
+def output(request, tmp_path):
+    return str(tmp_path / request.param)
+
+
+class TestSweep:
+
+    def test_round_trip(self, output):
+        rows = sweep(INSTANCES, output)
+        assert read_rows(output) == [{
+            k: "" if row.get(k) is None else str(row[k])
+            for k in FIELDS
+        } for row in rows]
+        assert all(not row["error"] for row in read_rows(output))
+
+    def test_resume(self, output, monkeypatch):
+        build = cssp.build
+        calls = []
+
+        def interrupted(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return build(*args)
+
+        monkeypatch.setattr(cssp, "build", interrupted)
+        with pytest.raises(KeyboardInterrupt):
+            sweep(INSTANCES, output)
+        assert _keys(read_rows(output)) == [INSTANCES[0].key]
+        monkeypatch.setattr(cssp, "build", build)
+        rows = sweep(INSTANCES, output)
+        assert _keys(rows) == [i.key for i in INSTANCES[1:]]
+        assert _keys(read_rows(output)) == [i.key for i in INSTANCES]
+        assert sweep(INSTANCES, output) == []
+
+    def test_failed_rerun(self, output, monkeypatch):
+
+        def failing(*_):
+            raise RuntimeError("no memory")
+
+        monkeypatch.setattr(cssp, "build", failing)
+        sweep(INSTANCES[:2], output)
+        assert [row["error"] for row in read_rows(output)
+               ] == ["RuntimeError: no memory"] * 2
+        monkeypatch.undo()
+        sweep(INSTANCES, output)
+        rows = read_rows(output)
+        # the last row of each instance replaced the failed one
+        assert sorted(_keys(rows)) == sorted(i.key for i in INSTANCES)
+        assert all(not row["error"] for row in rows)
+        header = 0 if output.endswith(".jsonl") else 1
+        with open(output) as f:
+            assert len(f.readlines()) == header + len(INSTANCES)
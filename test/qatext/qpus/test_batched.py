@@ -0,0 +1,103 @@
+import random
+
+import numpy as np
+import pytest
+from qat.lang.AQASM.gates import CCNOT, CSIGN, SWAP, X, Z
+from qat.lang.AQASM.program import Program
+from qatext.qpus.batched import (PHASE_GATES, BatchedRProgram,
+                                 compile_tape, invert_tape)
+from qatext.qpus.reversible import RGate, RProgram
+from qatext.qroutines import bix
+from qatext.qroutines.arith import cuccaro_arith
+
+
+def _bix_circuit():
+    n, m, weight = 6, 4, 2
+    pr = Program()
+    gate = bix.bix_data_diff_compile_time(n, m, weight, [1, 2, 5, 7, 8, 13])
+    qbits = pr.qalloc(gate.arity)
+    pr.apply(gate, qbits)
+    circ = pr.to_circ(inline=True,
+                      link=[cuccaro_arith.adder, cuccaro_arith.subtractor])
+    return circ, n
+
+
+class TestBatched:
+
+    def test_compile_resolves_controls(self):
+        pr = Program()
+        qbits = pr.qalloc(5)
+        pr.apply(X.ctrl(3), qbits[:4])
+        pr.apply(SWAP.ctrl(), qbits[4], qbits[0], qbits[1])
+        pr.apply(CCNOT, qbits[2], qbits[3], qbits[4])
+        tape = compile_tape(pr.to_circ(inline=True))
+        assert tape == [(RGate.NOT, (0, 1, 2), (3, )),
+                        (RGate.SWAP, (4, ), (0, 1)),
+                        (RGate.NOT, (2, 3), (4, ))]
+
+    def test_compile_rejects_non_reversible(self):
+        pr = Program()
+        qbits = pr.qalloc(2)
+        pr.apply(Z.ctrl(), qbits)
+        with pytest.raises(AttributeError):
+            compile_tape(pr.to_circ(inline=True))
+
+    @pytest.mark.parametrize("size", [1, 64, 100])
+    def test_same_as_rprogram(self, size):
+        circ, n = _bix_circuit()
+        tape = compile_tape(circ)
+        rnd = random.Random(size)
+        xs = np.array([rnd.getrandbits(n) for _ in range(size)])
+        bprogram = BatchedRProgram(circ.nbqbits, size)
+        bprogram.set_ints(range(n), xs)
+        bprogram.run(tape)
+        for lane, x in enumerate(xs):
+            rpr = RProgram()
+            rpr.ralloc(circ.nbqbits)
+            for i in range(n):
+                rpr.rbits[i] = (int(x) >> i) & 1
+            rpr.apply_gates_from_circuit(circ, circ)
+            for q in range(circ.nbqbits):
+                assert bprogram.get_ints([q])[lane] == rpr.rbits[q]
+
+    def test_invert_tape(self):
+        circ, n = _bix_circuit()
+        tape = compile_tape(circ)
+        xs = np.arange(1 << n)
+        bprogram = BatchedRProgram(circ.nbqbits, len(xs))
+        bprogram.set_ints(range(n), xs)
+        initial = bprogram.rows.copy()
+        bprogram.run(tape)
+        assert bprogram.differing_lanes(initial).any()
+        bprogram.run(invert_tape(tape))
+        assert not bprogram.differing_lanes(initial).any()
+        with pytest.raises(ValueError):
+            invert_tape([(RGate.RESET, (), (0, ))])
+
+    def test_phases(self):
+        pr = Program()
+        qbits = pr.qalloc(4)
+        pr.apply(Z, qbits[0])
+        pr.apply(CSIGN, qbits[1], qbits[2])
+        pr.apply(X, qbits[3])
+        pr.apply(Z.ctrl(3), qbits)
+        pr.apply(X, qbits[3])
+        circ = pr.to_circ(inline=True)
+        tape = compile_tape(circ, PHASE_GATES)
+        assert [op[0] for op in tape].count(RGate.Z) == 3
+        xs = np.arange(16)
+        bprogram = BatchedRProgram(circ.nbqbits, len(xs))
+        bprogram.set_ints(range(4), xs)
+        bprogram.run(tape)
+        assert (bprogram.get_ints(range(4)) == xs).all()
+        for x, sign in zip(xs, bprogram.signs()):
+            bits = [(int(x) >> i) & 1 for i in range(4)]
+            flips = bits[0] + bits[1] * bits[2] + (bits[0] * bits[1] *
+                                                   bits[2] * (1 - bits[3]))
+            assert sign == (-1)**flips
+            rpr = RProgram(track_phase=True)
+            rpr.ralloc(circ.nbqbits)
+            for i in range(4):
+                rpr.rbits[i] = bits[i]
+            rpr.apply_gates_from_circuit(circ, circ)
+            assert rpr.phase == sign
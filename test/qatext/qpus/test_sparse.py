@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from qat.lang.AQASM.gates import CCNOT, PH, RY, SWAP, H, T, X, Z
+from qat.lang.AQASM.program import Program
+from qat.lang.AQASM.qftarith import QFT
+from qat.qpus import PyLinalg
+from qatext.qpus.sparse import SparseState, simulate
+
+
+class TestSparse:
+
+    def test_same_as_pylinalg(self):
+        pr = Program()
+        qbits = pr.qalloc(6)
+        pr.apply(H, qbits[0])
+        pr.apply(RY(0.3).ctrl(), qbits[0], qbits[1])
+        pr.apply(T.dag(), qbits[0])
+        pr.apply(QFT(3), qbits[1:4])
+        pr.apply(Z.ctrl(2), qbits[:3])
+        pr.apply(RY(0.2).dag().ctrl(2), qbits[:3])
+        pr.apply(SWAP.ctrl(), qbits[2], qbits[0], qbits[4])
+        pr.apply(CCNOT, qbits[1], qbits[2], qbits[5])
+        pr.apply(PH(0.7).ctrl(), qbits[5], qbits[3])
+        circ = pr.to_circ(inline=True)
+        dense = np.zeros(1 << circ.nbqbits, dtype=complex)
+        for sample in PyLinalg().submit(circ.to_job()):
+            dense[sample.state.int] = sample.amplitude
+        assert np.allclose(simulate(circ).to_dense(), dense)
+
+    def test_many_qubits(self):
+        pr = Program()
+        qbits = pr.qalloc(130)
+        pr.apply(H, qbits[0])
+        pr.apply(X.ctrl(), qbits[0], qbits[70])
+        pr.apply(SWAP, qbits[70], qbits[129])
+        pr.apply(H, qbits[1])
+        pr.apply(H, qbits[1])
+        state = simulate(pr.to_circ(inline=True))
+        assert len(state) == 2
+        assert state.probabilities([0, 1, 70, 129]) == pytest.approx({
+            0: 0.5,
+            0b1001: 0.5
+        })
+
+    def test_rejects_measures(self):
+        pr = Program()
+        qbits = pr.qalloc(1)
+        pr.apply(H, qbits[0])
+        pr.measure(qbits[0])
+        with pytest.raises(AttributeError):
+            simulate(pr.to_circ(inline=True))
+        with pytest.raises(ValueError):
+            SparseState(0).run(pr.to_circ(inline=True))
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from qat.lang.AQASM.gates import CNOT, X
+from qat.lang.AQASM.program import Program
+from qat.lang.AQASM.routines import QRoutine
+from qatext.qpus.batched import BatchedRProgram, compile_program, compile_tape
+from qatext.qpus.reversible import RGate
+from qatext.qpus.tapefile import encode_tape, read_tape, write_tape
+from qatext.qroutines import bix
+from qatext.qroutines.arith import cuccaro_arith
+from qatext.utils.qatmgmt.repeat import repeat
+
+BIX_LINK = [cuccaro_arith.adder, cuccaro_arith.subtractor]
+
+
+def _bix_tape():
+    n, m, weight = 6, 4, 2
+    pr = Program()
+    gate = bix.bix_data_diff_compile_time(n, m, weight, [1, 2, 5, 7, 8, 13])
+    pr.apply(gate, pr.qalloc(gate.arity))
+    circ = pr.to_circ(inline=True, link=BIX_LINK)
+    return compile_tape(circ), circ.nbqbits, n
+
+
+def _repeat_tape():
+    body = QRoutine()
+    wires = body.new_wires(4)
+    body.apply(X.ctrl(3), wires)
+    body.apply(CNOT, wires[3], wires[0])
+    inner = QRoutine()
+    wires = inner.new_wires(4)
+    inner.apply(repeat(body, 3), wires)
+    inner.apply(X, wires[1])
+    pr = Program()
+    qbits = pr.qalloc(4)
+    pr.apply(X, qbits[0])
+    pr.apply(repeat(inner, 5), qbits)
+    pr.apply(CNOT, qbits[2], qbits[3])
+    return compile_program(pr)
+
+
+def _run(tape, nbits, n, size=50):
+    bprogram = BatchedRProgram(nbits, size)
+    bprogram.set_ints(range(n), np.arange(size) % (1 << n))
+    bprogram.run(tape)
+    return bprogram.rows
+
+
+class TestTapeFile:
+
+    def test_roundtrip_repeat(self, tmp_path):
+        tape, nbits = _repeat_tape()
+        assert any(gate == RGate.REPEAT for gate, _, _ in tape)
+        path = str(tmp_path / "repeat.tape")
+        write_tape(path, tape, nbits, {"q": slice(0, 4)})
+        mapped = read_tape(path)
+        assert isinstance(mapped.records, np.memmap)
+        assert mapped.nbits == nbits
+        assert mapped.registers == {"q": slice(0, 4)}
+        assert mapped.tape() == tape
+        # blocks smaller than the repeated bodies
+        assert list(mapped.ops(chunk=1)) == tape
+        assert list(mapped.ops(chunk=2)) == tape
+
+    @pytest.mark.parametrize("chunk", [7, 1 << 16])
+    def test_stream_to_batched(self, tmp_path, chunk):
+        tape, nbits, n = _bix_tape()
+        path = str(tmp_path / "bix.tape")
+        write_tape(path, tape, nbits)
+        mapped = read_tape(path)
+        assert np.array_equal(_run(mapped.ops(chunk), nbits, n),
+                              _run(tape, nbits, n))
+
+    def test_compact(self):
+        tape, _, _ = _bix_tape()
+        records = encode_tape(tape)
+        max_ctrls = max(len(ctrls) for _, ctrls, _ in tape)
+        assert len(records) == len(tape)
+        assert records.itemsize == 3 + 4 * max_ctrls + 8
+
+    def test_empty_and_invalid(self, tmp_path):
+        path = str(tmp_path / "empty.tape")
+        write_tape(path, [], 3)
+        assert read_tape(path).tape() == []
+        with open(path, "r+b") as f:
+            f.write(b"X")
+        with pytest.raises(ValueError):
+            read_tape(path)
@@ -8,7 +8,10 @@ import qat.lang.AQASM.classarith
 from qat.lang.AQASM.program import Program
 from qatext.qpus.reversible import get_states_from_program_wrapper
 from qatext.qroutines import qregs_init as qregs
-from qatext.qroutines.datastructure.sliding_sort_array import delete, insert
+from qatext.qroutines.datastructure.sliding_sort_array import (delete,
+                                                               delete_many,
+                                                               insert_ld,
+                                                               merge_lw)
 from qatext.utils.bits.conversion import (get_int_from_bitarray,
                                           get_ints_from_bitarray)
 from qatext.utils.qatmgmt.program import ProgramWrapper
@@ -78,7 +81,7 @@ class TestQroutineSlidingSort(CircuitTestHelpers):
                                 str,
                                 unknown_size=True)
 
-        qf = insert(n, m)
+        qf = insert_ld(n, m)
         prw.apply(qf, qr_x, *qrs_data)
 
         res = get_states_from_program_wrapper(prw, [qat.lang.AQASM.classarith])
@@ -190,6 +193,88 @@ class TestQroutineSlidingSort(CircuitTestHelpers):
         assert (aii_vals == tuple(0 for _ in range(n)))
         assert (any(ax_val) == False)
 
+    def _alloc_merge_program(self, values, xs, m, n):
+        prw = ProgramWrapper(Program())
+        k = len(xs)
+        qrs_x = prw.qarray_alloc(k, m, "x", int)
+        for i, value in enumerate(xs):
+            prw.apply(qregs.initialize_qureg_given_int(value, m, False),
+                      qrs_x[i])
+        qrs_data = prw.qarray_alloc(n, m, "a", int)
+        for i, value in enumerate(values):
+            prw.apply(qregs.initialize_qureg_given_int(value, m, False),
+                      qrs_data[i])
+        prw.qarray_noalloc(None,
+                           None,
+                           "anc",
+                           qrs_data[-1].start + qrs_data[-1].length,
+                           str,
+                           unknown_size=True)
+        return prw, qrs_x, qrs_data
+
+    @pytest.mark.parametrize(
+        "values, max_bits, values_to_insert",
+        [
+            # Merge in the middle
+            ([1, 4, 6], 3, [2, 5]),
+            # Merge at both ends
+            ([3, 4], 3, [0, 7]),
+            # Merge into empty list
+            ([], 3, [2, 1, 3]),
+            # Duplicates, both in the array and among the values
+            ([1, 2, 2], 2, [2, 2]),
+            # Unsorted values, below and above every element
+            ([2, 3, 5], 4, [9, 1, 0]),
+            # Single value, same as insert
+            ([1, 2, 4], 4, [3]),
+        ])
+    @pytest.mark.skipif(not REVERSIBLE_ON, reason=REVERSIBLE_ON_REASON)
+    def test_merge(self, values, max_bits, values_to_insert):
+        m = max_bits
+        k = len(values_to_insert)
+        n = len(values) + k
+        prw, qrs_x, qrs_data = self._alloc_merge_program(
+            values, values_to_insert, m, n)
+        prw.apply(merge_lw(n, k, m), *qrs_x, *qrs_data)
+
+        res = get_states_from_program_wrapper(prw, [qat.lang.AQASM.classarith])
+        x_vals = get_ints_from_bitarray(res['x'], k, m, False)
+        a_vals = get_ints_from_bitarray(res['a'], n, m, False)
+
+        assert (x_vals == tuple(values_to_insert))
+        assert (tuple(sorted(values + values_to_insert)) == a_vals)
+        assert (any(res['anc']) == False)
+
+    @pytest.mark.parametrize(
+        "values, values_to_delete",
+        [
+            ([1, 2, 4, 5, 6], [2, 5]),
+            ([0, 3, 4, 7], [0, 7]),
+            ([1, 2, 3], [2, 1, 3]),
+            ([1, 2, 2, 2, 2], [2, 2]),
+            ([0, 1, 2, 3, 5, 9], [9, 1, 0]),
+        ])
+    @pytest.mark.skipif(not REVERSIBLE_ON, reason=REVERSIBLE_ON_REASON)
+    def test_delete_many(self, values, values_to_delete):
+        m = max(values).bit_length()
+        k = len(values_to_delete)
+        n = len(values)
+        prw, qrs_x, qrs_data = self._alloc_merge_program(
+            values, values_to_delete, m, n)
+        prw.apply(delete_many(n, k, m), *qrs_x, *qrs_data)
+
+        res = get_states_from_program_wrapper(prw, [qat.lang.AQASM.classarith])
+        x_vals = get_ints_from_bitarray(res['x'], k, m, False)
+        a_vals = get_ints_from_bitarray(res['a'], n, m, False)
+
+        remaining = list(values)
+        for value in values_to_delete:
+            remaining.remove(value)
+        assert (x_vals == tuple(values_to_delete))
+        assert (tuple(remaining) == a_vals[:n - k])
+        assert (a_vals[n - k:] == tuple(0 for _ in range(k)))
+        assert (any(res['anc']) == False)
+
 
 # if __name__ == '__main__':
 #     # print(f"to insert [1, 2, 4], m = 4, x = 3")
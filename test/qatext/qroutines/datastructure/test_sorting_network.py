@@ -0,0 +1,69 @@
+import itertools
+from test.common_pytest import (REVERSIBLE_ON, REVERSIBLE_ON_REASON,
+                                CircuitTestHelpers)
+
+import pytest
+from qat.lang.AQASM.program import Program
+from qatext.qpus.reversible import get_states_from_program_wrapper
+from qatext.qroutines import qregs_init as qregs
+from qatext.qroutines.arith import cuccaro_arith
+from qatext.qroutines.datastructure.sorting_network import (sort,
+                                                            sorting_schedule)
+from qatext.utils.bits.conversion import get_ints_from_bitarray
+from qatext.utils.qatmgmt.program import ProgramWrapper
+
+
+@pytest.mark.usefixtures("setup_simulator", "setup_logger")
+class TestQroutineSortingNetwork(CircuitTestHelpers):
+
+    @pytest.mark.parametrize("n", range(1, 12))
+    def test_schedule(self, n):
+        # 0-1 principle: a network sorting every binary input sorts any input
+        layers, order = sorting_schedule(n)
+        for bits in itertools.product([0, 1], repeat=n):
+            cells = list(bits)
+            for layer in layers:
+                touched = [c for pair in layer for c in pair]
+                assert len(touched) == len(set(touched))
+                for a, b in layer:
+                    if cells[a] > cells[b]:
+                        cells[a], cells[b] = cells[b], cells[a]
+            assert [cells[c] for c in order] == sorted(bits)
+
+    @pytest.mark.parametrize(
+        "values, max_bits",
+        [
+            ([2, 1], 2),
+            ([3, 1, 2], 2),
+            ([7, 0, 5, 3], 3),
+            ([4, 4, 1, 4, 0], 3),
+            ([5, 3, 6, 1, 7, 2], 3),
+            ([1, 2, 3, 4, 5, 6, 7], 3),
+            ([9, 8, 7, 6, 5, 4, 3, 2], 4),
+            ([6], 3),
+        ])
+    @pytest.mark.skipif(not REVERSIBLE_ON, reason=REVERSIBLE_ON_REASON)
+    def test_sort(self, values, max_bits):
+        m = max_bits
+        n = len(values)
+        prw = ProgramWrapper(Program())
+        qrs_in = prw.qarray_alloc(n, m, "in", int)
+        for i, value in enumerate(values):
+            prw.apply(qregs.initialize_qureg_given_int(value, m, False),
+                      qrs_in[i])
+        qrs_out = prw.qarray_alloc(n, m, "out", int)
+        prw.qarray_noalloc(None,
+                           None,
+                           "anc",
+                           qrs_out[-1].start + qrs_out[-1].length,
+                           str,
+                           unknown_size=True)
+        prw.apply(sort(n, m), *qrs_in, *qrs_out)
+
+        res = get_states_from_program_wrapper(prw, [cuccaro_arith])
+        in_vals = get_ints_from_bitarray(res['in'], n, m, False)
+        out_vals = get_ints_from_bitarray(res['out'], n, m, False)
+
+        assert (in_vals == tuple(values))
+        assert (out_vals == tuple(sorted(values)))
+        assert (any(res['anc']) == False)
@@ -4,8 +4,11 @@ import unittest
 from math import factorial
 from test.common_circuit import CircuitTestCase
 
+import numpy as np
 from qatext.qroutines.hamming_weight_generate import bartschiE19
+from qatext.utils.states.dicke import dicke_fidelity, dicke_support
 from qat.lang.AQASM import Program
+from qat.lang.AQASM.gates import X
 
 
 class BartschiTestCase(CircuitTestCase):
@@ -28,18 +31,9 @@ class BartschiTestCase(CircuitTestCase):
         circ = self.pr.to_circ()
         # self.draw_circuit(circ, max_depth=2)
         res = self.qpu.submit(circ.to_job())
-        ress = []
-        amps = []
-        for sample in res:
-            ress.append(tuple(int(i) for i in sample.state if i == 0 or i == 1))
-            amps.append(sample.probability)
-        s = set(itertools.permutations([0] * (n - k) + [1] * k))
-        self.assertEqual(len(ress), len(s))
-        for i, j in zip(sorted(ress), sorted(s)):
-            self.assertEqual(i, j)
-        minp, maxp = min(amps), max(amps)
-        self.assertAlmostEqual(minp, maxp, delta=1e-15)
-        # self.assertAlmostEqual() abs(minp - maxp) <= 1e-15
+        ress = sorted(sample.state.int for sample in res)
+        self.assertEqual(ress, dicke_support(n, k).tolist())
+        self.assertAlmostEqual(dicke_fidelity(res, n, k), 1, delta=1e-12)
 
     def _analyse_res_quick(self, n, k):
         circ = self.pr.to_circ()
@@ -63,6 +57,29 @@ class BartschiTestCase(CircuitTestCase):
                 state = res[0].state.state
                 self.assertEqual(state, 0)
 
+    def test_scs_amplitudes(self):
+        # SCS_{n,k} maps the input having its last l <= k qubits set to
+        # sqrt(l/n) of itself and sqrt((n-l)/n) of the one having its bits
+        # shifted left by one
+        for n in range(2, 9):
+            for k in range(1, n):
+                with self.subTest(n=n, k=k):
+                    self.assertEqual(len(bartschiE19.scs_angles(n, k)), k)
+                    for l in range(1, k + 1):
+                        pr = Program()
+                        qr = pr.qalloc(n)
+                        for q in range(n - l, n):
+                            pr.apply(X, qr[q])
+                        pr.apply(bartschiE19._scs(n, k), qr)
+                        res = self.qpu.submit(pr.to_circ().to_job())
+                        amps = {sample.state.int: sample.amplitude
+                                for sample in res}
+                        ones = (1 << l) - 1
+                        self.assertEqual(set(amps), {ones, ones << 1})
+                        self.assertAlmostEqual(amps[ones], np.sqrt(l / n))
+                        self.assertAlmostEqual(amps[ones << 1],
+                                               np.sqrt((n - l) / n))
+
     # TODO quite useless, just bigger
     @unittest.skipUnless(
         CircuitTestCase.SLOW_TEST_ON, CircuitTestCase.SLOW_TEST_ON_REASON
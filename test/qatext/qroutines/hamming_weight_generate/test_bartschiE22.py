@@ -0,0 +1,68 @@
+import itertools
+from math import comb
+from test.common_circuit import CircuitTestCase
+
+import numpy as np
+from qat.lang.AQASM import Program
+from qatext.qroutines.hamming_weight_generate import bartschiE19, bartschiE22
+
+
+class BartschiE22TestCase(CircuitTestCase):
+
+    def _simulate(self, gate, n):
+        pr = Program()
+        qr = pr.qalloc(n)
+        pr.apply(gate, qr)
+        res = self.qpu.submit(pr.to_circ().to_job())
+        return {sample.state.int: sample.amplitude for sample in res}
+
+    def test_statevector(self):
+        for n, k in itertools.product(range(1, 11), range(0, 11)):
+            if k > n:
+                continue
+            with self.subTest(n=n, k=k):
+                amps = self._simulate(bartschiE22.generate(n, k), n)
+                amps = {s: a for s, a in amps.items() if abs(a) > 1e-12}
+                self.assertEqual(len(amps), comb(n, k))
+                expected = 1 / np.sqrt(comb(n, k))
+                for state, amp in amps.items():
+                    self.assertEqual(bin(state).count("1"), k)
+                    # exact amplitude, phase included
+                    self.assertAlmostEqual(amp.real, expected, delta=1e-12)
+                    self.assertAlmostEqual(amp.imag, 0, delta=1e-12)
+
+    def test_same_state_as_linear(self):
+        for n, k in itertools.product(range(4, 11), range(1, 4)):
+            with self.subTest(n=n, k=k):
+                amps_log = self._simulate(bartschiE22.generate(n, k), n)
+                amps_lin = self._simulate(bartschiE19.generate(n, k), n)
+                for state in set(amps_log) | set(amps_lin):
+                    self.assertAlmostEqual(amps_log.get(state, 0),
+                                           amps_lin.get(state, 0),
+                                           delta=1e-12)
+
+    def test_unary_to_dicke_log(self):
+        # U_{n,k} must prepare D^n_l from |0^{n-l} 1^l>, for every l <= k
+        for n, k in ((8, 2), (9, 3), (12, 2)):
+            for l in range(k + 1):
+                with self.subTest(n=n, k=k, l=l):
+                    pr = Program()
+                    qr = pr.qalloc(n)
+                    for qb in qr[n - l:]:
+                        pr.apply(bartschiE22.X, qb)
+                    pr.apply(bartschiE22.unary_to_dicke_log(n, k), qr)
+                    res = self.qpu.submit(pr.to_circ().to_job())
+                    probs = [s.probability for s in res if s.probability > 1e-12]
+                    self.assertEqual(len(probs), comb(n, l))
+                    self.assertAlmostEqual(min(probs), max(probs), delta=1e-12)
+
+    def test_small_dagger(self):
+        for n, k in itertools.product(range(4, 10), range(1, 4)):
+            with self.subTest(n=n, k=k):
+                pr = Program()
+                qr = pr.qalloc(n)
+                pr.apply(bartschiE22.generate(n, k), qr)
+                pr.apply(bartschiE22.generate(n, k).dag(), qr)
+                res = self.qpu.submit(pr.to_circ().to_job())
+                self.assertEqual(len(res), 1)
+                self.assertEqual(res[0].state.state, 0)
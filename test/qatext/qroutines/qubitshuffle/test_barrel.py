@@ -0,0 +1,50 @@
+import pytest
+from qat.lang.AQASM.program import Program
+from qatext.qpus.reversible import RProgram
+from qatext.qroutines import qregs_init
+from qatext.qroutines.qubitshuffle import barrel, rotate
+from qatext.utils.qatmgmt.circuit import depth, flat_circuit
+
+
+def _rotated(nregs, m, nbits, shift, log_depth):
+    """The registers after `barrel_shift` of the array 1, 4, 7, ... by
+    `shift`, and the ancillae."""
+    values = [(3 * i + 1) % (1 << m) for i in range(nregs)]
+    pr = Program()
+    qshift = pr.qalloc(nbits)
+    array = pr.qalloc(nregs * m)
+    pr.apply(qregs_init.initialize_qureg_given_int(shift, nbits, False),
+             qshift)
+    for i, value in enumerate(values):
+        pr.apply(qregs_init.initialize_qureg_given_int(value, m, False),
+                 array[i * m:(i + 1) * m])
+    pr.apply(barrel.barrel_shift(nregs, m, nbits, log_depth), qshift, array)
+    bits = RProgram.circuit_to_rprogram(pr.to_circ(inline=True)).rbits.to01()
+    assert int(bits[:nbits], 2) == shift
+    regs = [
+        int(bits[nbits + i * m:nbits + (i + 1) * m], 2) for i in range(nregs)
+    ]
+    return regs, values, bits[nbits + nregs * m:]
+
+
+class TestBarrel:
+
+    @pytest.mark.parametrize("nregs, m, nbits", [(1, 2, 2), (3, 1, 3),
+                                                 (4, 3, 2), (5, 2, 3),
+                                                 (7, 1, 3)])
+    @pytest.mark.parametrize("log_depth", [False, True])
+    def test_barrel_shift(self, nregs, m, nbits, log_depth):
+        for shift in range(1 << nbits):
+            regs, values, ancillae = _rotated(nregs, m, nbits, shift,
+                                              log_depth)
+            assert regs == [values[(i + shift) % nregs] for i in range(nregs)]
+            assert "1" not in ancillae
+
+    @pytest.mark.parametrize("nregs, m", [(8, 4), (32, 4)])
+    def test_log_depth(self, nregs, m):
+        circ = flat_circuit(barrel.controlled_rotation(nregs, m, 1))
+        assert depth(circ) == 2 * (nregs * m // 2 - 1).bit_length() + 2
+        qat_circ = flat_circuit(
+            rotate.reg_reversal(nregs, m, 1).ctrl())
+        # one Fredkin per qubit but one per cycle of the rotation
+        assert depth(qat_circ) == nregs * m - m
@@ -0,0 +1,119 @@
+import random
+
+import pytest
+from qat.lang.AQASM.program import Program
+from qatext.qpus.reversible import RProgram
+from qatext.qroutines import qregs_init
+from qatext.qroutines.qubitshuffle import permutation
+from qatext.utils.qatmgmt.circuit import depth, flat_circuit
+
+
+def _apply(layers, values):
+    values = list(values)
+    for layer in layers:
+        assert len({q for pair in layer for q in pair}) == 2 * len(layer)
+        for q1, q2 in layer:
+            values[q1], values[q2] = values[q2], values[q1]
+    return values
+
+
+def _moved(perm):
+    """Where each wire's label ends up."""
+    res = [None] * len(perm)
+    for i, j in enumerate(perm):
+        res[j] = i
+    return res
+
+
+def _perms():
+    rng = random.Random(3)
+    perms = [[0], [1, 0], [2, 0, 1], permutation.reversal(7),
+             permutation.rotation(12, 4), permutation.rotation(9, -2)]
+    for n in (5, 8, 13):
+        perm = list(range(n))
+        rng.shuffle(perm)
+        perms.append(perm)
+    return perms
+
+
+class TestPermutation:
+
+    @pytest.mark.parametrize("perm", _perms())
+    def test_swap_layers(self, perm):
+        layers = permutation.swap_layers(perm)
+        assert _apply(layers, range(len(perm))) == _moved(perm)
+        ncycles = len(permutation.cycles(perm))
+        moved = sum(len(c) for c in permutation.cycles(perm))
+        assert sum(map(len, layers)) == moved - ncycles
+        assert len(layers) <= 2
+
+    @pytest.mark.parametrize("perm", _perms())
+    def test_adjacent_swap_layers(self, perm):
+        layers = permutation.adjacent_swap_layers(perm)
+        assert _apply(layers, range(len(perm))) == _moved(perm)
+        assert all(q2 == q1 + 1 for layer in layers for q1, q2 in layer)
+        inversions = sum(1 for i in range(len(perm))
+                         for j in range(i + 1, len(perm))
+                         if perm[i] > perm[j])
+        assert sum(map(len, layers)) == inversions
+        assert len(layers) <= len(perm)
+
+    def test_rotation_swaps(self):
+        # one SWAP per wire but one per cycle, in two layers
+        layers = permutation.swap_layers(permutation.rotation(12, 4))
+        assert sum(map(len, layers)) == 12 - 4
+        assert permutation.swap_layers(permutation.reversal(6)) == [[
+            (0, 5), (1, 4), (2, 3)
+        ]]
+
+    def test_not_a_permutation(self):
+        with pytest.raises(ValueError):
+            permutation.swap_layers([0, 0, 1])
+
+    @pytest.mark.parametrize("perm", _perms()[1:])
+    @pytest.mark.parametrize("adjacent", [False, True])
+    def test_permutation(self, perm, adjacent):
+        n = len(perm)
+        value = random.Random(n).getrandbits(n)
+        pr = Program()
+        wires = pr.qalloc(n)
+        pr.apply(qregs_init.initialize_qureg_given_int(value, n, False), wires)
+        pr.apply(permutation.permutation(perm, adjacent), wires)
+        bits = RProgram.circuit_to_rprogram(
+            pr.to_circ(inline=True)).rbits.to01()
+        expected = format(value, f"0{n}b")
+        assert [bits[perm[i]] for i in range(n)] == list(expected)
+
+    @pytest.mark.parametrize("perm", _perms()[1:])
+    @pytest.mark.parametrize("log_depth", [False, True])
+    def test_controlled_permutation(self, perm, log_depth):
+        n = len(perm)
+        value = random.Random(n).getrandbits(n)
+        expected = format(value, f"0{n}b")
+        for ctrl in (0, 1):
+            pr = Program()
+            qctrl = pr.qalloc(1)
+            wires = pr.qalloc(n)
+            pr.apply(qregs_init.initialize_qureg_given_int(ctrl, 1, False),
+                     qctrl)
+            pr.apply(qregs_init.initialize_qureg_given_int(value, n, False),
+                     wires)
+            pr.apply(permutation.controlled_permutation(perm, log_depth),
+                     qctrl, wires)
+            bits = RProgram.circuit_to_rprogram(
+                pr.to_circ(inline=True)).rbits.to01()
+            assert bits[0] == str(ctrl)
+            out = bits[1:n + 1]
+            if ctrl:
+                assert [out[perm[i]] for i in range(n)] == list(expected)
+            else:
+                assert out == expected
+            assert "1" not in bits[n + 1:]
+
+    def test_controlled_depth(self):
+        perm = permutation.rotation(32, 1)
+        assert depth(flat_circuit(permutation.controlled_permutation(
+            perm, False))) == 31
+        # two fan-outs of 16 copies around two layers
+        assert depth(flat_circuit(permutation.controlled_permutation(
+            perm, True))) == 2 * 4 + 2
@@ -1,4 +1,5 @@
 import logging
+from ctypes import ArgumentError
 from itertools import chain
 from test.common_pytest import (REVERSIBLE_ON, REVERSIBLE_ON_REASON,
                                 CircuitTestHelpers)
@@ -11,6 +12,7 @@ from qatext.qpus.reversible import (get_state_from_program,
 from qatext.qroutines import bix, qregs_init
 from qatext.qroutines.arith import cuccaro_arith
 from qatext.utils.bits.conversion import get_bitstring_from_int
+from qatext.utils.qatmgmt.circuit import flat_circuit
 from qatext.utils.qatmgmt.program import ProgramWrapper
 
 if TYPE_CHECKING:
@@ -136,6 +138,10 @@ class TestBix(CircuitTestHelpers):
             "qregs1s": exp_ones,
             "qregs0s": exp_zeros,
         }
+        if is_runtime:
+            # the data registers are left unchanged
+            expected["qregs_data"] = "".join(
+                get_bitstring_from_int(value, m) for value in runtime_data)
         if has_support_registers:
             expected["qregs1s_add"] = "0" * m
             expected["qregs0s_add"] = "0" * m
@@ -256,7 +262,21 @@ class TestBix(CircuitTestHelpers):
     def test_bix_data_compile_time(self, bitstring, elements):
         self._test_bix_data_compile_time(bitstring, elements)
 
-    def _test_bix_data_compile_time(self, bitstring, elements):
+    @pytest.mark.parametrize("bitstring, elements", [
+        ("0101", [2, 8, 10, 12]),
+        ("1000", [1, 4, 6, 8]),
+        ("1101", [0, 2, 5, 11]),
+        ("11011", [14, 6, 7, 13, 0]),
+        ("0001101", [2, 3, 4, 6, 9, 10, 11]),
+        ("11001011", [0, 1, 5, 6, 8, 10, 11, 13]),
+    ])
+    @pytest.mark.skipif(not REVERSIBLE_ON, reason=REVERSIBLE_ON_REASON)
+    def test_bix_data_unary(self, bitstring, elements):
+        self._test_bix_data_compile_time(bitstring, elements,
+                                         bix.bix_data_unary)
+
+    def _test_bix_data_compile_time(self, bitstring, elements,
+                                    routine=bix.bix_data_compile_time):
         LOGGER.debug("bitstring %s", bitstring)
         n = len(bitstring)
         weight = bitstring.count("1")
@@ -273,7 +293,66 @@ class TestBix(CircuitTestHelpers):
         ])
         LOGGER.debug("onesexp %s", onesexp)
         LOGGER.debug("zerosexp %s", zerosexp)
-        qfun = bix.bix_data_compile_time(n, m, weight, elements)
+        qfun = routine(n, m, weight, elements)
+        LOGGER.debug("Got qfun with arity %d", qfun.arity)
+        self._run_test_bix(
+            n,
+            m,
+            weight,
+            bitstring,
+            onesexp,
+            zerosexp,
+            qfun,
+            has_support_registers=False,
+        )
+
+    @pytest.mark.parametrize("bitstring, elements", [
+        ("0101", [0, 1, 2, 3]),
+        ("0101", [12, 8, 2, 10]),
+        ("0001", [3, 5, 7, 9]),
+        ("1000", [1, 4, 6, 8]),
+        ("1101", [11, 2, 5, 0]),
+        ("10011", [1, 3, 8, 9, 11]),
+        ("11011", [14, 6, 7, 13, 0]),
+        ("0001101", [2, 3, 4, 6, 9, 10, 11]),
+        ("1111000", [0, 1, 2, 3, 10, 12, 14]),
+        ("10110100", [1, 2, 4, 7, 8, 9, 11, 15]),
+        ("111001011", [0, 1, 2, 6, 7, 9, 11, 13, 14]),
+    ])
+    @pytest.mark.skipif(not REVERSIBLE_ON, reason=REVERSIBLE_ON_REASON)
+    def test_bix_data_runtime(self, bitstring, elements):
+        self._test_bix_data_runtime(bitstring, elements)
+
+    @pytest.mark.parametrize("weight", [0, 4])
+    def test_bix_data_unary_weight(self, weight):
+        with pytest.raises(ArgumentError):
+            flat_circuit(bix.bix_data_unary(4, 2, weight, [0, 1, 2, 3]))
+
+    @pytest.mark.parametrize("weight, block", [(0, 2), (4, 2), (2, 0)])
+    def test_bix_data_blocks_arguments(self, weight, block):
+        with pytest.raises(ArgumentError):
+            flat_circuit(
+                bix.bix_data_blocks(4, 2, weight, [0, 1, 2, 3], block, True))
+
+    @pytest.mark.parametrize("weight", [0, 4])
+    def test_bix_data_runtime_weight(self, weight):
+        with pytest.raises(ArgumentError):
+            flat_circuit(bix.bix_data_runtime(4, 2, weight))
+
+    def _test_bix_data_runtime(self, bitstring, elements):
+        LOGGER.debug("bitstring %s", bitstring)
+        n = len(bitstring)
+        weight = bitstring.count("1")
+        m = max(max(elements).bit_length(), 1)
+        onesexp = "".join([
+            get_bitstring_from_int(elements[i], m)
+            for i, j in enumerate(bitstring) if j == "1"
+        ])
+        zerosexp = "".join([
+            get_bitstring_from_int(elements[i], m)
+            for i, j in enumerate(bitstring) if j == "0"
+        ])
+        qfun = bix.bix_data_runtime(n, m, weight)
         LOGGER.debug("Got qfun with arity %d", qfun.arity)
         self._run_test_bix(
             n,
@@ -284,6 +363,7 @@ class TestBix(CircuitTestHelpers):
             zerosexp,
             qfun,
             has_support_registers=False,
+            runtime_data=elements,
         )
 
     @pytest.mark.parametrize(
@@ -0,0 +1,97 @@
+import pytest
+from qat.lang.AQASM import classarith
+from qatext.qroutines import bix, costs
+from qatext.qroutines.arith import cuccaro_arith
+from qatext.qroutines.datastructure.sliding_sort_array import (insert_ld,
+                                                               insert_lw)
+from qatext.qroutines.hamming_weight_generate.bartschiE19 import generate
+from qatext.utils.qatmgmt.circuit import depth, flat_circuit, gate_counts
+
+BIX_LINK = [cuccaro_arith.adder, cuccaro_arith.subtractor]
+INSERT_LINK = [classarith, cuccaro_arith]
+
+
+def _assert_cost(res, gate, link=None, nqbits=None, exact_depth=True):
+    circ = flat_circuit(gate, link, nqbits)
+    assert res.gates == gate_counts(circ)
+    assert res.qubits == circ.nbqbits
+    if exact_depth:
+        assert res.depth == depth(circ)
+    else:
+        assert res.depth >= depth(circ)
+
+
+class TestCosts:
+
+    @pytest.mark.parametrize("m", [1, 2, 5])
+    @pytest.mark.parametrize("overflow", [False, True])
+    def test_adder_subtractor(self, m, overflow):
+        nqbits = 2 * m + overflow
+        _assert_cost(costs.adder(m, overflow),
+                     cuccaro_arith.adder(m, m, overflow, True),
+                     nqbits=nqbits)
+        _assert_cost(costs.subtractor(m, overflow),
+                     cuccaro_arith.subtractor(m, m, overflow, True),
+                     nqbits=nqbits)
+
+    @pytest.mark.parametrize("m", [1, 2, 5])
+    def test_comparator(self, m):
+        _assert_cost(costs.comparator(m),
+                     cuccaro_arith.comparator(m, m, True),
+                     nqbits=2 * m + 1)
+        _assert_cost(costs.comparator(m, True),
+                     cuccaro_arith.comparator_explicit_cin(m, m, True),
+                     nqbits=2 * m + 2)
+
+    @pytest.mark.parametrize("n, m", [(1, 2), (2, 1), (3, 2), (4, 3)])
+    def test_insert(self, n, m):
+        _assert_cost(costs.insert_ld(n, m), insert_ld(n, m), INSERT_LINK)
+        _assert_cost(costs.insert_lw(n, m), insert_lw(n, m), INSERT_LINK)
+
+    @pytest.mark.parametrize("n, k", [(4, 0), (4, 4), (5, 1), (5, 4), (6, 2),
+                                      (6, 3), (7, 5), (9, 4)])
+    def test_dicke(self, n, k):
+        _assert_cost(costs.dicke(n, k), generate(n, k), nqbits=n)
+
+    @pytest.mark.parametrize("n, weight", [(2, 1), (4, 1), (4, 2), (5, 4),
+                                           (6, 3)])
+    @pytest.mark.parametrize("one", [False, True])
+    def test_bix_indexes(self, n, weight, one):
+        _assert_cost(costs.bix_indexes(n, weight, one),
+                     bix.bix_indexes_compile_time(n, weight, one),
+                     BIX_LINK,
+                     exact_depth=False)
+
+    @pytest.mark.parametrize("n, weight, elems", [(2, 1, [1, 2]),
+                                                  (3, 2, [0, 0, 0]),
+                                                  (4, 1, [3, 3, 5, 7]),
+                                                  (5, 3, [0, 1, 2, 2, 4])])
+    def test_bix_data(self, n, weight, elems):
+        _assert_cost(costs.bix_data(n, 3, weight, elems),
+                     bix.bix_data_compile_time(n, 3, weight, elems),
+                     exact_depth=False)
+        _assert_cost(costs.bix_data_diff(n, 3, weight, elems),
+                     bix.bix_data_diff_compile_time(n, 3, weight, elems),
+                     BIX_LINK,
+                     exact_depth=False)
+
+    @pytest.mark.parametrize("n, weight", [(2, 1), (3, 2), (4, 1), (5, 3)])
+    def test_bix_data_runtime(self, n, weight):
+        _assert_cost(costs.bix_data_runtime(n, 3, weight),
+                     bix.bix_data_runtime(n, 3, weight),
+                     exact_depth=False)
+
+    @pytest.mark.parametrize("n, columns, weight", [(2, 2, 1), (3, 1, 2),
+                                                    (4, 2, 2), (5, 2, 4)])
+    def test_bix_matrix(self, n, columns, weight):
+        matrix = [(3 * i + 1) % 8 for i in range(n * columns)]
+        _assert_cost(costs.bix_matrix(n, columns, 3, weight, matrix),
+                     bix.bix_matrix_compile_time(n, columns, 3, weight,
+                                                 matrix),
+                     exact_depth=False)
+
+    def test_large_instance(self):
+        # no circuit is built: this is immediate
+        res = costs.bix_indexes(500, 250, False)
+        assert res.qubits == 500 + 500 * 9 + 3 * 9 + 1
+        assert res.gates["C-CNOT"] == 500 * 2 * 9
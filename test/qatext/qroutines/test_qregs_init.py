@@ -60,3 +60,21 @@ class QregInitTestCase(CircuitTestCase):
                 # myQLM
                 state = res[0].state.state
                 self.assertEqual(state, int_dec_new)
+
+    @parameterized.expand([(1, 3), (2, 2), (5, 3), (8, 1)])
+    def test_fan_out_register(self, n, m):
+        value = 0b101 & ((1 << m) - 1)
+        prog = Program()
+        qregs_all = prog.qalloc((n + 1) * m)
+        prog.apply(qregs.initialize_qureg_given_int(value, m, False),
+                   qregs_all[:m])
+        qfun = qregs.fan_out_register(n, m)
+        prog.apply(qfun, qregs_all)
+        copied = prog.to_circ()
+        prog.apply(qfun.dag(), qregs_all)
+        restored = prog.to_circ()
+        value_str = conversion.get_bitstring_from_int(value, m)
+        rpr = RProgram.circuit_to_rprogram(copied)
+        self.assertEqual(rpr.rbits.to01(), value_str * (n + 1))
+        rpr = RProgram.circuit_to_rprogram(restored)
+        self.assertEqual(rpr.rbits.to01(), value_str + "0" * (n * m))
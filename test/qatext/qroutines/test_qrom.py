@@ -0,0 +1,82 @@
+import pytest
+from qat.lang.AQASM.program import Program
+from qat.lang.AQASM.routines import QRoutine
+from qatext.qpus.reversible import RProgram
+from qatext.qroutines import qregs_init, qrom
+from qatext.utils.bits.conversion import get_bitstring_from_int
+
+
+def _run_lookup(address_size, m, table, start, address, target):
+    pr = Program()
+    qaddress = pr.qalloc(address_size)
+    qtarget = pr.qalloc(m)
+    pr.apply(qregs_init.initialize_qureg_given_int(address, address_size,
+                                                   False), qaddress)
+    pr.apply(qregs_init.initialize_qureg_given_int(target, m, False),
+             qtarget)
+    pr.apply(qrom.lookup(address_size, m, table, start), qaddress, qtarget)
+    circ = pr.to_circ(inline=True)
+    return RProgram.circuit_to_rprogram(circ).rbits.to01(), circ.nbqbits
+
+
+class TestQROM:
+
+    @pytest.mark.parametrize("address_size, table, start", [
+        (1, [5], 1),
+        (2, [3, 0, 6, 5], 0),
+        (3, [1, 2, 3, 4, 5, 6, 7], 1),
+        (3, [7, 2, 4], 2),
+        (4, [9, 3, 14, 0, 11, 6], 7),
+    ])
+    def test_lookup(self, address_size, table, start):
+        m = 4
+        for address in range(start, start + len(table)):
+            for target in (0, 0b1010):
+                bits, nbqbits = _run_lookup(address_size, m, table, start,
+                                            address, target)
+                expected = get_bitstring_from_int(
+                    address, address_size) + get_bitstring_from_int(
+                        target ^ table[address - start], m)
+                # the ancillae are back to zero
+                assert bits == expected + "0" * (nbqbits - len(expected))
+
+    def test_linear_cost(self):
+        table = list(range(1, 33))
+        circ = Program()
+        qbits = circ.qalloc(5 + 6)
+        circ.apply(qrom.lookup(5, 6, table, 0), qbits)
+        counts = circ.to_circ(inline=True).statistics()["gates"]
+        assert counts["CCNOT"] <= 2 * (len(table) - 1)
+        assert counts["CNOT"] <= len(table) + sum(
+            v.bit_count() for v in table)
+
+    @pytest.mark.parametrize("value", [0b0100, 0b0110, 0b1011])
+    @pytest.mark.parametrize("with_anc", [False, True])
+    def test_write_two_controls(self, value, with_anc):
+        for ctrls in range(4):
+            pr = Program()
+            qctrls = pr.qalloc(2)
+            target = pr.qalloc(4)
+            anc = pr.qalloc(1)
+            pr.apply(qregs_init.initialize_qureg_given_int(ctrls, 2, False),
+                     qctrls)
+            qrout = QRoutine()
+            wires = qrout.new_wires(7)
+            qrom.write(qrout, (wires[0], wires[1]), wires[2:6], value,
+                       wires[6] if with_anc else None)
+            pr.apply(qrout, *qctrls, *target, *anc)
+            circ = pr.to_circ(inline=True)
+            bits = RProgram.circuit_to_rprogram(circ).rbits.to01()
+            expected = value if ctrls == 0b11 else 0
+            assert bits == get_bitstring_from_int(
+                ctrls, 2) + get_bitstring_from_int(expected, 4) + "0"
+            ccnots = circ.statistics()["gates"].get("CCNOT", 0)
+            assert ccnots == (2 if with_anc and value.bit_count() > 2 else
+                              value.bit_count())
+
+    def test_table_too_large(self):
+        pr = Program()
+        pr.apply(qrom.lookup(2, 3, [1, 2, 3], 2), pr.qalloc(5))
+        # the routine is built when compiled
+        with pytest.raises(ValueError):
+            pr.to_circ()
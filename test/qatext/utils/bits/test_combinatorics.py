@@ -0,0 +1,82 @@
+import itertools
+from math import comb
+
+import numpy as np
+import pytest
+from qatext.utils.bits.combinatorics import (bitslice, next_same_weight,
+                                             rank, rank_array, to_bitarrays,
+                                             unbitslice, unrank,
+                                             unrank_array, weight_k_chunks,
+                                             weight_k_ints,
+                                             weight_k_packed_chunks)
+from qatext.utils.bits.conversion import get_bitarray_from_int
+
+
+def _expected(n, k):
+    return sorted(
+        sum(1 << i for i in pos) for pos in itertools.combinations(range(n), k))
+
+
+class TestCombinatorics:
+
+    @pytest.mark.parametrize("n", range(0, 11))
+    def test_weight_k_ints(self, n):
+        for k in range(n + 1):
+            assert list(weight_k_ints(n, k)) == _expected(n, k)
+
+    def test_next_same_weight(self):
+        assert next_same_weight(0b0111) == 0b1011
+        assert next_same_weight(0b1100) == 0b10001
+
+    @pytest.mark.parametrize("n", range(1, 11))
+    def test_rank_unrank(self, n):
+        for k in range(n + 1):
+            xs = _expected(n, k)
+            assert [rank(x) for x in xs] == list(range(len(xs)))
+            assert [unrank(r, k) for r in range(len(xs))] == xs
+            assert rank_array(np.array(xs), n).tolist() == list(
+                range(len(xs)))
+            assert unrank_array(np.arange(len(xs)), n, k).tolist() == xs
+
+    def test_unrank_big(self):
+        n, k = 63, 31
+        ranks = np.array([0, 1, 12345678901, comb(n, k) - 1])
+        xs = unrank_array(ranks, n, k)
+        assert xs[0] == (1 << k) - 1
+        assert xs[-1] == ((1 << k) - 1) << (n - k)
+        assert xs.tolist() == [unrank(int(r), k) for r in ranks]
+        assert rank_array(xs, n).tolist() == ranks.tolist()
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+    def test_chunks(self, chunk_size):
+        n, k = 10, 4
+        chunks = list(weight_k_chunks(n, k, chunk_size))
+        assert all(len(c) <= chunk_size for c in chunks)
+        assert np.concatenate(chunks).tolist() == _expected(n, k)
+        part = np.concatenate(list(weight_k_chunks(n, k, chunk_size, 5, 50)))
+        assert part.tolist() == _expected(n, k)[5:50]
+
+    @pytest.mark.parametrize("little_endian", [False, True])
+    def test_packed_chunks(self, little_endian):
+        n, k = 11, 3
+        rows = np.concatenate(
+            list(weight_k_packed_chunks(n, k, 17, little_endian)))
+        assert rows.shape == (comb(n, k), 2)
+        bits = np.unpackbits(rows, axis=1)[:, :n]
+        for x, row in zip(_expected(n, k), bits):
+            assert row.tolist() == get_bitarray_from_int(x, n, little_endian)
+        assert (to_bitarrays(np.array(_expected(n, k)), n,
+                             little_endian) == bits).all()
+
+    @pytest.mark.parametrize("size", [0, 1, 63, 64, 65, 200])
+    def test_bitslice(self, size):
+        n = 12
+        rng = np.random.default_rng(size)
+        xs = rng.integers(0, 1 << n, size)
+        rows = bitslice(xs, n)
+        assert rows.shape == (n, -(-size // 64))
+        for i in range(n):
+            for j, x in enumerate(xs):
+                word, lane = divmod(j, 64)
+                assert (int(rows[i, word]) >> lane) & 1 == (int(x) >> i) & 1
+        assert unbitslice(rows, size).tolist() == xs.tolist()
@@ -0,0 +1,173 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+from qat.lang.AQASM import classarith
+from qat.lang.AQASM.gates import CNOT, H
+from qat.lang.AQASM.program import Program
+from qat.lang.AQASM.routines import QRoutine
+from qatext.qroutines.arith import cuccaro_arith
+from qatext.utils.qatmgmt.cache import CircuitCache
+from qatext.utils.qatmgmt.program import ProgramWrapper
+from qatext.utils.qatmgmt.routines import QRoutineWrapper
+
+CALLS = []
+
+
+def _program(n: int) -> ProgramWrapper:
+    CALLS.append(n)
+    prw = ProgramWrapper(Program())
+    a = prw.qarray_alloc(2, n, "a", int)
+    b = prw.qarray_alloc(1, n, "b", str)
+    prw.apply(H, a[0][0])
+    prw.apply(classarith.add(n, n), a[0], a[1])
+    prw.apply(CNOT, a[1][0], b[0][0])
+    return prw
+
+
+def _routine(n: int) -> QRoutineWrapper:
+    qrw = QRoutineWrapper(QRoutine())
+    a = qrw.qarray_wires(1, n, "a", bool)
+    for q in a[0]:
+        qrw.apply(H, q)
+    return qrw
+
+
+def _flat(circ):
+    return [(op.gate, tuple(op.qbits)) for op in circ]
+
+
+class TestCircuitCache:
+
+    def test_hit_skips_builder(self, tmp_path):
+        cache = CircuitCache(str(tmp_path))
+        CALLS.clear()
+        first = cache.build(_program, 3, link=[classarith, cuccaro_arith])
+        # another instance, as in a later run
+        second = CircuitCache(str(tmp_path)).build(
+            _program, 3, link=[classarith, cuccaro_arith])
+        assert CALLS == [3]
+        assert _flat(first.circuit) == _flat(second.circuit)
+        assert first.registers == second.registers
+        assert second.registers["a"].slic == slice(0, 6)
+        assert second.registers["a"].n == 2
+        assert second.registers["b"].qtype is str
+        assert second.registers["b"].qregs is None
+
+    def test_key(self, tmp_path):
+        cache = CircuitCache(str(tmp_path))
+        CALLS.clear()
+        cache.build(_program, 2)
+        cache.build(_program, 3)
+        cache.build(_program, 3, link=[classarith, cuccaro_arith])
+        cache.build(_program, 3)
+        assert CALLS == [2, 3, 3]
+        assert len(cache.entries()) == 3
+
+    def test_key_large_array(self, tmp_path):
+        cache = CircuitCache(str(tmp_path))
+        values = np.arange(10000)
+        other = values.copy()
+        other[5000] += 1
+        # the repr of both is the same
+        assert repr(values) == repr(other)
+        keys = {
+            cache.key(_program, args, {}, None)
+            for args in [(values,), (other,), ([values],), ([other],),
+                         (values.astype(np.int32),)]
+        }
+        assert len(keys) == 5
+        assert cache.key(_program, (values.copy(),), {}, None) == \
+            cache.key(_program, (values,), {}, None)
+
+    def test_get_evicted_meanwhile(self, tmp_path, monkeypatch):
+        cache = CircuitCache(str(tmp_path))
+        cache.build(_routine, 3)
+        key = cache.entries()[0]
+
+        def utime(path):
+            raise FileNotFoundError(path)
+
+        monkeypatch.setattr(os, "utime", utime)
+        assert cache.get(key) is None
+
+    def test_qroutine(self, tmp_path):
+        res = CircuitCache(str(tmp_path)).build(_routine, 3)
+        assert res.circuit.nbqbits == 3
+        assert res.registers["a"].qtype is bool
+
+    def test_lru_eviction(self, tmp_path):
+        cache = CircuitCache(str(tmp_path))
+        keys = []
+        for n in (2, 3, 4):
+            cache.build(_program, n)
+            keys.append(cache.key(_program, (n, ), {}, None))
+        size = cache.size()
+        # the oldest entry is read again, so the second one is the LRU
+        first = cache.get(keys[0])
+        assert first is not None
+        path = tmp_path / f"{keys[1]}.json"
+        os.utime(path, (0, 0))
+        cache.max_bytes = size - 1
+        cache._evict()
+        assert keys[1] not in cache.entries()
+        assert set(cache.entries()) == {keys[0], keys[2]}
+        assert cache.get(keys[1]) is None
+        cache.clear()
+        assert cache.entries() == [] and cache.size() == 0
+
+    def test_concurrent_puts(self, tmp_path):
+        circ = _program(3).to_circ()
+        registers = {}
+        cache = CircuitCache(str(tmp_path))
+        cache.put("size", circ, registers)
+        # every put evicts all the other entries
+        cache.max_bytes = cache.size()
+        barrier = threading.Barrier(2)
+        errors = []
+
+        def put(prefix: str):
+            barrier.wait()
+            try:
+                for i in range(50):
+                    cache.put(f"{prefix}{i}", circ, registers)
+            except Exception as exc:  # pylint: disable=broad-except
+                errors.append(exc)
+
+        threads = [
+            threading.Thread(target=put, args=(prefix, ))
+            for prefix in "ab"
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        assert list((tmp_path / "tmp").iterdir()) == []
+        assert cache.size() <= cache.max_bytes * 2
+
+    def test_failed_dump(self, tmp_path, monkeypatch):
+        circ = _program(3).to_circ()
+        cache = CircuitCache(str(tmp_path))
+
+        def dump(path):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(circ, "dump", dump)
+        with pytest.raises(OSError):
+            cache.put("key", circ, {})
+        assert list((tmp_path / "tmp").iterdir()) == []
+        assert cache.entries() == [] and cache.size() == 0
+
+    def test_cssp(self, tmp_path):
+        import cssp
+        link = [classarith, cuccaro_arith]
+        cache = CircuitCache(str(tmp_path))
+        args = (3, 1, [1, 2, 3], 3)
+        first = cache.build(cssp.build, *args, link=link)
+        second = cache.build(cssp.build, *args, link=link)
+        expected = cssp.build(*args).to_circ(link=link)
+        assert _flat(first.circuit) == _flat(expected)
+        assert _flat(second.circuit) == _flat(expected)
+        assert second.registers["s_1"].slic == slice(3, 5)
@@ -0,0 +1,118 @@
+import gc
+import weakref
+
+import numpy as np
+import pytest
+from qat.lang.AQASM.gates import CNOT, X
+from qat.lang.AQASM.program import Program
+from qat.lang.AQASM.routines import QRoutine
+from qatext.qpus.batched import (BatchedRProgram, compile_program,
+                                 compile_tape, invert_tape)
+from qatext.qpus.reversible import RGate
+from qatext.qroutines.arith import cuccaro_arith
+from qatext.utils.qatmgmt.circuit import gate_counts
+from qatext.utils.qatmgmt.repeat import repeat, repeated
+from qatext.utils.qatmgmt.resources import (ResourceEstimator,
+                                            estimate_resources)
+
+
+def _body():
+    qrout = QRoutine()
+    wires = qrout.new_wires(2)
+    qrout.apply(CNOT, wires)
+    qrout.apply(X, wires[0])
+    return qrout
+
+
+def _program(gate, nqbits):
+    pr = Program()
+    pr.apply(gate, pr.qalloc(nqbits))
+    return pr
+
+
+class TestRepeat:
+
+    @pytest.mark.parametrize("times", [1, 2, 13])
+    def test_flat_expansion(self, times):
+        body = _body()
+        unrolled = Program()
+        qbits = unrolled.qalloc(2)
+        for _ in range(times):
+            unrolled.apply(body, qbits)
+        circ = _program(repeat(body, times), 2).to_circ(inline=True)
+        expected = unrolled.to_circ(inline=True)
+        assert [(op.gate, op.qbits) for op in circ] == [
+            (op.gate, op.qbits) for op in expected
+        ]
+
+    def test_logarithmic_definitions(self):
+        body = _body()
+        circ = _program(repeat(body, 1000), 2).to_circ(inline=False)
+        powers = [
+            g.syntax.parameters[0].int_p for g in circ.gateDic.values()
+            if g.syntax is not None and g.syntax.name.startswith("REPEAT_")
+        ]
+        assert sorted(powers) == [1, 3, 7, 15, 31, 62, 125, 250, 500, 1000]
+
+    def test_repeated(self):
+        body = _body()
+        gate = repeat(body, 5)
+        assert repeated(gate) == (body, 5)
+        assert repeated(X) is None
+        # the repetitions of a body share the abstract gate
+        assert repeat(body, 3).name == gate.name
+        assert repeat(_body(), 3).name != gate.name
+        with pytest.raises(ValueError):
+            repeat(body, 0)
+        with pytest.raises(ValueError):
+            repeat(cuccaro_arith.adder(3, 3, False, True), 2)
+
+    def test_body_freed(self):
+        body = _body()
+        ref = weakref.ref(body)
+        circ = _program(repeat(body, 4), 2).to_circ(inline=True)
+        assert len(list(circ)) == 8
+        # once no gate, program or circuit uses the repetition
+        del body, circ
+        gc.collect()
+        assert ref() is None
+
+    def test_resources(self):
+        add = cuccaro_arith.adder(3, 3, False, True)
+        pr = Program()
+        qbits = pr.qalloc(6)
+        pr.apply(repeat(add, 40, 6), qbits)
+        pr.apply(repeat(add, 40, 6).dag(), qbits)
+        estimator = ResourceEstimator()
+        res = estimator.estimate(pr)
+        circ = pr.to_circ(inline=True)
+        assert res.gates == gate_counts(circ)
+        assert res.qubits == circ.nbqbits
+        single = estimate_resources(_program(add, 6))
+        assert res.depth <= 80 * single.depth
+        # the body is costed once, whatever the number of repetitions
+        few, many = ResourceEstimator(), ResourceEstimator()
+        few.estimate(_program(repeat(add, 4, 6), 6))
+        res = many.estimate(_program(repeat(add, 40000, 6), 6))
+        assert res.gate_count == 40000 * single.gate_count
+        assert many.definitions == few.definitions
+
+    def test_compile_program(self):
+        add = cuccaro_arith.adder(3, 3, False, True)
+        pr = _program(repeat(add, 5, 6), 6)
+        pr.apply(X, 0)
+        tape, nbits = compile_program(pr)
+        assert nbits == 7
+        assert tape[0][:2] == (RGate.REPEAT, (5, ))
+        assert tape[1] == (RGate.NOT, (), (0, ))
+        flat = compile_tape(pr.to_circ(inline=True))
+        xs = np.arange(64)
+        results = []
+        for t in (tape, flat):
+            bprogram = BatchedRProgram(nbits, len(xs))
+            bprogram.set_ints(range(6), xs)
+            bprogram.run(t)
+            results.append(bprogram.rows.copy())
+        assert (results[0] == results[1]).all()
+        bprogram.run(invert_tape(tape))
+        assert (bprogram.get_ints(range(6)) == xs).all()
@@ -0,0 +1,131 @@
+import pytest
+from qat.lang.AQASM import classarith
+from qat.lang.AQASM.gates import CCNOT, CNOT, RZ, SWAP, T, X, Z
+from qat.lang.AQASM.misc import build_gate
+from qat.lang.AQASM.program import Program
+from qat.lang.AQASM.qftarith import QFT
+from qat.lang.AQASM.routines import QRoutine
+from qatext.qroutines import bix, qregs_init
+from qatext.qroutines.arith import cuccaro_arith
+from qatext.qroutines.datastructure.sliding_sort_array import (insert_ld,
+                                                               insert_lw)
+from qatext.qroutines.hamming_weight_generate.bartschiE19 import generate
+from qatext.utils.qatmgmt.circuit import depth, gate_counts
+from qatext.utils.qatmgmt.resources import (ResourceEstimator,
+                                            estimate_resources)
+
+LINK = [classarith, cuccaro_arith]
+
+
+@build_gate("_TEST_CTRL_X", [int], arity=lambda _: 3)
+def _ctrl_x(_):
+    qrout = QRoutine()
+    wires = qrout.new_wires(3)
+    qrout.apply(X.ctrl(), wires[0], wires[1])
+    qrout.apply(Z.ctrl(), wires[1], wires[2])
+    qrout.apply(T.ctrl(), wires[0], wires[2])
+    return qrout
+
+
+def _program(gate, nqbits=None):
+    pr = Program()
+    qbits = pr.qalloc(nqbits or gate.arity)
+    pr.apply(gate, qbits[:gate.arity])
+    return pr
+
+
+def _assert_matches_circuit(pr, link=None):
+    res = estimate_resources(pr, link)
+    circ = pr.to_circ(link=link, inline=True)
+    assert res.gates == gate_counts(circ)
+    assert res.qubits == circ.nbqbits
+    assert res.ancillae == circ.nbqbits - pr.qbit_count
+    assert res.depth >= depth(circ)
+    return res
+
+
+class TestResources:
+
+    @pytest.mark.parametrize("gate, nqbits", [
+        (cuccaro_arith.adder(4, 4, False, False), 8),
+        (cuccaro_arith.adder(3, 3, True, True).ctrl(), 8),
+        (cuccaro_arith.subtractor(4, 4, False, False).dag(), 8),
+        (insert_ld(3, 2), None),
+        (insert_ld(3, 2).dag(), None),
+        (insert_lw(4, 2).ctrl(), None),
+        (bix.bix_data_compile_time(4, 3, 2, [1, 2, 5, 7]), None),
+        (qregs_init.copy_register(3).ctrl(), None),
+        (generate(6, 2), 6),
+        (generate(5, 2).dag(), 5),
+        (QFT(4).dag(), None),
+        (classarith.add(3, 2), None),
+        (_ctrl_x(0), None),
+        (_ctrl_x(0).dag().ctrl(), None),
+    ])
+    def test_gates(self, gate, nqbits):
+        _assert_matches_circuit(_program(gate, nqbits), LINK)
+
+    def test_variants_of_leaves(self):
+        pr = Program()
+        qbits = pr.qalloc(4)
+        # qat renames the singly controlled X, CNOT and Z applied directly
+        pr.apply(X.ctrl(), qbits[:2])
+        pr.apply(CNOT.ctrl(), qbits[:3])
+        pr.apply(Z.ctrl(), qbits[:2])
+        pr.apply(X.ctrl().ctrl(), qbits[:3])
+        pr.apply(T.dag().ctrl(), qbits[:2])
+        pr.apply(T.dag().dag(), qbits[0])
+        pr.apply(RZ(0.5).dag(), qbits[0])
+        pr.apply(CCNOT.dag(), qbits[:3])
+        pr.apply(SWAP.ctrl(2), qbits)
+        res = _assert_matches_circuit(pr)
+        assert res.gates["C-D-T"] == 1
+
+    def test_routines(self):
+        inner = QRoutine()
+        wires = inner.new_wires(2)
+        anc = inner.new_wires(1)
+        inner.set_ancillae(anc)
+        inner.apply(CCNOT, wires, anc)
+        inner.apply(X.ctrl(), anc, wires[0])
+        inner.apply(CCNOT, wires, anc)
+        outer = QRoutine()
+        wires = outer.new_wires(4)
+        outer.apply(inner, wires[:2])
+        outer.apply(inner.ctrl(), wires[1:])
+        outer.apply(insert_lw(1, 2).dag(), wires[:2], wires[2:])
+        _assert_matches_circuit(_program(outer, 5), LINK)
+
+    def test_linked_implementation(self):
+        # linking classarith replaces its default adder with the Cuccaro one
+        pr = _program(classarith.add(4, 4))
+        linked = _assert_matches_circuit(pr, [classarith])
+        default = _assert_matches_circuit(pr)
+        assert linked.ancillae == 1
+        assert default.ancillae == 0
+
+    @pytest.mark.parametrize("n, k, values, low_width", [
+        (3, 1, [1, 2, 3], True),
+        (4, 2, [1, 2, 3, 5], False),
+    ])
+    def test_cssp(self, n, k, values, low_width):
+        import cssp
+        prw = cssp.build(n, k, values, sum(values[:k]), low_width)
+        _assert_matches_circuit(prw._program, LINK)
+
+    def test_memoization(self):
+        gate = cuccaro_arith.adder(5, 5, False, False)
+        pr = Program()
+        qbits = pr.qalloc(12)
+        for _ in range(50):
+            pr.apply(gate, qbits[:10])
+            pr.apply(gate.dag(), qbits[2:12])
+        estimator = ResourceEstimator()
+        res = estimator.estimate(pr)
+        single = estimator.estimate(_program(gate, 10))
+        assert res.gate_count == 100 * single.gate_count
+        assert res.ancillae == single.ancillae == 1
+        definitions = estimator.definitions
+        estimator.estimate(_program(gate.ctrl(), 11))
+        # the controlled adder reuses the cost of the adder
+        assert estimator.definitions == definitions + 1
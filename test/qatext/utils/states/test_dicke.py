@@ -0,0 +1,65 @@
+import itertools
+from math import comb
+from test.common_pytest import CircuitTestHelpers
+
+import numpy as np
+import pytest
+from qat.lang.AQASM import Program
+from qat.lang.AQASM.gates import H, X
+from qatext.qroutines.hamming_weight_generate import bartschiE19
+from qatext.utils.states.dicke import (dicke_fidelity, dicke_statevector,
+                                       dicke_support, fidelity)
+
+
+class TestDickeStatevector:
+
+    @pytest.mark.parametrize("n", range(0, 12))
+    def test_support(self, n):
+        for k in range(n + 1):
+            expected = sorted(
+                sum(1 << i for i in pos)
+                for pos in itertools.combinations(range(n), k))
+            assert dicke_support(n, k).tolist() == expected
+
+    def test_support_wrong_weight(self):
+        with pytest.raises(ValueError):
+            dicke_support(3, 4)
+
+    @pytest.mark.parametrize("n, k", [(1, 0), (4, 2), (8, 3), (10, 10)])
+    def test_dense_sparse(self, n, k):
+        dense = dicke_statevector(n, k)
+        indexes, amplitudes = dicke_statevector(n, k, sparse=True)
+        assert np.isclose(np.linalg.norm(dense), 1)
+        assert np.count_nonzero(dense) == comb(n, k)
+        assert np.allclose(dense[indexes], amplitudes)
+
+
+@pytest.mark.usefixtures("setup_simulator", "setup_logger")
+class TestDickeFidelity(CircuitTestHelpers):
+
+    def _simulate(self, n, k):
+        pr = Program()
+        qr = pr.qalloc(n)
+        pr.apply(bartschiE19.generate(n, k), qr)
+        return self.simulate_program(pr)
+
+    @pytest.mark.parametrize("n, k", [(4, 1), (6, 3), (9, 2)])
+    def test_generate(self, n, k):
+        res = self._simulate(n, k)
+        assert dicke_fidelity(res, n, k) == pytest.approx(1)
+        assert fidelity(res, *dicke_statevector(
+            n, k, sparse=True)) == pytest.approx(1)
+        assert dicke_fidelity(res, n, k + 1) == pytest.approx(0)
+
+    def test_other_state(self):
+        # |+>|1>|0>: half of the amplitude lies on weight 1
+        pr = Program()
+        qr = pr.qalloc(3)
+        pr.apply(H, qr[0])
+        pr.apply(X, qr[1])
+        res = self.simulate_program(pr)
+        expected = (1 / np.sqrt(2) / np.sqrt(3))**2
+        assert dicke_fidelity(res, 3, 1) == pytest.approx(expected)
+        assert fidelity(res, *dicke_statevector(
+            3, 1, sparse=True)) == pytest.approx(expected)
+        assert dicke_fidelity(res, 3, 2) == pytest.approx(expected)
@@ -0,0 +1,151 @@
+import functools
+
+import numpy as np
+import pytest
+from qat.lang.AQASM import classarith
+from qat.lang.AQASM.gates import CNOT
+from qat.lang.AQASM.routines import QRoutine
+from qatext.qroutines import bix, qregs_init
+from qatext.qroutines.arith import cuccaro_arith
+from qatext.qroutines.datastructure.sliding_sort_array import (delete,
+                                                               insert_ld,
+                                                               insert_lw,
+                                                               merge_lw)
+from qatext.qroutines.datastructure.sorting_network import sort
+from qatext.qroutines.qubitshuffle import reverse, rotate
+from qatext.utils.bits.combinatorics import to_bitarrays, unrank_array
+from qatext.verification.ancillae import check_ancillae
+
+
+def _registers_to_bits(values: np.ndarray, m: int) -> np.ndarray:
+    """(size, nregs) big endian registers of `m` bits to a bit matrix."""
+    return np.hstack([to_bitarrays(values[:, r], m)
+                      for r in range(values.shape[1])])
+
+
+def _sorted_array_sampler(k, n, m, rng, size):
+    """`k` random values, followed by a sorted array of `n` cells whose last
+    `k` cells are empty."""
+    xs = rng.integers(0, 1 << m, (size, k))
+    array = np.sort(rng.integers(0, 1 << m, (size, n - k)), axis=1)
+    array = np.hstack([array, np.zeros((size, k), dtype=array.dtype)])
+    return _registers_to_bits(np.hstack([xs, array]), m)
+
+
+def _delete_sampler(n, m, rng, size):
+    """The value to delete, followed by a sorted array containing it."""
+    array = np.sort(rng.integers(0, 1 << m, (size, n)), axis=1)
+    pick = array[np.arange(size), rng.integers(0, n, size)]
+    values = np.hstack([pick[:, None], array])
+    return _registers_to_bits(values, m)
+
+
+def _dicke_sampler(n, weight, arity, rng, size):
+    """A random bitstring of weight `weight` (bit `i` on qubit `i`),
+    followed by zeros."""
+    from math import comb
+    xs = unrank_array(rng.integers(0, comb(n, weight), size), n, weight)
+    bits = np.zeros((size, arity), dtype=np.uint8)
+    bits[:, :n] = to_bitarrays(xs, n, littleEndian=True)
+    return bits
+
+
+class TestAncillae:
+
+    @pytest.mark.parametrize("gate", [
+        cuccaro_arith.adder(5, 5, False, False),
+        cuccaro_arith.adder(4, 4, True, True),
+        cuccaro_arith.subtractor(5, 5, False, False),
+        cuccaro_arith.comparator(6, 6, False),
+        cuccaro_arith.comparator_explicit_cin(6, 6, False),
+        qregs_init.copy_register(7),
+        qregs_init.copy_array_of_registers(3, 4),
+        rotate.reg_reversal(5, 3, 2),
+        rotate.swap_qreg_cells(4),
+        reverse.reverse(9),
+    ])
+    def test_uniform(self, gate):
+        report = check_ancillae(gate, samples=500)
+        assert report.ok, report
+        assert report.inputs == 500
+
+    def test_sort(self):
+        # every input is valid, the output array must be zero
+        n, m = 5, 3
+        arity = 2 * n * m
+        sampler = functools.partial(_uniform_half, n * m, arity)
+        report = check_ancillae(sort(n, m), sampler=sampler, samples=300)
+        assert report.ok, report
+
+    @pytest.mark.parametrize("insert", [insert_ld, insert_lw])
+    def test_insert(self, insert):
+        n, m = 5, 3
+        report = check_ancillae(insert(n, m),
+                                link=[classarith],
+                                sampler=functools.partial(
+                                    _sorted_array_sampler, 1, n, m),
+                                samples=300)
+        assert report.ok, report
+
+    def test_merge(self):
+        n, k, m = 6, 2, 3
+        report = check_ancillae(merge_lw(n, k, m),
+                                sampler=functools.partial(
+                                    _sorted_array_sampler, k, n, m),
+                                samples=300)
+        assert report.ok, report
+
+    def test_delete(self):
+        n, m = 5, 3
+        report = check_ancillae(delete(n, m),
+                                link=[classarith],
+                                sampler=functools.partial(
+                                    _delete_sampler, n, m),
+                                samples=300)
+        assert report.ok, report
+
+    @pytest.mark.parametrize("n, weight", [(5, 2), (7, 3)])
+    def test_bix(self, n, weight):
+        elems = [2 * i + 1 for i in range(n)]
+        m = max(elems).bit_length()
+        # qat cannot compile the dagger of BIX_DATA
+        for gate, dag_from_tape in (
+            (bix.bix_indexes_compile_time(n, weight, False), False),
+            (bix.bix_data_compile_time(n, m, weight, elems), True),
+            (bix.bix_data_diff_compile_time(n, m, weight, elems), False),
+        ):
+            sampler = functools.partial(_dicke_sampler, n, weight,
+                                        gate.arity)
+            report = check_ancillae(gate,
+                                    link=[cuccaro_arith.adder,
+                                          cuccaro_arith.subtractor],
+                                    sampler=sampler,
+                                    samples=200,
+                                    dag_from_tape=dag_from_tape)
+            assert report.ok, (gate.name, report)
+
+    def test_pool(self):
+        report = check_ancillae(cuccaro_arith.adder(6, 6, False, False),
+                                samples=1000,
+                                processes=2,
+                                chunk_size=128)
+        assert report.ok, report
+        assert report.inputs == 1000
+
+    def test_dirty_ancilla(self):
+        qrout = QRoutine()
+        wires = qrout.new_wires(3)
+        anc = qrout.new_wires(1)
+        qrout.set_ancillae(anc)
+        qrout.apply(CNOT, wires[1], anc)
+        report = check_ancillae(qrout, samples=100)
+        assert report.failures > 0
+        assert (report.first_failure >> 1) & 1 == 1
+        assert "dirty ancillae" in report.reason
+
+
+def _uniform_half(nbits, arity, rng, size):
+    """Random bits on the first `nbits` qubits, zeros on the others."""
+    bits = np.zeros((size, arity), dtype=np.uint8)
+    bits[:, :nbits] = rng.integers(0, 2, (size, nbits))
+    return bits
@@ -0,0 +1,99 @@
+from ctypes import ArgumentError
+
+import numpy as np
+import pytest
+from qat.lang.AQASM.gates import CCNOT
+from qat.lang.AQASM.routines import QRoutine
+from qatext.qroutines import bix
+from qatext.verification.bix import (SelectionSpec, selection_model,
+                                     verify_bix_data, verify_bix_indexes,
+                                     verify_bix_matrix, verify_selection)
+
+
+class TestBixVerification:
+
+    def test_model(self):
+        # inputs 0b0101 and 0b1100: bit i is position i
+        spec = SelectionSpec(4, 2, 4, np.array([[3], [5], [7], [9]]))
+        ones, zeros = selection_model(np.array([0b0101, 0b1100]), spec)
+        assert ones.tolist() == [[3, 7], [7, 9]]
+        assert zeros.tolist() == [[5, 9], [3, 5]]
+
+    @pytest.mark.parametrize("n, weight", [(4, 1), (5, 2), (7, 3), (8, 7)])
+    def test_indexes(self, n, weight):
+        for idx_start_at_one in (False, True):
+            report = verify_bix_indexes(n, weight, idx_start_at_one)
+            assert report.ok, report
+            assert report.inputs > 0
+
+    @pytest.mark.parametrize("diff", [False, True])
+    @pytest.mark.parametrize("n, weight", [(4, 1), (6, 3), (8, 2)])
+    def test_data(self, n, weight, diff):
+        elems = [2 * i + 1 for i in range(n)]
+        m = max(elems).bit_length()
+        report = verify_bix_data(n, m, weight, elems, diff=diff)
+        assert report.ok, report
+
+    @pytest.mark.parametrize("n, weight", [(2, 1), (5, 1), (6, 3), (7, 5)])
+    def test_data_unary(self, n, weight):
+        elems = [(5 * i + 3) % 11 for i in range(n)]
+        m = max(elems).bit_length()
+        report = verify_selection(
+            bix.bix_data_unary(n, m, weight, elems),
+            SelectionSpec(n, weight, m, np.array(elems)[:, None]))
+        assert report.ok, report
+
+    @pytest.mark.parametrize("block", [1, 2, 3, 8])
+    @pytest.mark.parametrize("n, weight", [(5, 1), (6, 3), (7, 5)])
+    def test_data_blocks(self, n, weight, block):
+        elems = [(5 * i + 3) % 11 for i in range(n)]
+        m = max(elems).bit_length()
+        for log_depth in (False, True):
+            report = verify_selection(
+                bix.bix_data_blocks(n, m, weight, elems, block, log_depth),
+                SelectionSpec(n, weight, m, np.array(elems)[:, None]))
+            assert report.ok, report
+
+    def test_matrix(self):
+        report = verify_bix_matrix(5, 3, 4, 2, list(range(15)))
+        assert report.ok, report
+
+    @pytest.mark.parametrize("n, weight, columns", [(4, 2, 5), (5, 1, 9),
+                                                    (6, 4, 3), (5, 3, 12)])
+    def test_matrix_gf2(self, n, weight, columns):
+        matrix = np.random.default_rng(n).integers(0, 2, (n, columns))
+        # an all-zero row and an all-zero column
+        matrix[1], matrix[:, 2] = 0, 0
+        rows = [int("".join(map(str, row)), 2) for row in matrix]
+        report = verify_selection(
+            bix.bix_matrix_gf2(n, columns, weight,
+                               np.packbits(matrix.astype(np.uint8), axis=1)),
+            SelectionSpec(n, weight, columns, np.array(rows)[:, None]))
+        assert report.ok, report
+
+    def test_matrix_gf2_shape(self):
+        with pytest.raises(ArgumentError):
+            bix.bix_matrix_gf2(4, 9, 2, np.zeros((4, 1), dtype=np.uint8))
+
+    def test_pool(self):
+        n, weight = 9, 4
+        elems = list(range(3, 3 + n))
+        report = verify_bix_data(n, 4, weight, elems, processes=2,
+                                 chunk_size=16)
+        assert report.ok, report
+        assert report.inputs == 126
+
+    def test_failure_detected(self):
+        n, weight, m = 5, 2, 3
+        elems = [1, 2, 3, 4, 5]
+        # BIX followed by an ancilla left dirty when bits 0 and 3 are set
+        qrout = QRoutine()
+        wires = qrout.new_wires(n + n * m)
+        anc = qrout.new_wires(1)
+        qrout.set_ancillae(anc)
+        qrout.apply(bix.bix_data_compile_time(n, m, weight, elems), wires)
+        qrout.apply(CCNOT, wires[0], wires[3], anc)
+        table = np.array(elems)[:, None]
+        report = verify_selection(qrout, SelectionSpec(n, weight, m, table))
+        assert report.failures == 1
+        assert report.first_failure == 0b01001
@@ -0,0 +1,125 @@
+import functools
+
+import numpy as np
+import pytest
+from qat.lang.AQASM import classarith
+from qat.lang.AQASM.gates import CNOT
+from qat.lang.AQASM.routines import QRoutine
+from qatext.qroutines import bix
+from qatext.qroutines.arith import cuccaro_arith
+from qatext.qroutines.datastructure.sliding_sort_array import (insert_ld,
+                                                               insert_lw)
+from qatext.verification.equivalence import check_equivalence
+
+from .test_ancillae import _dicke_sampler, _sorted_array_sampler
+
+
+def _bits_to_registers(bits: np.ndarray, m: int) -> np.ndarray:
+    """Inverse of `_registers_to_bits`: big endian registers of `m` bits."""
+    weights = 1 << np.arange(m - 1, -1, -1)
+    return bits.reshape(len(bits), -1, m) @ weights
+
+
+def _valid_insert(n, m, bits):
+    """The array after the value is sorted, with the last cell empty."""
+    array = _bits_to_registers(bits[:, m:(n + 1) * m], m)
+    return (np.all(np.diff(array[:, :-1], axis=1) >= 0, axis=1)
+            & (array[:, -1] == 0)
+            & ~bits[:, (n + 1) * m:].any(axis=1))
+
+
+class TestEquivalence:
+
+    @pytest.mark.parametrize("n, m", [(3, 2), (4, 2)])
+    def test_insert_exhaustive(self, n, m):
+        report = check_equivalence(insert_ld(n, m),
+                                   insert_lw(n, m),
+                                   link_a=[classarith],
+                                   link_b=[classarith],
+                                   valid=functools.partial(
+                                       _valid_insert, n, m))
+        assert report.ok, report
+        assert report.inputs > 0
+
+    def test_insert_sampled(self):
+        n, m = 6, 3
+        report = check_equivalence(insert_ld(n, m),
+                                   insert_lw(n, m),
+                                   link_a=[classarith],
+                                   link_b=[classarith],
+                                   sampler=functools.partial(
+                                       _sorted_array_sampler, 1, n, m),
+                                   samples=500)
+        assert report.ok, report
+        assert report.inputs == 500
+
+    @pytest.mark.parametrize("n, weight", [(5, 2), (6, 3)])
+    def test_bix_data_diff(self, n, weight):
+        elems = sorted([3, 1, 6, 2, 7, 5][:n])
+        m = max(elems).bit_length()
+        gate = bix.bix_data_compile_time(n, m, weight, elems)
+        link = [cuccaro_arith.adder, cuccaro_arith.subtractor]
+        report = check_equivalence(
+            gate,
+            bix.bix_data_diff_compile_time(n, m, weight, elems),
+            link_a=link,
+            link_b=link,
+            sampler=functools.partial(_dicke_sampler, n, weight, gate.arity),
+            samples=300)
+        assert report.ok, report
+
+    @pytest.mark.parametrize("n, weight", [(5, 2), (6, 4)])
+    def test_bix_data_unary(self, n, weight):
+        elems = [3, 1, 6, 2, 7, 5][:n]
+        m = max(elems).bit_length()
+        gate = bix.bix_data_compile_time(n, m, weight, elems)
+        link = [cuccaro_arith.adder, cuccaro_arith.subtractor]
+        report = check_equivalence(
+            gate,
+            bix.bix_data_unary(n, m, weight, elems),
+            link_b=link,
+            sampler=functools.partial(_dicke_sampler, n, weight, gate.arity),
+            samples=300)
+        assert report.ok, report
+
+    @pytest.mark.parametrize("n", [3, 4])
+    def test_cuccaro_vs_classarith(self, n):
+        # Cuccaro: |a>|b> -> |a>|a+b>, classarith: |a>|b> -> |a+b>|b>
+        wires_b = list(range(n, 2 * n)) + list(range(n))
+        report = check_equivalence(cuccaro_arith.adder(n, n, False, True),
+                                   classarith.add(n, n),
+                                   wires_b=wires_b,
+                                   link_b=[classarith])
+        assert report.ok, report
+        assert report.inputs == 1 << (2 * n)
+
+    def test_diverging_inputs(self):
+        n = 3
+        report = check_equivalence(cuccaro_arith.adder(n, n, False, False),
+                                   cuccaro_arith.subtractor(n, n, False,
+                                                            False))
+        assert not report.ok
+        # a + b == a - b only if b is 0 or 2^(n-1), i.e. only its most
+        # significant bit, qubit n, can be set
+        assert report.failures == (1 << (2 * n)) - 2 * (1 << n)
+        assert report.first_failure == 1 << (n + 1)
+        assert len(report.failing_inputs) > 1
+        lower_b = ((1 << (n - 1)) - 1) << (n + 1)
+        assert all(x & lower_b for x in report.failing_inputs)
+
+    def test_compare_subset(self):
+        qrout = QRoutine()
+        wires = qrout.new_wires(3)
+        qrout.apply(CNOT, wires[0], wires[2])
+        identity = QRoutine()
+        identity.new_wires(3)
+        report = check_equivalence(qrout, identity)
+        assert report.failures == 4
+        assert report.reason == "logical qubits [2] differ"
+        assert check_equivalence(qrout, identity, compare=[0, 1]).ok
+
+    def test_bad_wires(self):
+        with pytest.raises(ValueError):
+            check_equivalence(cuccaro_arith.adder(3, 3, False, False),
+                              classarith.add(3, 3),
+                              wires_b=[0, 0, 1, 2, 3, 4])
@@ -0,0 +1,60 @@
+from math import comb
+
+import numpy as np
+import pytest
+from qat.lang.AQASM.gates import X, Z
+from qat.lang.AQASM.routines import QRoutine
+from qatext.utils.bits.combinatorics import unrank_array
+from qatext.verification.phase import phase_vector, verify_marking
+
+
+def _pair_oracle(n, flip_after):
+    """Flip the phase of the inputs having qubits 0 and 2 set; if
+    `flip_after`, leave qubit 1 flipped."""
+    qrout = QRoutine()
+    wires = qrout.new_wires(n)
+    qrout.apply(Z.ctrl(), wires[0], wires[2])
+    if flip_after:
+        qrout.apply(X, wires[1])
+    return qrout
+
+
+def _pair_marks(n, weight):
+    xs = unrank_array(np.arange(comb(n, weight)), n, weight)
+    return (xs & 0b101) == 0b101
+
+
+class TestPhase:
+
+    @pytest.mark.parametrize("n, weight", [(4, 2), (6, 3), (7, 5)])
+    def test_marking(self, n, weight):
+        report = verify_marking(_pair_oracle(n, False), n, weight,
+                                _pair_marks(n, weight))
+        assert report.ok, report
+        assert report.inputs == comb(n, weight)
+
+    def test_phase_vector(self):
+        signs = phase_vector(_pair_oracle(6, False), 6, 3)
+        assert (signs == np.where(_pair_marks(6, 3), -1, 1)).all()
+
+    def test_wrong_marks_detected(self):
+        marks = _pair_marks(6, 3)
+        marks[0] = not marks[0]
+        report = verify_marking(_pair_oracle(6, False), 6, 3, marks)
+        assert report.failures == 1
+        assert report.reason == "wrong phase"
+
+    def test_bits_changed_detected(self):
+        report = verify_marking(_pair_oracle(6, True), 6, 3,
+                                _pair_marks(6, 3))
+        assert report.failures == comb(6, 3)
+        assert "bits changed" in report.reason
+
+    def test_pool(self):
+        report = verify_marking(_pair_oracle(9, False), 9, 4,
+                                _pair_marks(9, 4), processes=2)
+        assert report.ok, report
+
+    def test_marks_count(self):
+        with pytest.raises(ValueError):
+            verify_marking(_pair_oracle(6, False), 6, 3, [True])
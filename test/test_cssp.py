@@ -0,0 +1,142 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+from qat.lang.AQASM import classarith
+from qat.lang.AQASM.routines import QRoutine
+from qatext.qpus.sparse import simulate
+from qatext.qroutines import bix
+from qatext.qroutines.arith import cuccaro_arith
+from qatext.utils.bits.combinatorics import rank
+from qatext.utils.qatmgmt.cache import CircuitCache
+from qatext.utils.qatmgmt.circuit import gate_counts
+from qatext.utils.qatmgmt.resources import estimate_resources
+from qatext.verification.phase import phase_vector
+
+import cssp
+
+LINK = [classarith, cuccaro_arith]
+
+
+def _amplitudes(circ):
+    """The nonzero amplitudes of the basis states, as integers: idle
+    ancillae, always zero, do not change them."""
+    state = simulate(circ)
+    return {
+        sum(int(word) << (64 * i) for i, word in enumerate(key)): amp
+        for key, amp in zip(state.keys, state.amps) if abs(amp) > 1e-9
+    }
+
+
+class TestCSSP:
+
+    @pytest.mark.parametrize("n, k, values, target_sum, iters", [
+        (3, 1, [1, 2, 3], 3, 1),
+        (4, 2, [1, 2, 3, 5], 5, 1),
+        (4, 2, [1, 2, 3, 6], 8, 0),
+    ])
+    def test_build_circuit(self, n, k, values, target_sum, iters):
+        expected = cssp.build(n, k, values, target_sum,
+                              n_external_iters=iters).to_circ(link=LINK)
+        spliced = cssp.build_circuit(n, k, values, target_sum,
+                                     n_external_iters=iters)
+        assert spliced.circuit.nbqbits >= expected.nbqbits
+        expected_amps = _amplitudes(expected)
+        spliced_amps = _amplitudes(spliced.circuit)
+        assert spliced_amps.keys() == expected_amps.keys()
+        assert np.allclose([spliced_amps[key] for key in expected_amps],
+                           list(expected_amps.values()))
+        assert spliced.registers["s_1"].slic == \
+            cssp.build(n, k, values, target_sum)._qregnames_to_properties[
+                "s_1"].slic
+
+    def test_skeleton_unchanged(self):
+        skeletons = [
+            cssp._compiled_skeleton(4, 2, 3, part, True, 1)
+            for part in ("head", "tail")
+        ]
+        before = [(circ.nbqbits, len(circ.ops)) for circ in skeletons]
+        cssp.build_circuit(4, 2, [1, 2, 3, 5], 5, n_external_iters=1)
+        assert [(circ.nbqbits, len(circ.ops)) for circ in skeletons] == before
+
+    def test_skeleton_cached(self, tmp_path):
+        cache = CircuitCache(str(tmp_path))
+        for values, target_sum in [([1, 2, 3, 5], 5), ([1, 4, 6, 7], 11),
+                                   ([2, 3, 4, 6], 7)]:
+            cssp.build_circuit(4, 2, values, target_sum, cache=cache)
+        # the head and the tail, shared by the instances of the same m
+        assert len(cache.entries()) == 2
+
+    def test_main_resources(self, capsys):
+        args = (3, 1, [1, 2, 3], 3)
+        cssp.main(*args)
+        printed = capsys.readouterr().out.splitlines()[-1]
+        expected = estimate_resources(cssp.build(*args), link=LINK)
+        assert printed == str(expected)
+        circ = cssp.build(*args).to_circ(link=LINK)
+        assert expected.gates == gate_counts(circ)
+        assert expected.qubits == circ.nbqbits
+
+    def test_main_cached(self, tmp_path, capsys, monkeypatch):
+        args = (3, 1, [1, 2, 3], 3)
+        cache = CircuitCache(str(tmp_path))
+        cssp.main(*args, cache=cache)
+        missed = capsys.readouterr().out
+        expected = estimate_resources(cssp.build(*args), link=LINK)
+
+        def fail(*_):
+            raise AssertionError("built on a cache hit")
+
+        monkeypatch.setattr(cssp, "ProgramWrapper", fail)
+        cssp.main(*args, cache=cache)
+        assert capsys.readouterr().out == missed
+        circ = cache.get(cache.entries()[0]).circuit
+        assert f"qubits={circ.nbqbits}, ancillae={expected.ancillae}," \
+            in missed
+        assert str(gate_counts(circ)) in missed
+
+    @pytest.mark.parametrize("target_sum", [-1, 5])
+    def test_target_out_of_range(self, target_sum):
+        with pytest.raises(ValueError):
+            cssp.build(3, 1, [1, 2, 3], target_sum)
+
+    def test_named_gates(self):
+        prw = cssp.build(6, 2, [1, 2, 3, 4, 5, 6], 3)
+        circ = prw.to_circ(link=LINK, inline=False)
+        names = [
+            g.syntax.name for g in circ.gateDic.values()
+            if g.syntax is not None and g.syntax.name.startswith("CSSP_")
+        ]
+        # defined once, whatever the number of iterations and QPE qubits;
+        # the update of J(6, 2) and, for the zeros, the one of J(6, 4)
+        assert sorted(names) == ["CSSP_ORACLE", "CSSP_REFLECTION",
+                                 "CSSP_UPDATE", "CSSP_UPDATE",
+                                 "CSSP_WALK_STEP"]
+
+    def test_unknown_part(self):
+        with pytest.raises(ValueError):
+            cssp.skeleton(4, 2, 3, "body")
+
+    @pytest.mark.parametrize("n, k, values, target_sum", [
+        (5, 2, [1, 2, 3, 5, 6], 7),
+        (6, 3, [1, 2, 3, 4, 6, 9], 12),
+    ])
+    def test_oracle_phases(self, n, k, values, target_sum):
+        m, len_s, n_qubits_sum, _ = cssp.parameters(n, k, values)
+        qrout = QRoutine()
+        dicke = qrout.new_wires(n)
+        ones = qrout.new_wires(k * m)
+        zeros = qrout.new_wires((n - k) * m)
+        sum_reg = qrout.new_wires(n_qubits_sum)
+        qrout.apply(bix.bix_data_compile_time(n, m, k, sorted(values)),
+                    dicke, ones, zeros)
+        qrout.apply(cssp.load_target(n_qubits_sum, target_sum), sum_reg)
+        qrout.apply(cssp.oracle_gate(n, k, m, n_qubits_sum), ones, sum_reg)
+        signs = phase_vector(qrout, n, k, link=LINK)
+        expected = np.ones(len(signs), dtype=np.int64)
+        values = sorted(values)
+        for subset in combinations(range(n), k):
+            if sum(values[i] for i in subset) == target_sum:
+                expected[rank(sum(1 << i for i in subset))] = -1
+        assert (signs == expected).all()
+        assert (signs == -1).any()
@@ -0,0 +1,88 @@
+import itertools
+
+import numpy as np
+import pytest
+from qat.lang.AQASM import classarith
+from qat.lang.AQASM.gates import X
+from qat.lang.AQASM.program import Program
+from qatext.qpus.sparse import simulate
+from qatext.qroutines.arith import cuccaro_arith
+
+import cssp
+import cssp_emulator
+
+LINK = [classarith, cuccaro_arith]
+
+
+def _success(prw, k, m, target_sum):
+    """Probability of the ones holding values summing to `target_sum`, from
+    the sparse simulation of the whole program."""
+    state = simulate(prw.to_circ(link=LINK))
+    qbits = [q.index for reg in prw._qregnames_to_properties["s_1"].qregs
+             for q in reg]
+    return sum(p for value, p in state.probabilities(qbits).items()
+               if sum((value >> (m * j)) & ((1 << m) - 1)
+                      for j in range(k)) == target_sum)
+
+
+class TestCSSPEmulator:
+
+    @pytest.mark.parametrize("n, k, seed", [(6, 3, 0), (8, 3, 1), (10, 5, 2),
+                                            (9, 2, 3)])
+    def test_marked_edges_count(self, n, k, seed):
+        rng = np.random.default_rng(seed)
+        values = sorted(rng.choice(range(1, 4 * n), n, replace=False))
+        target_sum = sum(rng.choice(values, k, replace=False))
+        expected = np.zeros(min(k, n - k) + 1, dtype=int)
+        for node in itertools.combinations(values, k):
+            out = [v for v in values if v not in node]
+            expected[sum(1 for x in node for y in out
+                         if sum(node) - x + y == target_sum)] += 1
+        assert list(cssp_emulator.marked_edges_count(
+            [int(v) for v in values], k, target_sum)) == list(expected)
+
+    def test_oracle(self):
+        k, m, n_qubits_sum = 3, 3, 5
+        for node in itertools.combinations(range(1, 7), k):
+            pr = Program()
+            ones = pr.qalloc(k * m)
+            sum_reg = pr.qalloc(n_qubits_sum)
+            for j, value in enumerate(node):
+                for i in range(m):
+                    if (value >> (m - 1 - i)) & 1:
+                        pr.apply(X, ones[j * m + i])
+            pr.apply(cssp.load_target(n_qubits_sum, 9), sum_reg)
+            pr.apply(cssp.oracle_gate(6, k, m, n_qubits_sum), ones, sum_reg)
+            state = simulate(pr.to_circ(link=LINK))
+            assert state.amps[0].real == pytest.approx(
+                -1 if sum(node) == 9 else 1)
+
+    @pytest.mark.parametrize("n, k, values, target_sum", [
+        (4, 2, [1, 2, 3, 5], 5),
+        (6, 3, [1, 2, 3, 4, 5, 6], 9),
+        (3, 2, [1, 2, 3], 4),
+        (4, 1, [1, 2, 3, 5], 5),
+        (5, 2, [1, 2, 3, 5, 6], 7),
+    ])
+    def test_same_as_circuit(self, n, k, values, target_sum):
+        m = max(values).bit_length()
+        emulated = cssp_emulator.emulate(n, k, values, target_sum, 2)
+        simulated = [
+            _success(cssp.build(n, k, values, target_sum,
+                                n_external_iters=iters), k, m, target_sum)
+            for iters in range(3)
+        ]
+        assert emulated == pytest.approx(simulated)
+
+    def test_large_instance(self):
+        n, k = 24, 12
+        values = list(range(1, n + 1))
+        res = cssp_emulator.emulate(n, k, values, sum(values[:k]) + 5)
+        _, _, _, n_external_iters = cssp.parameters(n, k, values)
+        assert len(res) == n_external_iters + 1
+        assert ((res >= 0) & (res <= 1)).all()
+        assert len(set(np.round(res, 12))) > 1
+
+    def test_distinct_values(self):
+        with pytest.raises(ValueError):
+            cssp_emulator.emulate(3, 1, [1, 1, 2], 2)